@@ -0,0 +1,7 @@
+'''
+Logwood benchmark suite.
+
+Run ``python -m benchmarks --help`` for usage. Every scenario configures logwood from scratch, writes only to local
+stand-ins (files on tmpfs, a local UDP syslog sink, /dev/null) and reports the mean per-call time together with
+p50/p99 latency of individual calls. Results are written as JSON and can be compared against a saved baseline.
+'''
@@ -0,0 +1,75 @@
+'''
+Command line interface of the benchmark suite::
+
+	python -m benchmarks --output results.json
+	python -m benchmarks --baseline baseline.json --threshold 0.1
+	python -m benchmarks --list
+'''
+
+from typing import List, Optional # noqa
+import argparse
+import json
+import sys
+
+from benchmarks import runner
+from benchmarks.scenarios import SCENARIOS
+
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+	parser = argparse.ArgumentParser(prog = 'python -m benchmarks', description = 'Logwood benchmark suite.')
+	parser.add_argument('scenarios', nargs = '*', help = 'Names of scenarios to run, all by default.')
+	parser.add_argument('--list', action = 'store_true', help = 'List scenarios and exit.')
+	parser.add_argument('--number', type = int, default = 100000, help = 'Logging calls per round (default: %(default)s).')
+	parser.add_argument('--repeat', type = int, default = 5, help = 'Rounds per scenario (default: %(default)s).')
+	parser.add_argument('--latency-samples', type = int, default = 10000,
+		help = 'Individually timed calls used for p50/p99 (default: %(default)s).')
+	parser.add_argument('--import-samples', type = int, default = 20,
+		help = 'Fresh interpreters used to measure import time (default: %(default)s).')
+	parser.add_argument('--output', help = 'Write results as JSON to this file.')
+	parser.add_argument('--baseline', help = 'Compare results with a JSON file written by --output.')
+	parser.add_argument('--threshold', type = float, default = 0.1,
+		help = 'Relative slowdown against the baseline reported as a regression (default: %(default)s).')
+	args = parser.parse_args(argv)
+
+	if args.list:
+		print('{:<30} {}'.format(runner.IMPORT_SCENARIO, runner.IMPORT_DESCRIPTION))
+		for scenario in SCENARIOS.values():
+			print('{:<30} {}'.format(scenario.name, scenario.description))
+		return 0
+
+	unknown = [name for name in args.scenarios if name not in SCENARIOS and name != runner.IMPORT_SCENARIO]
+	if unknown:
+		parser.error('unknown scenarios: {}'.format(', '.join(unknown)))
+	if args.scenarios:
+		scenarios = [SCENARIOS[name] for name in args.scenarios if name != runner.IMPORT_SCENARIO]
+		import_samples = args.import_samples if runner.IMPORT_SCENARIO in args.scenarios else 0
+	else:
+		scenarios = list(SCENARIOS.values())
+		import_samples = args.import_samples
+
+	results = runner.run(
+		scenarios, args.number, args.repeat, args.latency_samples,
+		progress = lambda name, result: print(runner.format_result(name, result), flush = True),
+		import_samples = import_samples,
+	)
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent = 2, sort_keys = True)
+
+	if args.baseline:
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+		comparison = runner.compare(results, baseline, args.threshold)
+		print()
+		for entry in comparison:
+			print(runner.format_comparison(entry))
+		if any(entry['regression'] for entry in comparison):
+			return 1
+	return 0
+
+
+
+if __name__ == '__main__':
+	sys.exit(main())
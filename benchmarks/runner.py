@@ -0,0 +1,216 @@
+'''
+Measurement, reporting and baseline comparison.
+'''
+
+from typing import Any, Callable, Dict, Iterable, List # noqa
+import datetime
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.scenarios import Scenario
+
+
+
+def _run_threads(threads: int, target: Callable[[], None]) -> float:
+	'''
+	Run `target` in `threads` threads started at the same moment. Return wall-clock time in seconds.
+	'''
+	barrier = threading.Barrier(threads + 1)
+
+	def run() -> None:
+		barrier.wait()
+		target()
+
+	workers = [threading.Thread(target = run) for _ in range(threads)]
+	for worker in workers:
+		worker.start()
+	barrier.wait()
+	start = time.perf_counter()
+	for worker in workers:
+		worker.join()
+	return time.perf_counter() - start
+
+
+def _time_calls(call: Callable[[], None], number: int, threads: int) -> float:
+	'''
+	Return mean wall-clock seconds per call when making `number` calls in total.
+	'''
+	calls_per_thread = max(number // threads, 1)
+
+	def loop() -> None:
+		for _ in range(calls_per_thread):
+			call()
+
+	if threads == 1:
+		start = time.perf_counter()
+		loop()
+		elapsed = time.perf_counter() - start
+	else:
+		elapsed = _run_threads(threads, loop)
+	return elapsed / (calls_per_thread * threads)
+
+
+def _sample_latencies(call: Callable[[], None], samples: int, threads: int) -> List[int]:
+	'''
+	Time `samples` individual calls in nanoseconds, spread over `threads` threads.
+	'''
+	latencies = [] # type: List[int]
+	samples_per_thread = max(samples // threads, 1)
+	clock = time.perf_counter_ns
+
+	def loop() -> None:
+		local = []
+		for _ in range(samples_per_thread):
+			start = clock()
+			call()
+			local.append(clock() - start)
+		latencies.extend(local)
+
+	if threads == 1:
+		loop()
+	else:
+		_run_threads(threads, loop)
+	return sorted(latencies)
+
+
+def _percentile(sorted_values: List[int], percent: float) -> int:
+	index = min(int(round(percent / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+	return sorted_values[index]
+
+
+def measure(scenario: Scenario, number: int, repeat: int, latency_samples: int) -> Dict[str, Any]:
+	'''
+	Run one scenario: `repeat` rounds of `number` calls for throughput, then `latency_samples` individually timed calls.
+	'''
+	call, teardown = scenario.setup()
+	try:
+		# Warm up caches (compiled formats, call sites, tracebacks, open connections)
+		for _ in range(min(number, 1000)):
+			call()
+		per_call = [_time_calls(call, number, scenario.threads) * 1e9 for _ in range(repeat)]
+		latencies = _sample_latencies(call, latency_samples, scenario.threads)
+	finally:
+		teardown()
+
+	return {
+		'description': scenario.description,
+		'threads': scenario.threads,
+		'number': number,
+		'repeat': repeat,
+		'per_call_ns': {
+			'min': min(per_call),
+			'median': statistics.median(per_call),
+			'mean': statistics.mean(per_call),
+		},
+		'p50_ns': _percentile(latencies, 50),
+		'p99_ns': _percentile(latencies, 99),
+	}
+
+
+IMPORT_SCENARIO = 'import_logwood'
+IMPORT_DESCRIPTION = 'Time of import logwood in a fresh interpreter, measured with python -X importtime.'
+
+
+def _import_time_ns() -> int:
+	'''
+	Import logwood in a new interpreter and return the cumulative import time reported for the ``logwood`` package.
+	'''
+	root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	output = subprocess.run(
+		[sys.executable, '-X', 'importtime', '-c', 'import logwood'],
+		cwd = root, stdout = subprocess.DEVNULL, stderr = subprocess.PIPE, universal_newlines = True, check = True,
+	).stderr
+	for line in output.splitlines():
+		# import time: self [us] | cumulative | imported package
+		parts = line.split('|')
+		if len(parts) == 3 and parts[2].strip() == 'logwood':
+			return int(parts[1]) * 1000
+	raise RuntimeError('logwood not found in -X importtime output')
+
+
+def measure_import(samples: int) -> Dict[str, Any]:
+	'''
+	Measure ``import logwood`` in `samples` fresh interpreters. The result has the same shape as :func:`measure`,
+	a "call" being one import.
+	'''
+	times = sorted(_import_time_ns() for _ in range(samples))
+	return {
+		'description': IMPORT_DESCRIPTION,
+		'threads': 1,
+		'number': 1,
+		'repeat': samples,
+		'per_call_ns': {
+			'min': times[0],
+			'median': statistics.median(times),
+			'mean': statistics.mean(times),
+		},
+		'p50_ns': _percentile(times, 50),
+		'p99_ns': _percentile(times, 99),
+	}
+
+
+def run(scenarios: Iterable[Scenario], number: int, repeat: int, latency_samples: int,
+progress: Callable[[str, Dict[str, Any]], None] = None, import_samples: int = 0) -> Dict[str, Any]:
+	'''
+	Run all `scenarios` and return the results document. With `import_samples`, import time is measured as well.
+	'''
+	results = {}
+	if import_samples:
+		results[IMPORT_SCENARIO] = measure_import(import_samples)
+		if progress is not None:
+			progress(IMPORT_SCENARIO, results[IMPORT_SCENARIO])
+	for scenario in scenarios:
+		results[scenario.name] = measure(scenario, number, repeat, latency_samples)
+		if progress is not None:
+			progress(scenario.name, results[scenario.name])
+
+	with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'version.txt')) as f:
+		version = f.read().strip()
+	return {
+		'logwood_version': version,
+		'python': sys.version.split()[0],
+		'implementation': platform.python_implementation(),
+		'platform': platform.platform(),
+		'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+		'results': results,
+	}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+	'''
+	Compare median per-call times of scenarios present in both documents.
+	A scenario regressed if it is more than `threshold` (e.g. 0.1 for 10 %) slower than the baseline.
+	'''
+	comparison = []
+	for name, result in results['results'].items():
+		if name not in baseline['results']:
+			continue
+		old = baseline['results'][name]['per_call_ns']['median']
+		new = result['per_call_ns']['median']
+		ratio = new / old if old else float('inf')
+		comparison.append({
+			'name': name,
+			'baseline_ns': old,
+			'current_ns': new,
+			'ratio': ratio,
+			'regression': ratio > 1 + threshold,
+		})
+	return comparison
+
+
+def format_result(name: str, result: Dict[str, Any]) -> str:
+	return '{:<30} {:>10.0f} ns/call   p50 {:>8d} ns   p99 {:>8d} ns'.format(
+		name, result['per_call_ns']['median'], result['p50_ns'], result['p99_ns']
+	)
+
+
+def format_comparison(entry: Dict[str, Any]) -> str:
+	return '{:<30} {:>10.0f} -> {:>10.0f} ns/call   {:>+7.1%}{}'.format(
+		entry['name'], entry['baseline_ns'], entry['current_ns'], entry['ratio'] - 1,
+		'   REGRESSION' if entry['regression'] else ''
+	)
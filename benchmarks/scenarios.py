@@ -0,0 +1,411 @@
+'''
+Benchmark scenarios.
+
+A scenario is a setup function registered with :func:`scenario`. It configures logging and returns a tuple of
+``(call, teardown)``: `call` performs exactly one logging call and `teardown` releases everything set up.
+'''
+
+from typing import Callable, Dict, Tuple # noqa
+import collections
+import contextlib
+import itertools
+import logging
+import os
+
+import logwood
+import logwood.compat
+import logwood.testing
+from logwood.handlers.aggregating import AggregatingHandler
+from logwood.handlers.append import AppendFileHandler
+from logwood.handlers.buffered import ThreadBufferedStreamHandler
+from logwood.handlers.compressed import CompressedFileHandler
+from logwood.handlers.json import JsonHandler
+from logwood.handlers.logging import FileHandler, SysLogHandler
+from logwood.handlers.metrics import MetricsHandler
+from logwood.handlers.nonblocking import NonBlockingStreamHandler
+from logwood.handlers.shipper import ShipperHandler
+from logwood.handlers.stderr import ColoredStderrHandler
+from logwood.handlers.syslog import SysLogLibHandler, SysLogUnixHandler
+from logwood.handlers.threaded import ThreadedHandler
+
+from benchmarks.sinks import TcpSink, UdpSink, UnixDatagramSink, remove_directory, tmpfs_directory
+
+
+
+Scenario = collections.namedtuple('Scenario', 'name, description, setup, threads')
+
+SCENARIOS = collections.OrderedDict() # type: Dict[str, Scenario]
+
+SetupResult = Tuple[Callable[[], None], Callable[[], None]]
+
+
+
+def scenario(name: str, threads: int = 1) -> Callable:
+	'''
+	Register a scenario setup function. `threads` is the number of threads calling the scenario concurrently.
+	Logwood state is reset before the setup function runs.
+	'''
+	def decorator(setup: Callable[[], SetupResult]) -> Callable[[], SetupResult]:
+		def reset_and_setup() -> SetupResult:
+			logwood.testing.reset_state()
+			return setup()
+		SCENARIOS[name] = Scenario(name, setup.__doc__.strip(), reset_and_setup, threads)
+		return setup
+	return decorator
+
+
+def _configure(handlers, level: int = logwood.DEBUG, format: str = logwood.global_config.default_format) -> logwood.Logger:
+	logwood.basic_config(handlers = handlers, level = level, format = format)
+	return logwood.get_logger('benchmark')
+
+
+def _teardown(*cleanups: Callable[[], None]) -> Callable[[], None]:
+	def teardown() -> None:
+		logwood.testing.reset_state()
+		for cleanup in cleanups:
+			cleanup()
+	return teardown
+
+
+def _file_handler(**kwargs) -> Tuple[FileHandler, Callable[[], None]]:
+	directory = tmpfs_directory()
+	handler = FileHandler(filename = os.path.join(directory, 'benchmark.log'), **kwargs)
+	return handler, lambda: remove_directory(directory)
+
+
+
+@scenario('no_handler')
+def no_handler() -> SetupResult:
+	'''
+	Logger with no handlers at all, measures record construction and dispatch.
+	'''
+	logger = _configure([])
+	return (lambda: logger.error('Error message')), _teardown()
+
+
+@scenario('disabled_level')
+def disabled_level() -> SetupResult:
+	'''
+	DEBUG call with args filtered out by an INFO file handler.
+	'''
+	handler, cleanup = _file_handler(level = logwood.INFO)
+	logger = _configure([handler], level = logwood.INFO)
+	return (lambda: logger.debug('Order %d filled at %.2f', 42, 101.25)), _teardown(cleanup)
+
+
+@scenario('get_logger_weak')
+def get_logger_weak() -> SetupResult:
+	'''
+	get_logger of a temporary logger (no other references) in the default weak cache mode, i.e. creating it.
+	'''
+	_configure([])
+	return (lambda: logwood.get_logger('benchmark.request')), _teardown()
+
+
+@scenario('get_logger_interned')
+def get_logger_interned() -> SetupResult:
+	'''
+	get_logger of a temporary logger in the interned cache mode, i.e. a dict lookup.
+	'''
+	logwood.basic_config(handlers = [], logger_cache = 'interned')
+	return (lambda: logwood.get_logger('benchmark.request')), _teardown()
+
+
+@scenario('file_no_args')
+def file_no_args() -> SetupResult:
+	'''
+	Plain message without args written to a file on tmpfs.
+	'''
+	handler, cleanup = _file_handler()
+	logger = _configure([handler])
+	return (lambda: logger.error('Error message')), _teardown(cleanup)
+
+
+@scenario('file_indexed')
+def file_indexed() -> SetupResult:
+	'''
+	FileHandler on tmpfs maintaining a sidecar index, every fourth record is an error (two index entries per four records).
+	'''
+	handler, cleanup = _file_handler(index = True)
+	logger = _configure([handler])
+	messages = itertools.cycle([logger.info, logger.info, logger.info, logger.error])
+	return (lambda: next(messages)('Order %d filled at %.2f', 42, 101.25)), _teardown(cleanup)
+
+
+@scenario('file_percent_args')
+def file_percent_args() -> SetupResult:
+	'''
+	Message with %-style args written to a file on tmpfs.
+	'''
+	handler, cleanup = _file_handler()
+	logger = _configure([handler])
+	return (lambda: logger.error('Order %d filled at %.2f', 42, 101.25)), _teardown(cleanup)
+
+
+@scenario('file_str_format_args')
+def file_str_format_args() -> SetupResult:
+	'''
+	Message with str.format-style args written to a file on tmpfs.
+	'''
+	handler, cleanup = _file_handler()
+	logger = _configure([handler])
+	return (lambda: logger.error('Order {} filled at {:.2f}', 42, 101.25)), _teardown(cleanup)
+
+
+@scenario('file_many_fields')
+def file_many_fields() -> SetupResult:
+	'''
+	Keyword fields and ten context variables, some of them rendered by the format.
+	'''
+	handler, cleanup = _file_handler()
+	logger = _configure([handler], format = '[{timestamp}][{name}][{level}] {message} qty={qty} px={px} venue={venue} account={account}')
+	bound_context = logwood.context(**{'var{}'.format(i): i for i in range(8)}, venue = 'XNYS', account = 'A-1')
+	bound_context.__enter__()
+
+	def call() -> None:
+		logger.info('Order filled', qty = 5, px = 101.25, side = 'buy', order_id = 123456)
+
+	return call, _teardown(lambda: bound_context.__exit__(None, None, None), cleanup)
+
+
+@scenario('file_append')
+def file_append() -> SetupResult:
+	'''
+	AppendFileHandler with one os.write per record to a file on tmpfs.
+	'''
+	directory = tmpfs_directory()
+	logger = _configure([AppendFileHandler(filename = os.path.join(directory, 'benchmark.log'))])
+	return (lambda: logger.error('Order %d filled at %.2f', 42, 101.25)), _teardown(lambda: remove_directory(directory))
+
+
+@scenario('file_append_batched')
+def file_append_batched() -> SetupResult:
+	'''
+	AppendFileHandler writing batches of up to 32 records (4 KiB) to a file on tmpfs.
+	'''
+	directory = tmpfs_directory()
+	logger = _configure([AppendFileHandler(filename = os.path.join(directory, 'benchmark.log'), batch_size = 32)])
+	return (lambda: logger.error('Order %d filled at %.2f', 42, 101.25)), _teardown(lambda: remove_directory(directory))
+
+
+@scenario('file_gzip')
+def file_gzip() -> SetupResult:
+	'''
+	CompressedFileHandler compressing 64 KiB blocks of records with gzip to a file on tmpfs.
+	'''
+	directory = tmpfs_directory()
+	logger = _configure([CompressedFileHandler(filename = os.path.join(directory, 'benchmark.log.gz'))])
+	return (lambda: logger.error('Order %d filled at %.2f', 42, 101.25)), _teardown(lambda: remove_directory(directory))
+
+
+@scenario('file_exception')
+def file_exception() -> SetupResult:
+	'''
+	Logger.exception with a traceback, the same code path failing repeatedly.
+	'''
+	handler, cleanup = _file_handler()
+	logger = _configure([handler])
+
+	def call() -> None:
+		try:
+			raise ValueError('Benchmark failure')
+		except ValueError:
+			logger.exception('Operation failed for id {}', 42)
+
+	return call, _teardown(cleanup)
+
+
+@scenario('aggregating')
+def aggregating() -> SetupResult:
+	'''
+	AggregatingHandler counting records of a few templates in one-minute windows, with a reservoir sample of args.
+	'''
+	logger = _configure([AggregatingHandler()])
+	templates = itertools.cycle(['Order %d filled at %.2f', 'Order %d rejected at %.2f', 'Quote %d updated to %.2f'])
+	return (lambda: logger.info(next(templates), 42, 101.25)), _teardown()
+
+
+@scenario('metrics')
+def metrics() -> SetupResult:
+	'''
+	MetricsHandler counting records per logger and level, without an exporter.
+	'''
+	logger = _configure([MetricsHandler()])
+	return (lambda: logger.error('Order %d filled at %.2f', 42, 101.25)), _teardown()
+
+
+@scenario('shipper')
+def shipper() -> SetupResult:
+	'''
+	ShipperHandler sending batches of JSON lines to a TCP sink in another process.
+	'''
+	sink = TcpSink()
+	logger = _configure([ShipperHandler(url = 'tcp://{}:{}'.format(*sink.address))])
+	return (lambda: logger.error('Order %d filled at %.2f', 42, 101.25)), _teardown(sink.close)
+
+
+@scenario('shipper_gzip')
+def shipper_gzip() -> SetupResult:
+	'''
+	ShipperHandler sending gzip compressed batches of JSON lines to a TCP sink in another process.
+	'''
+	sink = TcpSink()
+	logger = _configure([ShipperHandler(url = 'tcp://{}:{}'.format(*sink.address), compression = 'gzip')])
+	return (lambda: logger.error('Order %d filled at %.2f', 42, 101.25)), _teardown(sink.close)
+
+
+@scenario('stderr_colored')
+def stderr_colored() -> SetupResult:
+	'''
+	ColoredStderrHandler with colors forced on, writing to /dev/null instead of the terminal.
+	'''
+	devnull = open(os.devnull, 'w')
+	with contextlib.redirect_stderr(devnull):
+		handler = ColoredStderrHandler(colors = True)
+	logger = _configure([handler])
+	return (lambda: logger.error('Error message')), _teardown(devnull.close)
+
+
+@scenario('stderr_not_tty')
+def stderr_not_tty() -> SetupResult:
+	'''
+	ColoredStderrHandler writing to /dev/null, which is not a terminal, so colors are off.
+	'''
+	devnull = open(os.devnull, 'w')
+	with contextlib.redirect_stderr(devnull):
+		handler = ColoredStderrHandler()
+	logger = _configure([handler])
+	return (lambda: logger.error('Error message')), _teardown(devnull.close)
+
+
+@scenario('stream_nonblocking')
+def stream_nonblocking() -> SetupResult:
+	'''
+	NonBlockingStreamHandler writing to /dev/null.
+	'''
+	devnull = open(os.devnull, 'w')
+	logger = _configure([NonBlockingStreamHandler(stream = devnull)])
+	return (lambda: logger.error('Error message')), _teardown(devnull.close)
+
+
+@scenario('syslog_udp')
+def syslog_udp() -> SetupResult:
+	'''
+	SysLogHandler sending UDP datagrams to a local sink.
+	'''
+	sink = UdpSink()
+	logger = _configure([SysLogHandler(address = sink.address)])
+	return (lambda: logger.error('Error message')), _teardown(sink.close)
+
+
+@scenario('syslog_lib')
+def syslog_lib() -> SetupResult:
+	'''
+	SysLogLibHandler using the standard syslog module (the local syslog daemon, if any).
+	'''
+	logger = _configure([SysLogLibHandler()])
+	return (lambda: logger.error('Error message')), _teardown()
+
+
+@scenario('syslog_unix')
+def syslog_unix() -> SetupResult:
+	'''
+	SysLogUnixHandler sending datagrams to a local unix socket sink standing in for /dev/log.
+	'''
+	sink = UnixDatagramSink()
+	logger = _configure([SysLogUnixHandler(address = sink.address)])
+	return (lambda: logger.error('Error message')), _teardown(sink.close)
+
+
+@scenario('fan_out')
+def fan_out() -> SetupResult:
+	'''
+	One record dispatched to four handlers: two files, JSON lines and UDP syslog.
+	'''
+	first, first_cleanup = _file_handler()
+	second, second_cleanup = _file_handler(format = '{level} {message}')
+	json_file = open(os.devnull, 'w')
+	sink = UdpSink()
+	logger = _configure([first, second, JsonHandler(stream = json_file), SysLogHandler(address = sink.address)])
+	return (
+		(lambda: logger.error('Order %d filled at %.2f', 42, 101.25)),
+		_teardown(first_cleanup, second_cleanup, json_file.close, sink.close),
+	)
+
+
+@scenario('threaded_handler_saturation')
+def threaded_handler_saturation() -> SetupResult:
+	'''
+	ThreadedHandler in front of a file handler, called faster than its worker thread drains the queue.
+	'''
+	handler, cleanup = _file_handler()
+	logger = _configure([ThreadedHandler(underlying_handler = handler)])
+	return (lambda: logger.error('Order %d filled at %.2f', 42, 101.25)), _teardown(cleanup)
+
+
+@scenario('multithreaded_contention', threads = 4)
+def multithreaded_contention() -> SetupResult:
+	'''
+	Four threads logging to the same file handler at once.
+	'''
+	handler, cleanup = _file_handler()
+	logger = _configure([handler])
+	return (lambda: logger.error('Order %d filled at %.2f', 42, 101.25)), _teardown(cleanup)
+
+
+@scenario('multithreaded_buffered', threads = 4)
+def multithreaded_buffered() -> SetupResult:
+	'''
+	Four threads logging to a file through ThreadBufferedStreamHandler.
+	'''
+	directory = tmpfs_directory()
+	stream = open(os.path.join(directory, 'benchmark.log'), 'w')
+	logger = _configure([ThreadBufferedStreamHandler(stream = stream)])
+	return (lambda: logger.error('Order %d filled at %.2f', 42, 101.25)), _teardown(stream.close, lambda: remove_directory(directory))
+
+
+@scenario('stdlib_file')
+def stdlib_file() -> SetupResult:
+	'''
+	Reference: the standard logging module writing %-style args to a file on tmpfs.
+	'''
+	directory = tmpfs_directory()
+	logger = logging.getLogger('logwood.benchmark')
+	logger.propagate = False
+	logger.setLevel(logging.DEBUG)
+	handler = logging.FileHandler(os.path.join(directory, 'benchmark.log'))
+	handler.setFormatter(logging.Formatter('[%(created)f][%(name)s][%(levelname)s] %(message)s'))
+	logger.addHandler(handler)
+
+	def teardown() -> None:
+		logger.removeHandler(handler)
+		handler.close()
+		remove_directory(directory)
+
+	return (lambda: logger.error('Order %d filled at %.2f', 42, 101.25)), teardown
+
+
+@scenario('bridge_file')
+def bridge_file() -> SetupResult:
+	'''
+	The standard logging module bridged to a logwood file handler with %-style args.
+	'''
+	handler, cleanup = _file_handler()
+	_configure([handler])
+	logger = logging.getLogger('logwood.benchmark.bridge')
+	logger.propagate = False
+	logger.setLevel(logging.DEBUG)
+	bridge = logwood.compat.BridgeHandler()
+	logger.addHandler(bridge)
+	return (lambda: logger.error('Order %d filled at %.2f', 42, 101.25)), _teardown(lambda: logger.removeHandler(bridge), cleanup)
+
+
+@scenario('stdlib_disabled_level')
+def stdlib_disabled_level() -> SetupResult:
+	'''
+	Reference: the standard logging module with a filtered out DEBUG call.
+	'''
+	logger = logging.getLogger('logwood.benchmark.disabled')
+	logger.propagate = False
+	logger.setLevel(logging.INFO)
+	return (lambda: logger.debug('Order %d filled at %.2f', 42, 101.25)), (lambda: None)
@@ -0,0 +1,127 @@
+'''
+Local stand-ins for log destinations, so benchmarks do not depend on (or disturb) real services.
+'''
+
+from typing import Tuple
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+
+def tmpfs_directory() -> str:
+	'''
+	Create a temporary directory, on tmpfs if available, so file benchmarks measure logwood rather than the disk.
+	'''
+	base = '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else None
+	return tempfile.mkdtemp(prefix = 'logwood-benchmark-', dir = base)
+
+
+def remove_directory(path: str) -> None:
+	shutil.rmtree(path, ignore_errors = True)
+
+
+
+class UdpSink:
+	'''
+	UDP server on localhost that receives and discards datagrams, e.g. syslog messages.
+	'''
+
+	def __init__(self) -> None:
+		self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self.socket.bind(('127.0.0.1', 0))
+		self.socket.settimeout(0.1)
+		self.received = 0
+		self._running = True
+		self._thread = threading.Thread(target = self._receive, name = 'benchmark-udp-sink', daemon = True)
+		self._thread.start()
+
+
+	@property
+	def address(self) -> Tuple[str, int]:
+		return self.socket.getsockname()
+
+
+	def _receive(self) -> None:
+		while self._running:
+			try:
+				self.socket.recv(65536)
+			except socket.timeout:
+				continue
+			except OSError:
+				return
+			self.received += 1
+
+
+	def close(self) -> None:
+		self._running = False
+		self._thread.join()
+		self.socket.close()
+
+
+
+class UnixDatagramSink:
+	'''
+	Unix datagram server in a temporary directory that receives and discards datagrams, a stand-in for /dev/log.
+	It runs in a separate process like a real syslog daemon. Unix datagram sockets queue only a few datagrams,
+	so a receiver competing with the benchmark for the GIL would make senders wait for it.
+	'''
+
+	def __init__(self) -> None:
+		self.directory = tmpfs_directory()
+		self.address = os.path.join(self.directory, 'log')
+		self._process = subprocess.Popen([sys.executable, '-c', _UNIX_SINK_CODE, self.address])
+		while not os.path.exists(self.address):
+			time.sleep(0.001)
+
+
+	def close(self) -> None:
+		self._process.terminate()
+		self._process.wait()
+		remove_directory(self.directory)
+
+
+
+class TcpSink:
+	'''
+	TCP server on localhost that accepts connections and discards what it receives, a stand-in for a log collector.
+	It runs in a separate process, so receiving does not compete with the benchmark for the GIL.
+	'''
+
+	def __init__(self) -> None:
+		self._process = subprocess.Popen([sys.executable, '-c', _TCP_SINK_CODE], stdout = subprocess.PIPE)
+		self.address = ('127.0.0.1', int(self._process.stdout.readline()))
+
+
+	def close(self) -> None:
+		self._process.terminate()
+		self._process.wait()
+		self._process.stdout.close()
+
+
+
+_UNIX_SINK_CODE = '''
+import socket, sys
+sink = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+sink.bind(sys.argv[1])
+while True:
+	sink.recv(65536)
+'''
+
+_TCP_SINK_CODE = '''
+import socket, sys, threading
+def receive(connection):
+	while connection.recv(1 << 20):
+		pass
+sink = socket.socket()
+sink.bind(('127.0.0.1', 0))
+sink.listen()
+print(sink.getsockname()[1], flush = True)
+while True:
+	threading.Thread(target = receive, args = (sink.accept()[0],), daemon = True).start()
+'''
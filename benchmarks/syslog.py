@@ -0,0 +1,152 @@
+'''
+Compare the syslog handlers without the syslog daemon's cost::
+
+	python -m benchmarks.syslog
+	python -m benchmarks.syslog --number 20000 --repeat 7
+
+The ``syslog_*`` scenarios of :mod:`benchmarks` cannot be compared with each other: :class:`SysLogLibHandler` always
+sends to ``/dev/log``, and unix datagram sockets queue only ``net.unix.max_dgram_qlen`` datagrams (10 by default),
+so a sender soon waits for the receiving process and the time measured is mostly the receiver's.
+
+Here every handler sends to one stand-in bound at ``/dev/log`` (and SysLogHandler also over UDP), which is only read
+between rounds. All datagrams of a round stay queued, so a round measures the sending side alone. This needs
+permission to bind ``/dev/log`` (no syslog daemon running, e.g. as root in a container), ``net.unix.max_dgram_qlen``
+and ``net.core.wmem_default`` large enough for a round, e.g.::
+
+	sysctl net.unix.max_dgram_qlen=100000 net.core.wmem_default=67108864 net.core.wmem_max=67108864
+'''
+
+from typing import Callable, Dict, List, Optional # noqa
+import argparse
+import collections
+import os
+import socket
+import sys
+import time
+
+import logwood
+import logwood.testing
+from logwood.base_handler import Handler
+from logwood.handlers.logging import SysLogHandler
+from logwood.handlers.syslog import SysLogLibHandler, SysLogUnixHandler
+
+
+
+DEV_LOG = '/dev/log'
+
+# Bytes of send buffer a queued syslog datagram takes, measured on Linux
+DATAGRAM_MEMORY = 800
+
+
+
+def _read_sysctl(name: str) -> int:
+	with open('/proc/sys/' + name.replace('.', '/')) as f:
+		return int(f.read())
+
+
+def _check_limits(number: int) -> Optional[str]:
+	'''
+	Return why a round of `number` datagrams would not stay queued, or None.
+	'''
+	try:
+		queue_length = _read_sysctl('net.unix.max_dgram_qlen')
+		send_buffer = _read_sysctl('net.core.wmem_default')
+	except OSError:
+		return 'Linux socket limits in /proc/sys are not readable'
+	if queue_length < number:
+		return 'net.unix.max_dgram_qlen is {}, a round needs {}'.format(queue_length, number)
+	if send_buffer < number * DATAGRAM_MEMORY:
+		return 'net.core.wmem_default is {}, a round needs {}'.format(send_buffer, number * DATAGRAM_MEMORY)
+	return None
+
+
+def _drain(sinks: List[socket.socket]) -> int:
+	''' Receive all queued datagrams, return their number. '''
+	received = 0
+	for sink in sinks:
+		while True:
+			try:
+				sink.recv(65536)
+			except BlockingIOError:
+				break
+			received += 1
+	return received
+
+
+def _measure(create: Callable[[], Handler], sinks: List[socket.socket], number: int, repeat: int) -> float:
+	'''
+	Return the fastest round's nanoseconds per logging call, failing if some datagram did not arrive.
+	'''
+	logwood.testing.reset_state()
+	logwood.basic_config(handlers = [create()], level = logwood.DEBUG)
+	logger = logwood.get_logger('benchmark')
+	try:
+		for _ in range(min(number, 1000)):
+			logger.error('Error message')
+		_drain(sinks)
+		rounds = []
+		for _ in range(repeat):
+			start = time.perf_counter()
+			for _ in range(number):
+				logger.error('Error message')
+			rounds.append((time.perf_counter() - start) / number * 1e9)
+			received = _drain(sinks)
+			if received != number:
+				raise RuntimeError('{} datagrams of {} arrived'.format(received, number))
+	finally:
+		logwood.testing.reset_state()
+	return min(rounds)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+	parser = argparse.ArgumentParser(prog = 'python -m benchmarks.syslog', description = __doc__,
+		formatter_class = argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--number', type = int, default = 20000, help = 'Logging calls per round (default: %(default)s).')
+	parser.add_argument('--repeat', type = int, default = 7, help = 'Rounds per handler and pass (default: %(default)s).')
+	parser.add_argument('--passes', type = int, default = 3,
+		help = 'Times every handler is measured, interleaved with the others (default: %(default)s).')
+	args = parser.parse_args(argv)
+
+	problem = _check_limits(args.number)
+	if problem is not None:
+		print('Cannot run: {}. See python -m benchmarks.syslog --help.'.format(problem), file = sys.stderr)
+		return 1
+
+	dev_log = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+	try:
+		dev_log.bind(DEV_LOG)
+	except OSError as e:
+		dev_log.close()
+		print('Cannot bind {}: {}'.format(DEV_LOG, e), file = sys.stderr)
+		return 1
+	udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+	udp.bind(('127.0.0.1', 0))
+	sinks = [dev_log, udp]
+	for sink in sinks:
+		sink.setblocking(False)
+
+	handlers = collections.OrderedDict([
+		('SysLogHandler (UDP)', lambda: SysLogHandler(address = udp.getsockname())),
+		('SysLogHandler (/dev/log)', lambda: SysLogHandler(address = DEV_LOG)),
+		('SysLogLibHandler', SysLogLibHandler),
+		('SysLogUnixHandler', SysLogUnixHandler),
+	]) # type: collections.OrderedDict
+	results = {} # type: Dict[str, float]
+	try:
+		for _ in range(args.passes):
+			for name, create in handlers.items():
+				per_call = _measure(create, sinks, args.number, args.repeat)
+				results[name] = min(results.get(name, per_call), per_call)
+	finally:
+		for sink in sinks:
+			sink.close()
+		os.unlink(DEV_LOG)
+
+	for name, per_call in results.items():
+		print('{:<30} {:>8.0f} ns/call'.format(name, per_call))
+	return 0
+
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -1,33 +1,60 @@
-from typing import Iterable, Dict, Any
+from __future__ import annotations
+
+# Importing typing takes longer than importing all of logwood, so logwood modules only import it for type checkers.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+	from typing import Iterable, Dict, Any, Optional
 
-import socket
 import sys
 import weakref
 
 from logwood import global_config, state
 from logwood.base_handler import Handler
 from logwood.logger import Logger
-from logwood.handlers.stderr import ColoredStderrHandler
+from logwood.record import context
 
 from logwood.constants import CRITICAL, FATAL, ERROR, WARNING, WARN, INFO, DEBUG, NOTSET # noqa
 
 
 
-def basic_config(handlers: Iterable[Handler] = (ColoredStderrHandler(),), format: str = global_config.default_format,
-level: int = global_config.default_log_level, record_variables: Dict[str, Any] = None) -> None:
+def __getattr__(name: str) -> Any:
+	'''
+	Import rarely used parts of the public API on first access to keep ``import logwood`` fast.
+	'''
+	if name == 'stats':
+		from logwood.instrumentation import stats
+		return stats
+	raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def basic_config(handlers: Optional[Iterable[Handler]] = None, format: str = global_config.default_format,
+level: int = global_config.default_log_level, record_variables: Dict[str, Any] = None, logger_cache: str = 'weak',
+logger_cache_size: int = 1000, shutdown_timeout: Optional[float] = 5.0) -> None:
 	'''
+	:param handlers: Default handlers of all loggers. A :class:`ColoredStderrHandler` is created if None.
 	:param record_variables: Additional variables that will be baked into each logged message.
+	:param logger_cache: How :func:`get_logger` keeps loggers.
+		``'weak'`` keeps only weak references, a logger is recreated once all references to it are gone.
+		``'interned'`` keeps every logger forever, lookups are a plain dict hit.
+		``'bounded'`` keeps the `logger_cache_size` most recently used loggers, for programs which create loggers
+		dynamically (e.g. per tenant or connection).
+	:param shutdown_timeout: Seconds handlers get to write out queued and buffered records when the program exits.
+		None means no limit.
 	'''
-	assert not state.defined_loggers, 'A Logger instance has already been created. Cannot call basic_config.'
+	assert not state.loggers_created, 'A Logger instance has already been created. Cannot call basic_config.'
+
+	if logger_cache not in ('weak', 'interned', 'bounded'):
+		raise ValueError("logger_cache must be 'weak', 'interned' or 'bounded', got {!r}".format(logger_cache))
+
+	if handlers is None:
+		from logwood.handlers.stderr import ColoredStderrHandler
+		handlers = [ColoredStderrHandler()]
 
 	state.config_called = True
 	record_variables = record_variables or {}
 
 	# Set default record_variables and update with given record_variables
-	default_record_variables = {
-		'hostname': socket.gethostname(),
-		'system_identifier': sys.argv[0]
-	}
+	default_record_variables = _standard_record_variables()
 	default_record_variables.update(record_variables)
 
 	global_config.default_format = format
@@ -37,36 +64,117 @@ level: int = global_config.default_log_level, record_variables: Dict[str, Any] =
 	global_config.default_handlers.clear()
 	global_config.default_handlers.extend(handlers)
 
+	global_config.logger_cache = logger_cache
+	global_config.logger_cache_size = logger_cache_size
+	state.logger_cache.clear()
+
+	global_config.shutdown_timeout = shutdown_timeout
+	from logwood.logger import levels_changed
+	levels_changed()
+	if not state.hooks_registered:
+		import atexit
+		import os
+		from logwood import lifecycle
+		atexit.register(lifecycle.shutdown_at_exit)
+		if hasattr(os, 'register_at_fork'):
+			os.register_at_fork(
+				before = lifecycle.before_fork,
+				after_in_parent = lifecycle.after_fork_in_parent,
+				after_in_child = lifecycle.after_fork_in_child,
+			)
+		state.hooks_registered = True
+
+
+def _standard_record_variables() -> Dict[str, Any]:
+	''' Record variables set by :func:`basic_config` before the given `record_variables`. '''
+	import socket
+	return {
+		'hostname': socket.gethostname(),
+		'system_identifier': sys.argv[0]
+	}
+
 
 def get_logger(name: str) -> Logger:
 	'''
-	Get a configured instance of :class:`Logger`. Instances are cached by name.
+	Get a configured instance of :class:`Logger`. Instances are cached by name, see `logger_cache` of
+	:func:`basic_config`.
 	'''
-	try:
-		logger_weak_ref = state.defined_loggers[name]
-	except KeyError:
-		return _create_logger_instance(name)
-	else:
-		# This check is thread safe, so no locking is required here
+	logger_instance = state.logger_cache.get(name)
+	if logger_instance is not None:
+		if global_config.logger_cache == 'bounded':
+			try:
+				state.logger_cache.move_to_end(name)
+			except KeyError:
+				# Evicted by another thread in the meantime
+				pass
+		return logger_instance
+
+	logger_weak_ref = state.defined_loggers.get(name)
+	if logger_weak_ref is not None:
 		logger_instance = logger_weak_ref()
-		if logger_instance is None:
-			# Logger instance in cache is already dead so we have to create a new one
-			return _create_logger_instance(name)
+	if logger_instance is None:
+		logger_instance = _get_or_create_logger(name)
+	if global_config.logger_cache != 'weak':
+		_cache_logger(name, logger_instance)
+	return logger_instance
 
+
+def _get_or_create_logger(name: str) -> Logger:
+	'''
+	Create a logger unless another thread created it first. Do not call this method directly.
+	'''
+	with state.registry_lock:
+		_remove_dead_loggers()
+		logger_weak_ref = state.defined_loggers.get(name)
+		logger_instance = None if logger_weak_ref is None else logger_weak_ref()
+		if logger_instance is None:
+			logger_instance = _create_logger_instance(name)
 		return logger_instance
 
 
 def _create_logger_instance(name: str) -> Logger:
-	''' Create a new logger instance and cache it. Do not call this method directly. '''
-	logger_instance = Logger(name)
+	''' Create a new logger instance and register it. The caller must hold the registry lock. '''
+	logger_instance = Logger(name, list(state.logger_handlers.get(name, ())))
+	state.loggers_created = True
 	# Register instance in state as weakref so it can be GC when needed.
-	state.defined_loggers[name] = weakref.ref(logger_instance)
+	state.defined_loggers[name] = weakref.ref(logger_instance, lambda ref: state.dead_loggers.append((name, ref)))
 	return logger_instance
 
 
-def shutdown() -> None:
+def _remove_dead_loggers() -> None:
+	'''
+	Remove registry entries of garbage collected loggers. The caller must hold the registry lock.
+	Weakref callbacks cannot take the lock (they may run in a thread which holds it), so they only queue the entries.
+	'''
+	while state.dead_loggers:
+		name, logger_weak_ref = state.dead_loggers.pop()
+		# The name may belong to a newer logger by now
+		if state.defined_loggers.get(name) is logger_weak_ref:
+			del state.defined_loggers[name]
+
+
+def _cache_logger(name: str, logger_instance: Logger) -> None:
+	state.logger_cache[name] = logger_instance
+	if global_config.logger_cache == 'bounded':
+		while len(state.logger_cache) > global_config.logger_cache_size:
+			try:
+				state.logger_cache.popitem(last = False)
+			except KeyError:
+				break
+
+
+def flush(timeout: Optional[float] = None) -> Dict[str, Any]:
+	'''
+	Flush all handlers in parallel, waiting at most `timeout` seconds. See :func:`logwood.lifecycle.flush`.
+	'''
+	from logwood import lifecycle
+	return lifecycle.flush(timeout)
+
+
+def shutdown(timeout: Optional[float] = None) -> Dict[str, Any]:
 	'''
-	Shut down all defined logwood handlers and give them a chance to clean up their resources.
+	Shut down all defined logwood handlers and give them a chance to clean up their resources, waiting at most
+	`timeout` seconds. Return a report of records lost per handler, see :func:`logwood.lifecycle.shutdown`.
 	'''
-	for handler in state.defined_handlers:
-		handler.close()
+	from logwood import lifecycle
+	return lifecycle.shutdown(timeout)
@@ -1,8 +1,14 @@
-from typing import Dict, Any
+from __future__ import annotations
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+	from typing import Dict, Any, FrozenSet, List, Optional
 
 import abc
 import logwood.state
 from logwood import global_config
+from logwood.formatting import CompiledFormat, compile_format
+from logwood.tracebacks import format_exception
 
 
 
@@ -11,20 +17,71 @@ class Handler(abc.ABC):
 	Base handler which only implements filtering records by log level and formats messages.
 	'''
 
+	# Records accepted by the handler which were never written, e.g. dropped from a full buffer or left in a queue
+	# when closing timed out.
+	lost_records = 0
+
 	def __init__(self, level: int = None, format: str = None) -> None:
 		self.level = level
 		self.format = format
 		self.is_shutdown = False
 		logwood.state.defined_handlers.append(self)
+		for hook in logwood.state.handler_hooks:
+			hook(self)
+
+
+	@property
+	def level(self) -> Optional[int]:
+		'''
+		Lowest level of records this handler emits. When None, the default level from :func:`logwood.basic_config` is used.
+		'''
+		return self._level
+
+
+	@level.setter
+	def level(self, level: Optional[int]) -> None:
+		self._level = level
+		import logwood.logger
+		logwood.logger.levels_changed()
+
+
+	@property
+	def format(self) -> Optional[str]:
+		'''
+		Format of this handler's messages. When None, the default format from :func:`logwood.basic_config` is used.
+		'''
+		return self._format
 
 
-	def format_message(self, record: Dict[str, Any]) -> str:
+	@format.setter
+	def format(self, format: Optional[str]) -> None:
+		self._format = format
+		self._compiled_format = None if format is None else compile_format(format)
+		# Loggers decide which optional record fields to collect based on their handlers' formats.
+		import logwood.logger
+		logwood.logger.refresh_loggers()
+
+
+	def record_fields(self) -> FrozenSet[str]:
+		'''
+		Return names of record fields this handler's format references.
+		'''
+		if self._compiled_format is None:
+			return compile_format(global_config.default_format).fields
+		return self._compiled_format.fields
+
+
+	def prepare_message(self, record: Dict[str, Any]) -> None:
 		'''
 		We format our message if args are present and contain data.
 		NOTE that if multiple handlers handle this record, only the first one performs this block.
-		All subsequent handlers share the already-formatted record dict.
+		All subsequent handlers share the already-formatted record dict. The unformatted message and its args are
+		kept in the ``template`` and ``template_args`` fields.
 		'''
 		if 'args' in record and record['args']:
+			# Keep the template and its arguments for handlers which group records by template
+			record['template'] = record['message']
+			record['template_args'] = record['args']
 			# Apply message arguments
 			if '{' in record['message'] and '}' in record['message']:
 				# assume that string can be formatted by ``str.format()``
@@ -35,31 +92,98 @@ class Handler(abc.ABC):
 			# Remove already used args
 			del record['args']
 
+
+	def format_message(self, record: Dict[str, Any], compiled_format: Optional[CompiledFormat] = None) -> str:
+		'''
+		Format the record using this handler's format, or `compiled_format` if given (subclasses use it to pass
+		variants of their format). If the record carries exception info and the format does not reference
+		``exc_text`` directly, the traceback is appended on the following lines.
+		'''
+		self.prepare_message(record)
+		if 'exc_info' in record and 'exc_text' not in record:
+			# Exception info is rendered only when some handler actually emits the record
+			record['exc_text'] = format_exception(record['exc_info'])
+
 		# Use default format if format is not set
-		format = global_config.default_format if self.format is None else self.format
+		compiled_format = compiled_format or self._compiled_format or compile_format(global_config.default_format)
 		# Return formatted message
-		if '{' in format and '}' in format:
-			return format.format(**record)
+		if compiled_format.str_format:
+			message = compiled_format.template.format_map(record)
 		else:
-			return format % record
+			message = compiled_format.template % record
+
+		if 'exc_text' in record and 'exc_text' not in compiled_format.fields:
+			message += '\n' + record['exc_text']
+		return message
+
+
+	def count_written(self, size: int) -> None:
+		'''
+		Called by handlers which encode records themselves with the number of bytes written to their destination.
+		Does nothing unless :mod:`logwood.instrumentation` is enabled.
+		'''
 
 
 	def handle(self, record: Dict[str, Any]) -> None:
 		'''
 		This is the handler's standard entrypoint. This method filters records by handler's log level.
 		'''
-		level = global_config.default_log_level if self.level is None else self.level
+		level = global_config.default_log_level if self._level is None else self._level
 		if record['level_number'] >= level:
 			self.emit(record)
 
 
-	def close(self) -> None:
+	def underlying_handlers(self) -> List[Handler]:
+		'''
+		Return handlers this handler passes records to and closes itself, e.g. the handler wrapped by
+		:class:`ThreadedHandler`. :func:`logwood.shutdown` leaves closing them to this handler.
+		'''
+		return []
+
+
+	def flush(self) -> None:
+		'''
+		Write out records the handler buffers. Handlers without buffers do nothing.
+		'''
+
+
+	def before_fork(self) -> None:
+		'''
+		Called in the parent process right before ``os.fork()``. Buffered records are written out, so that the child
+		does not inherit and write them again. Handlers may also take locks here to keep other threads from adding
+		records, they must release them in both after-fork hooks.
+		'''
+		self.flush()
+
+
+	def after_fork_in_parent(self) -> None:
+		'''
+		Called in the parent process after ``os.fork()``.
+		'''
+
+
+	def after_fork_in_child(self) -> None:
+		'''
+		Called in the child process after ``os.fork()``. Handlers recreate their worker threads, locks and connections
+		here and discard records the parent process is still responsible for.
+		'''
+
+
+	def close(self, timeout: Optional[float] = None) -> None:
 		'''
 		The handler can clean up its resources here.
 		This method removes the handler from logwood's internal list of handlers.
 		Subclasses overriding this method must ensure that this gets called.
+
+		Handlers with queues or buffers stop draining them after `timeout` seconds (None means no limit) and count
+		the records they gave up on in :attr:`lost_records`.
 		'''
-		logwood.state.defined_handlers.remove(self)
+		self.is_shutdown = True
+		try:
+			logwood.state.defined_handlers.remove(self)
+		except ValueError:
+			# Already closed
+			pass
 
 
 	@abc.abstractmethod
@@ -1,12 +1,18 @@
+import collections.abc
 import logging
 import logwood
+from logwood import constants, global_config, state
+from logwood.logger import handlers_level
+from logwood.record import Record, get_context
 
 
 
 def redirect_standard_logging():
 	'''
 	Configure original logging module to send all messages to BridgeHandler.
-	This function does not reset logging module if it was already configured.
+	This function does not reset logging module if it was already configured, the root logger's level is left alone
+	then too. Otherwise it is synchronized with logwood, see :func:`sync_levels`, and kept in sync whenever handlers
+	are added, configured or their levels set.
 	'''
 	logging.basicConfig(
 		level = logging.DEBUG,
@@ -15,30 +21,77 @@ def redirect_standard_logging():
 			BridgeHandler()
 		]
 	)
+	if any(isinstance(handler, BridgeHandler) for handler in logging.getLogger().handlers):
+		sync_levels()
+		if sync_levels not in state.level_hooks:
+			state.level_hooks.append(sync_levels)
+
+
+def sync_levels():
+	'''
+	Set the level of the standard root logger to the lowest level any logwood handler emits, so messages no handler
+	would emit are dropped by ``logging`` before a ``LogRecord`` is created.
+	After :func:`redirect_standard_logging` it is called whenever handlers are added, configured or their levels set,
+	but not when ``global_config.default_log_level`` is assigned directly. Levels set on other standard loggers are kept.
+	'''
+	handlers = list(global_config.default_handlers)
+	for logger_weak_ref in list(state.defined_loggers.values()):
+		logger = logger_weak_ref()
+		if logger is not None:
+			handlers.extend(logger.handlers)
+	logging.getLogger().setLevel(handlers_level(handlers))
 
 
 
 class BridgeHandler(logging.Handler):
 	'''
 	Bridge between original logging module and logwood.
+
+	Records are passed to logwood without being formatted by ``logging``: the message and its args are interpolated
+	by the first logwood handler which emits the record, exception info is rendered lazily like for
+	:meth:`logwood.Logger.exception`. Creation time, logger name and call site are taken from the ``LogRecord``.
 	'''
 
 	def __init__(self, level = logging.NOTSET):
 		super().__init__(level)
 		self._loggers = {}
-		self._base_formatter = logging.Formatter()
 
 
-	def emit(self, record):
-		''' Pass logs to logwood with logger name equal to original logger name. '''
-		name = record.name
-		level = record.levelno
-		# Format message using the original logging formatter so we keep the stack trace.
-		message = self._base_formatter.format(record)
+	def _get_logger(self, name):
 		try:
 			# Cache logger reference so we do not call get_logger for every message.
-			logger = self._loggers[name]
+			return self._loggers[name]
 		except KeyError:
-			self._loggers[name] = logger = logwood.get_logger(name)
+			logger = self._loggers[name] = logwood.get_logger(name)
+			return logger
+
+
+	def emit(self, record):
+		''' Pass logs to logwood with logger name equal to original logger name. '''
+		logger = self._get_logger(record.name)
+		message = record.msg
+		args = record.args
+		if not isinstance(message, str) or isinstance(args, collections.abc.Mapping) or (args and '{' in message):
+			# logwood would interpolate these differently (or not at all), let logging do it now
+			message = record.getMessage()
+			args = ()
+		if record.stack_info:
+			message = '{}\n{}'.format(record.getMessage(), record.stack_info)
+			args = ()
 
-		logger.log(level, message)
+		logwood_record = Record(
+			timestamp = record.created,
+			name = record.name,
+			level_number = record.levelno,
+			level = constants.LOG_LEVEL_NAMES.get(record.levelno, record.levelname),
+			message = message,
+			args = args,
+			filename = record.filename,
+			lineno = record.lineno,
+			funcName = record.funcName,
+		)
+		logwood_record.context = get_context()
+		logwood_record.defaults = logger._static_fields
+		if record.exc_info and record.exc_info[0] is not None:
+			logwood_record['exc_info'] = record.exc_info
+		logger._handle(logwood_record)
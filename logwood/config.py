@@ -0,0 +1,455 @@
+'''
+Declarative configuration.
+
+:func:`load` takes a dict, or a path to a JSON or TOML file, validates all of it, creates the handlers and applies
+the result in one step::
+
+	{
+		"format": "{timestamp} {level} {name}: {message}",
+		"level": "INFO",
+		"record_variables": {"service": "pricer"},
+		"handlers": {
+			"console": {"class": "stderr", "level": "WARNING"},
+			"file": {"class": "threaded", "underlying_handler": {"class": "file", "filename": "app.log"}},
+			"audit_file": {"class": "append", "filename": "audit.log"}
+		},
+		"default_handlers": ["console", "file"],
+		"loggers": {
+			"audit": {"handlers": ["audit_file"]}
+		}
+	}
+
+Handlers are given by their class (an alias from :data:`HANDLER_CLASSES` or a dotted path) and constructor
+arguments. A handler wrapping another one gets the wrapped handler's definition inline. Levels may be names or
+numbers, ``"stream": "stdout"`` or ``"stderr"`` selects a standard stream. Handlers listed under ``loggers`` are
+added to loggers of exactly that name, logwood loggers form no hierarchy and have no filters beyond handler levels.
+
+Loading a configuration when loggers already exist swaps it in place: new handlers are created first, then
+replace the previous configuration's handlers in all loggers, and the previous handlers are closed. Record variables
+of the previous configuration are replaced as well, also in bound loggers, and the logger cache is switched to the
+new ``logger_cache`` and ``logger_cache_size``. :func:`watch` reloads a file whenever it changes.
+'''
+
+from typing import Any, Dict, List, Optional, Tuple, Union # noqa
+import collections
+import importlib
+import inspect
+import json
+import os
+import sys
+import threading
+
+import logwood
+import logwood.logger
+import logwood.state
+from logwood import constants, global_config
+from logwood.base_handler import Handler
+
+
+
+# Short names of the handlers shipped with logwood
+HANDLER_CLASSES = {
+	'stream': 'logwood.handlers.logging.StreamHandler',
+	'file': 'logwood.handlers.logging.FileHandler',
+	'stderr': 'logwood.handlers.stderr.ColoredStderrHandler',
+	'syslog': 'logwood.handlers.logging.SysLogHandler',
+	'chunked_syslog': 'logwood.handlers.chunked.ChunkedSysLogHandler',
+	'syslog_lib': 'logwood.handlers.syslog.SysLogLibHandler',
+	'syslog_unix': 'logwood.handlers.syslog.SysLogUnixHandler',
+	'threaded': 'logwood.handlers.threaded.ThreadedHandler',
+	'json': 'logwood.handlers.json.JsonHandler',
+	'append': 'logwood.handlers.append.AppendFileHandler',
+	'compressed': 'logwood.handlers.compressed.CompressedFileHandler',
+	'aggregating': 'logwood.handlers.aggregating.AggregatingHandler',
+	'metrics': 'logwood.handlers.metrics.MetricsHandler',
+	'shipper': 'logwood.handlers.shipper.ShipperHandler',
+	'buffered': 'logwood.handlers.buffered.ThreadBufferedStreamHandler',
+	'nonblocking': 'logwood.handlers.nonblocking.NonBlockingStreamHandler',
+}
+
+LEVELS = {
+	'CRITICAL': constants.CRITICAL,
+	'FATAL': constants.FATAL,
+	'ERROR': constants.ERROR,
+	'WARNING': constants.WARNING,
+	'WARN': constants.WARN,
+	'INFO': constants.INFO,
+	'DEBUG': constants.DEBUG,
+	'NOTSET': constants.NOTSET,
+}
+
+TOP_LEVEL_KEYS = frozenset((
+	'format', 'level', 'record_variables', 'logger_cache', 'logger_cache_size', 'shutdown_timeout',
+	'handlers', 'default_handlers', 'loggers',
+))
+
+Configuration = collections.namedtuple('Configuration', 'settings, handlers, default_handlers, logger_handlers')
+Configuration.__doc__ = '''
+Validated configuration with created handlers, see :func:`build`.
+`settings` are keyword arguments of :func:`logwood.basic_config` except handlers, `handlers` lists all created
+handlers (not the wrapped ones), `default_handlers` lists the default handlers and `logger_handlers` maps logger
+names to lists of handlers.
+'''
+
+_apply_lock = threading.Lock()
+
+
+
+class ConfigError(ValueError):
+	'''
+	Invalid configuration. `errors` lists all problems found, each prefixed with the path of the offending key.
+	'''
+
+	def __init__(self, errors: List[str]) -> None:
+		super().__init__('Invalid logwood configuration:\n' + '\n'.join('  ' + error for error in errors))
+		self.errors = errors
+
+
+
+def read(source: Union[str, os.PathLike]) -> Dict[str, Any]:
+	'''
+	Read a configuration file. The format is chosen by the suffix: ``.json`` or ``.toml``.
+	'''
+	path = os.fspath(source)
+	suffix = os.path.splitext(path)[1].lower()
+	if suffix == '.json':
+		with open(path, encoding = 'utf-8') as f:
+			try:
+				return json.load(f)
+			except ValueError as e:
+				raise ConfigError(['{}: {}'.format(path, e)]) from e
+	if suffix == '.toml':
+		try:
+			import tomllib
+		except ImportError:
+			try:
+				import tomli as tomllib
+			except ImportError:
+				raise ConfigError(['{}: reading TOML requires Python 3.11 or the tomli package'.format(path)]) from None
+		with open(path, 'rb') as f:
+			try:
+				return tomllib.load(f)
+			except tomllib.TOMLDecodeError as e:
+				raise ConfigError(['{}: {}'.format(path, e)]) from e
+	raise ConfigError(['{}: unknown configuration format, use a .json or .toml file'.format(path)])
+
+
+def _level(value: Any, path: str, errors: List[str]) -> Optional[int]:
+	if isinstance(value, bool):
+		pass
+	elif isinstance(value, int):
+		return value
+	elif isinstance(value, str) and value.upper() in LEVELS:
+		return LEVELS[value.upper()]
+	errors.append('{}: unknown level {!r}'.format(path, value))
+	return None
+
+
+def _handler_class(name: Any, path: str, errors: List[str]) -> Optional[type]:
+	if not isinstance(name, str):
+		errors.append('{}.class: must be a string, got {!r}'.format(path, name))
+		return None
+	dotted = HANDLER_CLASSES.get(name, name)
+	module_name, _, class_name = dotted.rpartition('.')
+	try:
+		cls = getattr(importlib.import_module(module_name), class_name)
+	except (ImportError, AttributeError, ValueError) as e:
+		errors.append('{}.class: cannot import {!r}: {}'.format(path, dotted, e))
+		return None
+	if not (isinstance(cls, type) and issubclass(cls, Handler)):
+		errors.append('{}.class: {!r} is not a logwood handler'.format(path, dotted))
+		return None
+	return cls
+
+
+def _check_handler(definition: Any, path: str, errors: List[str]) -> Optional[Tuple[type, Dict[str, Any]]]:
+	'''
+	Validate a handler definition without creating anything. Return the class and constructor arguments, in which
+	nested handler definitions are replaced by their own (class, arguments) tuples.
+	'''
+	if not isinstance(definition, dict):
+		errors.append('{}: handler definition must be a table, got {!r}'.format(path, definition))
+		return None
+	if 'class' not in definition:
+		errors.append('{}: missing handler class'.format(path))
+		return None
+	cls = _handler_class(definition['class'], path, errors)
+	kwargs = {} # type: Dict[str, Any]
+	for key, value in definition.items():
+		if key == 'class':
+			continue
+		if isinstance(value, dict) and 'class' in value:
+			value = _check_handler(value, '{}.{}'.format(path, key), errors)
+		elif key == 'level' and value is not None:
+			value = _level(value, '{}.level'.format(path), errors)
+		elif key == 'stream' and isinstance(value, str):
+			if value not in ('stdout', 'stderr'):
+				errors.append('{}.stream: must be "stdout" or "stderr", got {!r}'.format(path, value))
+			value = getattr(sys, value, None)
+		elif key == 'address' and isinstance(value, list):
+			value = tuple(value)
+		kwargs[key] = value
+	if cls is None:
+		return None
+	try:
+		inspect.signature(cls).bind(**kwargs)
+	except TypeError as e:
+		errors.append('{}: invalid arguments of {}: {}'.format(path, cls.__name__, e))
+		return None
+	return cls, kwargs
+
+
+def _handler_names(value: Any, path: str, handlers: Dict[str, Any], errors: List[str]) -> List[str]:
+	if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+		errors.append('{}: must be a list of handler names, got {!r}'.format(path, value))
+		return []
+	for name in value:
+		if name not in handlers:
+			errors.append('{}: unknown handler {!r}'.format(path, name))
+	return [name for name in value if name in handlers]
+
+
+def _is_spec(value: Any) -> bool:
+	return isinstance(value, tuple) and len(value) == 2 and isinstance(value[0], type)
+
+
+def _create(spec: Tuple[type, Dict[str, Any]], created: List[Handler]) -> Handler:
+	cls, kwargs = spec
+	kwargs = {key: _create(value, created) if _is_spec(value) else value for key, value in kwargs.items()}
+	handler = cls(**kwargs)
+	created.append(handler)
+	return handler
+
+
+def build(data: Dict[str, Any]) -> Configuration:
+	'''
+	Validate the whole configuration and create its handlers. Raise :class:`ConfigError` listing all problems
+	found, before any handler is created. Without `default_handlers` a :class:`ColoredStderrHandler` is the default
+	handler, as with :func:`logwood.basic_config`.
+	'''
+	errors = [] # type: List[str]
+	if not isinstance(data, dict):
+		raise ConfigError(['configuration must be a table, got {!r}'.format(data)])
+	for key in data:
+		if key not in TOP_LEVEL_KEYS:
+			errors.append('{}: unknown key'.format(key))
+
+	settings = {} # type: Dict[str, Any]
+	if 'format' in data:
+		if isinstance(data['format'], str):
+			settings['format'] = data['format']
+		else:
+			errors.append('format: must be a string, got {!r}'.format(data['format']))
+	if 'level' in data:
+		settings['level'] = _level(data['level'], 'level', errors)
+	if 'record_variables' in data:
+		if isinstance(data['record_variables'], dict):
+			settings['record_variables'] = data['record_variables']
+		else:
+			errors.append('record_variables: must be a table, got {!r}'.format(data['record_variables']))
+	if 'logger_cache' in data:
+		if data['logger_cache'] in ('weak', 'interned', 'bounded'):
+			settings['logger_cache'] = data['logger_cache']
+		else:
+			errors.append("logger_cache: must be 'weak', 'interned' or 'bounded', got {!r}".format(data['logger_cache']))
+	if 'logger_cache_size' in data:
+		if isinstance(data['logger_cache_size'], int) and data['logger_cache_size'] > 0:
+			settings['logger_cache_size'] = data['logger_cache_size']
+		else:
+			errors.append('logger_cache_size: must be a positive integer, got {!r}'.format(data['logger_cache_size']))
+	if 'shutdown_timeout' in data:
+		if data['shutdown_timeout'] is None or isinstance(data['shutdown_timeout'], (int, float)):
+			settings['shutdown_timeout'] = data['shutdown_timeout']
+		else:
+			errors.append('shutdown_timeout: must be a number, got {!r}'.format(data['shutdown_timeout']))
+
+	specs = collections.OrderedDict() # type: Dict[str, Any]
+	handler_definitions = data.get('handlers', {})
+	if not isinstance(handler_definitions, dict):
+		errors.append('handlers: must be a table, got {!r}'.format(handler_definitions))
+		handler_definitions = {}
+	for name, definition in handler_definitions.items():
+		specs[name] = _check_handler(definition, 'handlers.{}'.format(name), errors)
+
+	default_names = _handler_names(data.get('default_handlers', []), 'default_handlers', specs, errors)
+	if 'default_handlers' not in data:
+		specs[None] = _check_handler({'class': 'stderr'}, 'default_handlers', errors)
+		default_names = [None]
+	logger_names = {} # type: Dict[str, List[str]]
+	loggers = data.get('loggers', {})
+	if not isinstance(loggers, dict):
+		errors.append('loggers: must be a table, got {!r}'.format(loggers))
+		loggers = {}
+	for logger_name, logger_definition in loggers.items():
+		path = 'loggers.{}'.format(logger_name)
+		if not isinstance(logger_definition, dict):
+			errors.append('{}: must be a table, got {!r}'.format(path, logger_definition))
+			continue
+		for key in logger_definition:
+			if key != 'handlers':
+				errors.append('{}.{}: unknown key, loggers only have handlers'.format(path, key))
+		logger_names[logger_name] = _handler_names(logger_definition.get('handlers', []), path + '.handlers', specs, errors)
+
+	if errors:
+		raise ConfigError(errors)
+
+	created = [] # type: List[Handler]
+	try:
+		handlers = {name: _create(spec, created) for name, spec in specs.items()}
+	except Exception:
+		for handler in reversed(created):
+			handler.close()
+		raise
+	return Configuration(
+		settings,
+		list(handlers.values()),
+		[handlers[name] for name in default_names],
+		{logger_name: [handlers[name] for name in names] for logger_name, names in logger_names.items()},
+	)
+
+
+def _replace_handlers(logger: logwood.Logger, old: List[Handler], new: List[Handler]) -> None:
+	old_ids = {id(handler) for handler in old}
+	# Slice assignment swaps the list contents at once and keeps the list shared with bound loggers
+	logger.handlers[:] = [handler for handler in logger.handlers if id(handler) not in old_ids] + new
+
+
+def _replace_record_variables(old: Dict[str, Any], new: Dict[str, Any]) -> None:
+	'''
+	Replace record variables set by the previous configuration with `new`. Variables the previous configuration set
+	and `new` lacks are dropped, or set back to the value of :func:`logwood.basic_config` for the standard ones.
+	'''
+	variables = global_config.default_record_variables
+	standard = logwood._standard_record_variables()
+	for key in old:
+		if key not in new:
+			if key in standard:
+				variables[key] = standard[key]
+			else:
+				variables.pop(key, None)
+	variables.update(new)
+	logwood.logger.refresh_record_variables()
+
+
+def _apply_logger_cache(settings: Dict[str, Any]) -> None:
+	'''
+	Switch the logger cache of :func:`logwood.get_logger`. The caller must hold the registry lock.
+	'''
+	global_config.logger_cache = settings.get('logger_cache', global_config.logger_cache)
+	global_config.logger_cache_size = settings.get('logger_cache_size', global_config.logger_cache_size)
+	if global_config.logger_cache == 'weak':
+		logwood.state.logger_cache.clear()
+	elif global_config.logger_cache == 'bounded':
+		while len(logwood.state.logger_cache) > global_config.logger_cache_size:
+			try:
+				logwood.state.logger_cache.popitem(last = False)
+			except KeyError:
+				break
+
+
+def apply(configuration: Configuration) -> None:
+	'''
+	Make `configuration` the active configuration. Handlers of the previously applied configuration are replaced in all
+	loggers and closed, and so are default handlers set with :func:`logwood.basic_config`.
+	'''
+	with _apply_lock:
+		previous = logwood.state.configuration
+		# Handlers of the previous configuration and default handlers given to basic_config directly are replaced
+		replaced = [] if previous is None else list(previous.handlers)
+		replaced.extend(handler for handler in global_config.default_handlers if handler not in replaced)
+		with logwood.state.registry_lock:
+			if not logwood.state.loggers_created:
+				logwood.basic_config(handlers = configuration.default_handlers, **configuration.settings)
+			else:
+				settings = configuration.settings
+				global_config.default_format = settings.get('format', global_config.default_format)
+				global_config.default_log_level = settings.get('level', global_config.default_log_level)
+				previous_variables = {} if previous is None else previous.settings.get('record_variables', {})
+				_replace_record_variables(previous_variables, settings.get('record_variables', {}))
+				_apply_logger_cache(settings)
+				global_config.shutdown_timeout = settings.get('shutdown_timeout', global_config.shutdown_timeout)
+				global_config.default_handlers[:] = configuration.default_handlers
+			logwood.state.logger_handlers = configuration.logger_handlers
+
+			previous_logger_handlers = {} if previous is None else previous.logger_handlers
+			for logger_weak_ref in list(logwood.state.defined_loggers.values()):
+				logger = logger_weak_ref()
+				if logger is not None:
+					_replace_handlers(logger, previous_logger_handlers.get(logger.name, []), configuration.logger_handlers.get(logger.name, []))
+		logwood.state.configuration = configuration
+		logwood.logger.refresh_loggers()
+		logwood.logger.levels_changed()
+
+	if replaced:
+		from logwood import lifecycle
+		lifecycle.close_handlers(replaced, global_config.shutdown_timeout)
+
+
+def load(source: Union[Dict[str, Any], str, os.PathLike]) -> Configuration:
+	'''
+	Validate and apply a configuration given as a dict or a path to a JSON or TOML file.
+	The first configuration is applied with :func:`logwood.basic_config`, later ones are swapped in place.
+	Raise :class:`ConfigError` if the configuration is invalid, the active configuration is then left unchanged.
+	'''
+	data = source if isinstance(source, dict) else read(source)
+	configuration = build(data)
+	apply(configuration)
+	return configuration
+
+
+
+class Watcher:
+	'''
+	Thread reloading a configuration file whenever its modification time changes. Created by :func:`watch`.
+	Invalid configurations are reported to the last resort handler and the active configuration is kept.
+	'''
+
+	def __init__(self, path: Union[str, os.PathLike], interval: float = 1.0) -> None:
+		self.path = os.fspath(path)
+		self.interval = interval
+		self._mtime = self._stat()
+		self._stop = threading.Event()
+		self._thread = threading.Thread(target = self._run, name = 'logwood-config-watcher', daemon = True)
+		self._thread.start()
+
+
+	def _stat(self) -> Optional[int]:
+		try:
+			return os.stat(self.path).st_mtime_ns
+		except OSError:
+			return None
+
+
+	def check(self) -> bool:
+		'''
+		Reload the file if it changed since the last check. Return whether a new configuration was applied.
+		'''
+		mtime = self._stat()
+		if mtime is None or mtime == self._mtime:
+			return False
+		self._mtime = mtime
+		try:
+			load(self.path)
+		except Exception:
+			global_config.last_resort_handler({'message': 'Cannot reload logwood configuration from {}'.format(self.path)})
+			return False
+		return True
+
+
+	def _run(self) -> None:
+		while not self._stop.wait(self.interval):
+			self.check()
+
+
+	def stop(self) -> None:
+		self._stop.set()
+		self._thread.join()
+
+
+
+def watch(path: Union[str, os.PathLike], interval: float = 1.0) -> Watcher:
+	'''
+	Load the configuration file at `path` and reload it whenever it changes, checking every `interval` seconds.
+	'''
+	load(path)
+	return Watcher(path, interval)
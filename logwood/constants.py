@@ -1,15 +1,12 @@
-import logging
-
-
-
-CRITICAL = logging.CRITICAL
-FATAL = logging.FATAL
-ERROR = logging.ERROR
-WARNING = logging.WARNING
-WARN = logging.WARN
-INFO = logging.INFO
-DEBUG = logging.DEBUG
-NOTSET = logging.NOTSET
+# Same values as in the standard logging module, defined here so that importing logwood does not import logging.
+CRITICAL = 50
+FATAL = CRITICAL
+ERROR = 40
+WARNING = 30
+WARN = WARNING
+INFO = 20
+DEBUG = 10
+NOTSET = 0
 
 LOG_LEVEL_NAMES = {
 	FATAL: 'FATAL',
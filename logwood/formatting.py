@@ -0,0 +1,52 @@
+'''
+Compiled handler formats.
+
+Every format string is inspected only once to find out its formatting style and which record fields it references.
+The result is cached, so handlers and loggers can cheaply ask which fields they will need.
+'''
+
+from __future__ import annotations
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+	from typing import Dict, FrozenSet
+import collections
+
+
+
+# Record fields describing the place where a logging method was called.
+CALL_SITE_FIELDS = frozenset(('filename', 'lineno', 'funcName'))
+
+CompiledFormat = collections.namedtuple('CompiledFormat', 'template, str_format, fields')
+
+_compiled_formats = {} # type: Dict[str, CompiledFormat]
+
+
+
+def compile_format(format: str) -> CompiledFormat:
+	'''
+	Return a :class:`CompiledFormat` describing `format`: the template itself, whether it should be formatted
+	with ``str.format()`` (instead of %-formatting) and a frozenset of record field names it uses.
+	'''
+	try:
+		return _compiled_formats[format]
+	except KeyError:
+		pass
+
+	# Formats are compiled rarely, do not slow down importing logwood with these modules
+	import re
+	import string
+
+	str_format = '{' in format and '}' in format
+	if str_format:
+		fields = frozenset(
+			# Strip attribute access and indexing, e.g. {timestamp.real} or {args[0]}
+			re.split(r'[.\[]', field_name, 1)[0]
+			for _, field_name, _, _ in string.Formatter().parse(format)
+			if field_name
+		)
+	else:
+		fields = frozenset(re.findall(r'%\((\w+)\)', format))
+
+	compiled = _compiled_formats[format] = CompiledFormat(format, str_format, fields) # type: CompiledFormat
+	return compiled
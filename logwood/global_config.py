@@ -6,6 +6,18 @@ default_log_level = constants.INFO
 
 default_handlers = [] # type: List[logwood.base_handler.Handler]
 
+# How get_logger caches loggers: 'weak', 'interned' or 'bounded', see logwood.basic_config.
+logger_cache = 'weak'
+
+logger_cache_size = 1000
+
+# Seconds handlers get to write out queued records when the program exits, see logwood.lifecycle.
+shutdown_timeout = 5.0
+
+# Seconds handlers with queues get to write them out before os.fork(), see logwood.lifecycle. Never unlimited, a slow
+# destination must not stall every fork.
+fork_timeout = 5.0
+
 default_format = "[%(timestamp)s][%(hostname)s][%(system_identifier)s][%(name)s][%(level)s] %(message)s"
 
 default_record_variables = {
@@ -0,0 +1,198 @@
+from typing import Any, Deque, Dict, FrozenSet, List, Optional, Tuple # noqa
+import collections
+import random
+import threading
+import time
+
+from logwood import constants, global_config
+from logwood.base_handler import Handler
+from logwood.record import Record
+
+
+
+class AggregatingHandler(Handler):
+	'''
+	Counts records per logger name, level and message template (the message before its args are applied) in time
+	windows of `window` seconds, instead of writing them out. For every template a reservoir sample of up to
+	`sample_size` args tuples is kept, so the values a call site logs can be inspected too.
+
+	A window is closed when a record of the next window arrives, on :meth:`flush` and on :meth:`close`. Closed
+	windows are kept in :attr:`history` (the last `history` windows) and, with a `summary_handler`, emitted to it as
+	one record per template, with the level of the counted records and ``count``, ``message_template``, ``samples``
+	and ``window_start`` fields (not ``template``, which handlers treat as the record's own unformatted message).
+	:meth:`current` returns the counts of the open window.
+
+	Up to `max_templates` templates are tracked per window, records with further templates are counted under the
+	template None. Messages which are not strings are counted under their ``repr()``.
+	'''
+
+	SUMMARY_FORMAT = '{count} records in {window:.0f} s: {template}'
+
+	def __init__(self, level: int = None, summary_handler: Optional[Handler] = None, *, window: float = 60.0,
+	sample_size: int = 5, max_templates: int = 10000, history: int = 10) -> None:
+		super().__init__(level)
+		self.summary_handler = summary_handler
+		self.window = window
+		self.sample_size = sample_size
+		self.max_templates = max_templates
+		self.history = collections.deque(maxlen = history) # type: Deque[Dict[str, Any]]
+		self._random = random.Random()
+		self._lock = threading.Lock()
+		self._reset(None)
+
+
+	def _reset(self, window_start: Optional[float]) -> None:
+		self._window_start = window_start
+		# (name, level number, template) -> [count, samples]
+		self._counts = {} # type: Dict[Tuple[str, int, Optional[str]], List[Any]]
+
+
+	def record_fields(self) -> FrozenSet[str]:
+		''' Records are not formatted, no optional fields are needed. '''
+		return frozenset()
+
+
+	def underlying_handlers(self) -> List[Handler]:
+		return [] if self.summary_handler is None else [self.summary_handler]
+
+
+	def emit(self, record: Dict[str, Any]) -> None:
+		if 'template' in record:
+			# Already formatted by another handler
+			template, args = record['template'], record['template_args']
+		else:
+			template, args = record['message'], record.get('args')
+		if not isinstance(template, str):
+			# Any object may be logged as the message, it may not be hashable
+			template = repr(template)
+		timestamp = record['timestamp']
+		key = (record['name'], record['level_number'], template)
+
+		summary = None
+		with self._lock:
+			if self._window_start is None:
+				self._window_start = timestamp - timestamp % self.window
+			elif timestamp >= self._window_start + self.window:
+				summary = self._close_window(timestamp - timestamp % self.window)
+			entry = self._counts.get(key)
+			if entry is None:
+				if len(self._counts) >= self.max_templates:
+					key = (record['name'], record['level_number'], None)
+					entry = self._counts.get(key)
+				if entry is None:
+					entry = self._counts[key] = [0, []]
+			entry[0] += 1
+			if args:
+				# Reservoir sampling: every args tuple seen in the window is in the sample with the same probability
+				samples = entry[1]
+				if len(samples) < self.sample_size:
+					samples.append(args)
+				else:
+					i = self._random.randrange(entry[0])
+					if i < self.sample_size:
+						samples[i] = args
+		if summary is not None:
+			self._emit_summary(summary)
+
+
+	def _summary(self, window_end: float) -> Dict[str, Any]:
+		''' Describe the open window. The caller must hold the lock. '''
+		templates = [
+			{
+				'name': name,
+				'level': constants.LOG_LEVEL_NAMES.get(level_number, str(level_number)),
+				'level_number': level_number,
+				'template': template,
+				'count': count,
+				'samples': list(samples),
+			}
+			for (name, level_number, template), (count, samples) in self._counts.items()
+		]
+		templates.sort(key = lambda entry: entry['count'], reverse = True)
+		return {
+			'start': self._window_start,
+			'end': window_end,
+			'records': sum(entry['count'] for entry in templates),
+			'templates': templates,
+		}
+
+
+	def _close_window(self, next_window_start: Optional[float]) -> Optional[Dict[str, Any]]:
+		'''
+		Store the summary of the open window in the history and start the next one. Return the summary.
+		The caller must hold the lock.
+		'''
+		if self._window_start is None:
+			return None
+		summary = self._summary(self._window_start + self.window)
+		self._reset(next_window_start)
+		self.history.append(summary)
+		return summary
+
+
+	def _emit_summary(self, summary: Dict[str, Any]) -> None:
+		if self.summary_handler is None:
+			return
+		for entry in summary['templates']:
+			record = Record(
+				timestamp = time.time(),
+				name = entry['name'],
+				level_number = entry['level_number'],
+				level = entry['level'],
+				message = self.SUMMARY_FORMAT.format(window = summary['end'] - summary['start'], **entry),
+				count = entry['count'],
+				message_template = entry['template'],
+				samples = entry['samples'],
+				window_start = summary['start'],
+			)
+			record.context = {}
+			record.defaults = global_config.default_record_variables
+			try:
+				self.summary_handler.handle(record)
+			except Exception:
+				global_config.last_resort_handler(record)
+
+
+	def current(self) -> Dict[str, Any]:
+		'''
+		Return the summary of the open window: ``start``, ``end``, ``records`` (the total count) and ``templates``, a
+		list of dicts with ``name``, ``level``, ``level_number``, ``template``, ``count`` and ``samples`` sorted by
+		count, most frequent first.
+		'''
+		with self._lock:
+			start = self._window_start
+			return self._summary(None if start is None else start + self.window)
+
+
+	def flush(self) -> None:
+		''' Close the open window. '''
+		with self._lock:
+			summary = self._close_window(None)
+		if summary is not None:
+			self._emit_summary(summary)
+
+
+	def before_fork(self) -> None:
+		''' Hold the lock until the fork is done, so the child gets consistent counts. '''
+		self._lock.acquire()
+
+
+	def after_fork_in_parent(self) -> None:
+		self._lock.release()
+
+
+	def after_fork_in_child(self) -> None:
+		''' Start counting from scratch, records counted so far are reported by the parent. '''
+		self._lock = threading.Lock()
+		self._reset(None)
+		self.history.clear()
+
+
+	def close(self, timeout: Optional[float] = None) -> None:
+		'''
+		Close the open window and the summary handler.
+		'''
+		super().close(timeout)
+		self.flush()
+		if self.summary_handler is not None:
+			self.summary_handler.close(timeout)
@@ -0,0 +1,164 @@
+from typing import Any, Dict, List, Optional # noqa
+import os
+import threading
+import time
+
+from logwood import global_config
+from logwood.base_handler import Handler
+
+
+
+class BatchingFileHandler(Handler):
+	'''
+	Base of file handlers which collect encoded lines into batches and write every batch with a single ``os.write``
+	to a file opened with ``O_APPEND``.
+
+	A batch is written when :meth:`_batch_full` says so, when `flush_interval` seconds passed since its first record
+	(checked by every emit and by a helper thread started with the first batch, so records of an idle logger are
+	written too), on :meth:`flush`, before a fork and on :meth:`close`. Subclasses may transform a batch before it is
+	written (:meth:`_encode_batch`) and add the end of the file's contents on close (:meth:`_finish`).
+	'''
+
+	terminator = '\n'
+
+	def __init__(self, level: int = None, format: str = None, filename: str = None, encoding: str = 'utf-8',
+	flush_interval: float = 1.0, delay: bool = False) -> None:
+		super().__init__(level, format)
+		self.base_filename = os.path.abspath(filename)
+		self.encoding = encoding
+		self.flush_interval = flush_interval
+		self._batch = [] # type: List[bytes]
+		self._batch_bytes = 0
+		self._batch_started = 0.0
+		self._lock = threading.Lock()
+		self._closing = threading.Event()
+		self._flusher = None # type: Optional[threading.Thread]
+		self.fd = None # type: Optional[int]
+		if not delay:
+			self.fd = self._open()
+
+
+	def _open(self) -> int:
+		return os.open(self.base_filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_CLOEXEC', 0), 0o644)
+
+
+	def _write(self, data: bytes) -> None:
+		''' Write `data` with one ``os.write``, opening the file first if needed. The caller must hold the lock. '''
+		if not data:
+			return
+		if self.fd is None:
+			self.fd = self._open()
+		size = len(data)
+		written = os.write(self.fd, data)
+		# Short writes only happen in exceptional situations (e.g. a full disk), finish the write anyway
+		while written < len(data):
+			data = data[written:]
+			written = os.write(self.fd, data)
+		self.count_written(size)
+
+
+	def emit(self, record: Dict[str, Any]) -> None:
+		data = (self.format_message(record) + self.terminator).encode(self.encoding)
+		with self._lock:
+			if self.is_shutdown:
+				raise RuntimeError('{} is closed'.format(type(self).__name__))
+			self._add(data, record['timestamp'])
+
+
+	def _add(self, data: bytes, timestamp: float) -> None:
+		''' Add an encoded line to the batch, write the batch if it is due. The caller must hold the lock. '''
+		if not self._batch:
+			self._batch_started = timestamp
+			if self._flusher is None and self.flush_interval > 0:
+				self._start_flusher()
+		self._batch.append(data)
+		self._batch_bytes += len(data)
+		if self._batch_full() or timestamp - self._batch_started >= self.flush_interval:
+			self._write_batch()
+
+
+	def _batch_full(self) -> bool:
+		''' Return whether the current batch is to be written now. '''
+		return False
+
+
+	def _encode_batch(self, data: bytes) -> bytes:
+		''' Return the bytes written for the lines of a batch. '''
+		return data
+
+
+	def _finish(self) -> bytes:
+		''' Return bytes written after the last batch when the handler is closed. '''
+		return b''
+
+
+	def _write_batch(self) -> None:
+		''' Write the current batch. The caller must hold the lock. '''
+		if not self._batch:
+			return
+		data = b''.join(self._batch)
+		self._batch = []
+		self._batch_bytes = 0
+		self._write(self._encode_batch(data))
+
+
+	def _start_flusher(self) -> None:
+		self._flusher = threading.Thread(target = self._flush_loop, name = 'logwood-batch-flusher', daemon = True)
+		self._flusher.start()
+
+
+	def _flush_loop(self) -> None:
+		''' Write batches which are `flush_interval` seconds old when no further record arrives to do it. '''
+		delay = self.flush_interval
+		while not self._closing.wait(delay):
+			delay = self.flush_interval
+			try:
+				with self._lock:
+					# After close nothing may be written
+					if self._batch and not self._closing.is_set():
+						age = time.time() - self._batch_started
+						if age >= self.flush_interval:
+							self._write_batch()
+						else:
+							delay = self.flush_interval - age
+			except Exception:
+				global_config.last_resort_handler({'message': '{} failed to write a batch'.format(type(self).__name__)})
+
+
+	def flush(self) -> None:
+		''' Write out records collected in the current batch. '''
+		with self._lock:
+			self._write_batch()
+
+
+	def before_fork(self) -> None:
+		'''
+		Write out the current batch and hold the lock until the fork is done, so the child starts with an empty batch.
+		'''
+		self._lock.acquire()
+		self._write_batch()
+
+
+	def after_fork_in_parent(self) -> None:
+		self._lock.release()
+
+
+	def after_fork_in_child(self) -> None:
+		''' The parent's helper thread does not exist in the child, the next batch starts a new one. '''
+		self._lock = threading.Lock()
+		self._closing = threading.Event()
+		self._flusher = None
+
+
+	def close(self, timeout: Optional[float] = None) -> None:
+		'''
+		Write out the current batch and close the file. Records emitted afterwards raise :class:`RuntimeError`.
+		'''
+		super().close(timeout)
+		self._closing.set()
+		with self._lock:
+			self._write_batch()
+			if self.fd is not None:
+				self._write(self._finish())
+				os.close(self.fd)
+				self.fd = None
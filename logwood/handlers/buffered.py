@@ -0,0 +1,176 @@
+from typing import Any, Deque, Dict, List, Optional, Tuple # noqa
+import collections
+import heapq
+import operator
+import threading
+import time
+import weakref
+
+from logwood import global_config
+from logwood.handlers.logging import StreamHandler
+
+
+
+class ThreadBufferedStreamHandler(StreamHandler):
+	'''
+	Thread-safe stream handler for heavily multithreaded programs.
+
+	Logging threads never touch the stream. Each of them appends formatted lines to its own buffer (a deque, whose
+	appends need no lock) and a single writer thread periodically merges all buffers and writes them to the stream
+	in one large chunk. Lines therefore never interleave and logging threads do not contend for the stream's lock.
+
+	With `ordered` set, lines from different threads written in one chunk are sorted by record timestamp.
+	Lines are written within `flush_interval` seconds, or sooner when some thread buffers `chunk_lines` lines.
+	Lines of a chunk the stream fails to write are counted in :attr:`lost_records`.
+	'''
+
+	def __init__(self, level: int = None, format: str = None, stream = None, *, flush_interval: float = 0.1,
+	chunk_lines: int = 1000, ordered: bool = False) -> None:
+		super().__init__(level, format, stream)
+		self.flush_interval = flush_interval
+		self.chunk_lines = chunk_lines
+		self.ordered = ordered
+		self._local = threading.local()
+		# (owning thread, buffer) pairs. Buffers of finished threads are dropped once they are empty.
+		self._buffers = [] # type: List[Tuple[weakref.ref, Deque[Tuple[float, str]]]]
+		self._buffers_lock = threading.Lock()
+		# Serializes writers, i.e. the writer thread and explicit flush() calls. Logging threads never take it.
+		self._write_lock = threading.Lock()
+		self._wakeup = threading.Event()
+		self._closing = False
+		self._writer = self._start_writer()
+
+
+	def _start_writer(self) -> threading.Thread:
+		writer = threading.Thread(target = self._write_loop, name = 'logwood-buffered-writer', daemon = True)
+		writer.start()
+		return writer
+
+
+	def _thread_buffer(self) -> Deque[Tuple[float, str]]:
+		buffer = collections.deque() # type: Deque[Tuple[float, str]]
+		with self._buffers_lock:
+			self._buffers.append((weakref.ref(threading.current_thread()), buffer))
+		self._local.buffer = buffer
+		return buffer
+
+
+	def emit(self, record: Dict[str, Any]) -> None:
+		'''
+		Append the formatted record to the current thread's buffer.
+		'''
+		if self.is_shutdown:
+			raise RuntimeError('ThreadBufferedStreamHandler is closed')
+		try:
+			buffer = self._local.buffer
+		except AttributeError:
+			buffer = self._thread_buffer()
+		buffer.append((record['timestamp'], self.format_message(record) + self.terminator))
+		if len(buffer) >= self.chunk_lines:
+			self._wakeup.set()
+
+
+	def _drain(self) -> List[str]:
+		'''
+		Take all lines currently buffered by all threads.
+		'''
+		with self._buffers_lock:
+			buffers = list(self._buffers)
+		chunks = [] # type: List[List[Tuple[float, str]]]
+		finished = []
+		for thread_ref, buffer in buffers:
+			# Only pop what is there now, owners may keep appending concurrently.
+			count = len(buffer)
+			if count:
+				chunks.append([buffer.popleft() for _ in range(count)])
+			elif thread_ref() is None or not thread_ref().is_alive():
+				finished.append(buffer)
+		if finished:
+			finished_ids = {id(buffer) for buffer in finished}
+			with self._buffers_lock:
+				self._buffers = [entry for entry in self._buffers if id(entry[1]) not in finished_ids]
+
+		if self.ordered and len(chunks) > 1:
+			return [line for _, line in heapq.merge(*chunks, key = operator.itemgetter(0))]
+		return [line for chunk in chunks for _, line in chunk]
+
+
+	def _write_lines(self, lines: List[str]) -> None:
+		''' Write drained lines in one chunk. The caller must hold the write lock. '''
+		if not lines:
+			return
+		try:
+			self.stream.write(''.join(lines))
+		except Exception:
+			# The lines already left the buffers, nobody will write them
+			self.lost_records += len(lines)
+			raise
+
+
+	def flush(self) -> None:
+		'''
+		Write all buffered lines to the stream now.
+		'''
+		with self._write_lock:
+			self._write_lines(self._drain())
+			super().flush()
+
+
+	def before_fork(self) -> None:
+		'''
+		Write out all buffered lines and hold the write lock until the fork is done.
+		'''
+		self._write_lock.acquire()
+		self._write_lines(self._drain())
+		StreamHandler.flush(self)
+
+
+	def after_fork_in_parent(self) -> None:
+		self._write_lock.release()
+
+
+	def after_fork_in_child(self) -> None:
+		'''
+		Start with empty buffers and a new writer thread. Lines other threads buffered after the parent's last write
+		are left to the parent.
+		'''
+		self._local = threading.local()
+		self._buffers = []
+		self._buffers_lock = threading.Lock()
+		self._write_lock = threading.Lock()
+		self._wakeup = threading.Event()
+		if not self._closing:
+			self._writer = self._start_writer()
+
+
+	def _write_loop(self) -> None:
+		while not self._closing:
+			self._wakeup.wait(self.flush_interval)
+			self._wakeup.clear()
+			try:
+				self.flush()
+			except Exception:
+				global_config.last_resort_handler({'message': 'ThreadBufferedStreamHandler failed to write buffered lines'})
+
+
+	def close(self, timeout: Optional[float] = None) -> None:
+		'''
+		Stop the writer thread and write out all remaining lines. The stream is not closed.
+		If the stream does not accept the lines within `timeout` seconds, they are counted in :attr:`lost_records`.
+		Records emitted afterwards raise :class:`RuntimeError`.
+		'''
+		super().close(timeout)
+		deadline = None if timeout is None else time.monotonic() + timeout
+		self._closing = True
+		self._wakeup.set()
+		self._writer.join(timeout)
+		remaining = -1 if deadline is None else max(deadline - time.monotonic(), 0)
+		# A writer stuck in stream.write holds the lock
+		if self._write_lock.acquire(timeout = remaining):
+			try:
+				self._write_lines(self._drain())
+				StreamHandler.flush(self)
+			finally:
+				self._write_lock.release()
+		else:
+			self.lost_records += len(self._drain())
@@ -2,6 +2,7 @@ from typing import Iterator, Dict, Any
 import math
 
 import logwood.handlers.logging
+from logwood.tracebacks import format_exception
 
 
 
@@ -21,10 +22,14 @@ class ChunkedSysLogHandler(logwood.handlers.logging.SysLogHandler):
 		'''
 		Emit a record via parent implementation. Long records are chunked and each chunk is emitted separately.
 		'''
-		# Let formatter format message in record
-		self.format_message(record)
-		# Extract this message from record
+		# Render the message and the traceback in record, each chunk is formatted on its own
+		self.prepare_message(record)
+		if 'exc_info' in record and 'exc_text' not in record:
+			record['exc_text'] = format_exception(record['exc_info'])
+		# Extract this message from record, the traceback (if any) is chunked together with it
 		message = record['message']
+		if 'exc_text' in record:
+			message += '\n' + record['exc_text']
 		for chunk in self._chunk_records(message, record):
 			super().emit(chunk)
 
@@ -42,4 +47,6 @@ class ChunkedSysLogHandler(logwood.handlers.logging.SysLogHandler):
 				msg = '({}/{}) '.format(chunk + 1, number_of_chunks) + msg
 			record_chunk = record.copy()
 			record_chunk['message'] = msg
+			record_chunk.pop('exc_info', None)
+			record_chunk.pop('exc_text', None)
 			yield record_chunk
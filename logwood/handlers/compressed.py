@@ -0,0 +1,127 @@
+from typing import Any, Callable, Dict, Optional # noqa
+import os
+import zlib
+
+from logwood.handlers.batching import BatchingFileHandler
+
+
+
+class GzipCodec:
+	'''
+	Gzip stream. Every block ends with a sync flush, so everything up to the last complete block can be decompressed
+	even though the stream is not finished yet.
+	'''
+
+	def __init__(self, compression_level: Optional[int] = None) -> None:
+		# wbits 31 produces a gzip header and trailer instead of a raw zlib stream
+		self._compressor = zlib.compressobj(6 if compression_level is None else compression_level, zlib.DEFLATED, 31)
+
+
+	def compress_block(self, data: bytes) -> bytes:
+		return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+	def finish(self) -> bytes:
+		return self._compressor.flush(zlib.Z_FINISH)
+
+
+
+class ZstdCodec:
+	'''
+	Zstandard frame with a block flushed for every block of records. Requires Python 3.14 (:mod:`compression.zstd`)
+	or the ``zstandard`` package.
+	'''
+
+	def __init__(self, compression_level: Optional[int] = None) -> None:
+		try:
+			from compression import zstd
+		except ImportError:
+			import zstandard
+			self._compressor = zstandard.ZstdCompressor(level = 3 if compression_level is None else compression_level).compressobj()
+			self._flush_block = lambda: self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+			self._flush_frame = self._compressor.flush
+		else:
+			self._compressor = zstd.ZstdCompressor(level = compression_level)
+			self._flush_block = lambda: self._compressor.flush(zstd.ZstdCompressor.FLUSH_BLOCK)
+			self._flush_frame = lambda: self._compressor.flush(zstd.ZstdCompressor.FLUSH_FRAME)
+
+
+	def compress_block(self, data: bytes) -> bytes:
+		return self._compressor.compress(data) + self._flush_block()
+
+
+	def finish(self) -> bytes:
+		return self._flush_frame()
+
+
+
+# Codec name -> factory taking the compression level (None for the codec's default), see register_codec
+CODECS = {
+	'gzip': GzipCodec,
+	'zstd': ZstdCodec,
+} # type: Dict[str, Callable[[Optional[int]], Any]]
+
+
+def register_codec(name: str, factory: Callable[[Optional[int]], Any]) -> None:
+	'''
+	Make a codec available to :class:`CompressedFileHandler` under `name`. `factory` is called with the compression
+	level and returns an object with two methods: ``compress_block(data)`` returns compressed bytes of `data` ending
+	at a point up to which the output can be decompressed, ``finish()`` returns the end of the stream.
+	'''
+	CODECS[name] = factory
+
+
+
+class CompressedFileHandler(BatchingFileHandler):
+	'''
+	File handler writing a compressed stream, gzip by default.
+
+	Lines are collected into blocks of about `block_size` bytes which are compressed and written with one
+	``os.write`` each. A block is also written when `flush_interval` seconds passed since its first record (checked by
+	every emit and by a helper thread started with the first block, so an idle logger's block is written too), on
+	:meth:`flush` and on :meth:`close`. Each block ends at a sync point, so readers can decompress everything written
+	so far and a crash loses at most the records of the last `flush_interval` seconds (or of one block).
+
+	The file is opened for appending, an existing file gets another stream appended (gzip and zstd readers read
+	concatenated streams as one). A forked child would corrupt the parent's stream, so it writes to its own file
+	with its pid inserted before the extension (``app.log.gz`` becomes ``app.log.1234.gz``).
+	'''
+
+	def __init__(self, level: int = None, format: str = None, filename: str = None, encoding: str = 'utf-8', *,
+	codec: str = 'gzip', compression_level: Optional[int] = None, block_size: int = 64 * 1024,
+	flush_interval: float = 1.0, delay: bool = False) -> None:
+		if codec not in CODECS:
+			raise ValueError('Unknown codec {!r}, known codecs are {}'.format(codec, ', '.join(sorted(CODECS))))
+		# Before the file is opened, the codec's module may be missing
+		compressor = CODECS[codec](compression_level)
+		super().__init__(level, format, filename, encoding, flush_interval, delay)
+		self.codec = codec
+		self.compression_level = compression_level
+		self.block_size = block_size
+		self._compressor = compressor
+
+
+	def _batch_full(self) -> bool:
+		return self._batch_bytes >= self.block_size
+
+
+	def _encode_batch(self, data: bytes) -> bytes:
+		return self._compressor.compress_block(data)
+
+
+	def _finish(self) -> bytes:
+		return self._compressor.finish()
+
+
+	def after_fork_in_child(self) -> None:
+		'''
+		Start a new stream in a file of the child's own. The parent's helper thread does not exist in the child, the
+		next block starts a new one.
+		'''
+		super().after_fork_in_child()
+		if self.fd is not None:
+			os.close(self.fd)
+			self.fd = None
+		root, extension = os.path.splitext(self.base_filename)
+		self.base_filename = '{}.{}{}'.format(root, os.getpid(), extension)
+		self._compressor = CODECS[self.codec](self.compression_level)
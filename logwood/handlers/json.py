@@ -0,0 +1,71 @@
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+import json
+
+from logwood.handlers.logging import StreamHandler
+from logwood.record import flatten
+from logwood.tracebacks import exception_to_dict, format_exception
+
+
+
+class JsonHandler(StreamHandler):
+	'''
+	Write each record to a stream as a single line of JSON. The handler's `format` is not used.
+
+	Values that are not JSON serializable are converted with ``str()``.
+	'''
+
+	# Internal record fields which are never written out as they are
+	EXCLUDED_FIELDS = frozenset(('args', 'template', 'template_args', 'exc_info', 'exc_text'))
+
+	def __init__(self, level: int = None, stream = None, *, fields: Optional[Iterable[str]] = None,
+	structured_exceptions: bool = True) -> None:
+		'''
+		:param fields: Names of record fields to write. All fields present in the record are written if None.
+		:param structured_exceptions: Write exception info as an ``exception`` object with ``type``, ``message``
+			and ``frames``. Otherwise the rendered traceback is written as ``exc_text``.
+		'''
+		super().__init__(level = level, stream = stream)
+		self.fields = None if fields is None else tuple(fields)
+		self.structured_exceptions = structured_exceptions
+
+
+	def record_fields(self) -> FrozenSet[str]:
+		''' Only explicitly listed fields are requested from loggers. '''
+		return frozenset(self.fields or ())
+
+
+	def format_message(self, record: Dict[str, Any]) -> str:
+		'''
+		Serialize the record to JSON.
+		'''
+		self.prepare_message(record)
+		return to_json(record, self.fields, self.structured_exceptions, self.EXCLUDED_FIELDS)
+
+
+
+def to_json(record: Dict[str, Any], fields: Optional[Tuple[str, ...]] = None, structured_exceptions: bool = True,
+excluded_fields: FrozenSet[str] = JsonHandler.EXCLUDED_FIELDS) -> str:
+	'''
+	Serialize a record whose message was already prepared (see :meth:`Handler.prepare_message`) to a line of JSON,
+	the way :class:`JsonHandler` writes it.
+	'''
+	if fields is None:
+		data = {key: value for key, value in flatten(record).items() if key not in excluded_fields}
+	else:
+		data = {}
+		for key in fields:
+			# Context variables, bound fields and defaults are only found by lookup, not by ``in``
+			try:
+				data[key] = record[key]
+			except KeyError:
+				pass
+
+	if 'exc_info' in record:
+		if structured_exceptions:
+			data['exception'] = exception_to_dict(record['exc_info'])
+		elif 'exc_text' in record:
+			data['exc_text'] = record['exc_text']
+		else:
+			data['exc_text'] = record['exc_text'] = format_exception(record['exc_info'])
+
+	return json.dumps(data, default = str)
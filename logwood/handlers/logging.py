@@ -7,6 +7,7 @@ from typing import Dict, Any
 import sys
 import os
 import socket
+import threading
 
 from logwood.base_handler import Handler
 
@@ -52,18 +53,21 @@ class StreamHandler(Handler):
 		has an 'encoding' attribute, it is used to determine how to do the
 		output to the stream.
 		"""
-		msg = self.format_message(record)
-		stream = self.stream
-		stream.write(msg)
-		stream.write(self.terminator)
+		# A single write keeps the line together when the stream is shared
+		self.stream.write(self.format_message(record) + self.terminator)
 		self.flush()
 
 
 class FileHandler(StreamHandler):
 	"""
 	A handler class which writes formatted logging records to disk files.
+
+	With `index` set, the handler also maintains a sidecar index of the file (see :mod:`logwood.index`) with
+	buckets of `index_bucket` seconds, for ``python -m logwood.query``. The index describes the file as written by
+	this handler in one process.
 	"""
-	def __init__(self, level: int = None, format: str = None, filename = None, mode='a', encoding=None, delay=False):
+	def __init__(self, level: int = None, format: str = None, filename = None, mode='a', encoding=None, delay=False,
+	index: bool = False, index_bucket: float = 1.0):
 		"""
 		Open the specified file and use it as the stream for logging.
 		"""
@@ -73,6 +77,10 @@ class FileHandler(StreamHandler):
 		self.mode = mode
 		self.encoding = encoding
 		self.delay = delay
+		self.index = index
+		self.index_bucket = index_bucket
+		self.index_writer = None
+		self._index_lock = threading.Lock()
 		if delay:
 			#We don't open the stream, but we still need to call the
 			#Handler constructor to set level and format
@@ -82,16 +90,19 @@ class FileHandler(StreamHandler):
 			super().__init__(level, format, self._open())
 
 
-	def close(self):
+	def close(self, timeout = None):
 		"""
 		Closes the stream.
 		"""
-		super().close()
+		super().close(timeout)
 		if self.stream:
 			self.flush()
 			if hasattr(self.stream, "close"):
 				self.stream.close()
 			self.stream = None
+		if self.index_writer is not None:
+			self.index_writer.close()
+			self.index_writer = None
 
 
 	def _open(self):
@@ -99,6 +110,9 @@ class FileHandler(StreamHandler):
 		Open the current base file with the (original) mode and encoding.
 		Return the resulting stream.
 		"""
+		if self.index:
+			from logwood.index import IndexWriter, index_filename
+			self.index_writer = IndexWriter(index_filename(self.base_filename), self.index_bucket, truncate = 'w' in self.mode)
 		return open(self.base_filename, self.mode, encoding=self.encoding)
 
 
@@ -111,7 +125,15 @@ class FileHandler(StreamHandler):
 		"""
 		if self.stream is None:
 			self.stream = self._open()
-		StreamHandler.emit(self, record)
+		if self.index_writer is None:
+			StreamHandler.emit(self, record)
+			return
+		message = self.format_message(record) + self.terminator
+		# The offset and the write must not interleave with other threads
+		with self._index_lock:
+			self.index_writer.add(record['timestamp'], record['level_number'], self.stream.tell)
+			self.stream.write(message)
+			self.flush()
 
 
 class StderrHandler(StreamHandler):
@@ -299,13 +321,25 @@ class SysLogHandler(Handler):
 			priority = self.priority_names[priority]
 		return (facility << 3) | priority
 
-	def close(self):
+	def close(self, timeout = None):
 		"""
 		Closes the socket.
 		"""
-		super().close()
+		super().close(timeout)
 		self.socket.close()
 
+	def after_fork_in_child(self):
+		"""
+		Connect again, so that the child does not share the parent's connection (their streams would interleave).
+		"""
+		self.socket.close()
+		if self.unixsocket:
+			self._connect_unixsocket(self.address)
+		else:
+			self.socket = socket.socket(socket.AF_INET, self.socktype)
+			if self.socktype == socket.SOCK_STREAM:
+				self.socket.connect(self.address)
+
 	def map_priority(self, level_name):
 		"""
 		Map a logging level name to a key in the priority_names map.
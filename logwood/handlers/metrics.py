@@ -0,0 +1,199 @@
+from typing import Any, Dict, List, Optional, Tuple # noqa
+import itertools
+import os
+import threading
+
+import logwood.state
+from logwood import global_config
+from logwood.base_handler import Handler
+
+
+
+def _escape(value: str) -> str:
+	''' Escape a label value for the Prometheus text format. '''
+	return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _counter_value(counter: 'itertools.count') -> int:
+	# itertools.count exposes its state only through repr, e.g. count(42)
+	return int(repr(counter)[6:-1])
+
+
+
+class MetricsHandler(Handler):
+	'''
+	Counts records per logger and level and exports the counts in the Prometheus text format, together with the
+	records lost by handlers and the records passed to the last resort handler because a handler failed.
+
+	Counting a record costs a dict lookup and ``next()`` of an :func:`itertools.count`, which is atomic, so no lock is
+	taken. Only records which reach the handler are counted: with `level` below the default level, loggers create
+	records of those levels too.
+
+	With `port`, the metrics are served at ``http://host:port/metrics`` by a small HTTP server in a daemon thread
+	(port 0 picks a free port, see :attr:`server_address`). With `textfile`, they are written to that file every
+	`interval` seconds and on :meth:`flush`, for the node exporter textfile collector; the file is replaced
+	atomically. :meth:`render` returns the text for other uses.
+
+	Lost records are summed over the handlers defined when the metrics handler is created and all handlers created
+	later, including closed ones (which stay referenced for that), so the counter never goes down.
+
+	A forked child counts its own records but does not export them, the server and file belong to the parent.
+	'''
+
+	def __init__(self, level: int = None, *, port: Optional[int] = None, host: str = '127.0.0.1',
+	textfile: Optional[str] = None, interval: float = 15.0) -> None:
+		super().__init__(level)
+		# (logger name, level name) -> counter
+		self._counters = {} # type: Dict[Tuple[str, str], itertools.count]
+		self._lock = threading.Lock()
+		self.textfile = None if textfile is None else os.path.abspath(textfile)
+		self.interval = interval
+		self._stop = threading.Event()
+		# Every handler created so far, closed ones included. Handlers count most lost records while closing, after
+		# they left state.defined_handlers, and the exported counter must not go down when a handler is closed.
+		self._handlers = list(logwood.state.defined_handlers) # type: List[Handler]
+		logwood.state.handler_hooks.append(self._track)
+		self._server = None # type: Any
+		self._threads = [] # type: List[threading.Thread]
+		if port is not None:
+			self._server = self._create_server(host, port)
+			# A short poll interval keeps close() quick
+			self._start(lambda: self._server.serve_forever(poll_interval = 0.1), 'logwood-metrics-server')
+		if self.textfile is not None:
+			self._start(self._write_periodically, 'logwood-metrics-textfile')
+
+
+	def _track(self, handler: Handler) -> None:
+		self._handlers.append(handler)
+
+
+	def _start(self, target, name: str) -> None:
+		thread = threading.Thread(target = target, name = name, daemon = True)
+		thread.start()
+		self._threads.append(thread)
+
+
+	@property
+	def server_address(self) -> Optional[Tuple[str, int]]:
+		''' Host and port the HTTP server listens on, or None. '''
+		return None if self._server is None else self._server.server_address[:2]
+
+
+	def _create_server(self, host: str, port: int) -> Any:
+		import http.server
+
+		handler = self
+
+		class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+			def do_GET(self) -> None:
+				if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+					self.send_error(404)
+					return
+				body = handler.render().encode()
+				self.send_response(200)
+				self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+				self.send_header('Content-Length', str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, format: str, *args: Any) -> None:
+				# Requests are not logged, the handler must not log through logwood or to stderr
+				pass
+
+		server = http.server.ThreadingHTTPServer((host, port), MetricsRequestHandler)
+		server.daemon_threads = True
+		return server
+
+
+	def emit(self, record: Dict[str, Any]) -> None:
+		key = (record['name'], record['level'])
+		counter = self._counters.get(key)
+		if counter is None:
+			with self._lock:
+				counter = self._counters.setdefault(key, itertools.count(1))
+		next(counter)
+
+
+	def counts(self) -> Dict[Tuple[str, str], int]:
+		''' Return the number of records counted per (logger name, level name). '''
+		# Copy first, other threads may add counters meanwhile
+		return {key: _counter_value(counter) - 1 for key, counter in list(self._counters.items())}
+
+
+	def render(self) -> str:
+		''' Return the metrics in the Prometheus text exposition format. '''
+		lines = [
+			'# HELP logwood_records_total Records logged, by logger and level.',
+			'# TYPE logwood_records_total counter',
+		]
+		for (name, level), count in sorted(self.counts().items()):
+			lines.append('logwood_records_total{{logger="{}",level="{}"}} {}'.format(_escape(name), level, count))
+
+		lost = {} # type: Dict[str, int]
+		for handler in list(self._handlers):
+			name = type(handler).__name__
+			lost[name] = lost.get(name, 0) + handler.lost_records
+		lines.append('# HELP logwood_lost_records_total Records accepted by handlers but never written, by handler class.')
+		lines.append('# TYPE logwood_lost_records_total counter')
+		for name, count in sorted(lost.items()):
+			lines.append('logwood_lost_records_total{{handler="{}"}} {}'.format(_escape(name), count))
+
+		lines.append('# HELP logwood_handler_errors_total Records passed to the last resort handler because a handler failed.')
+		lines.append('# TYPE logwood_handler_errors_total counter')
+		lines.append('logwood_handler_errors_total {}'.format(logwood.state.last_resort_calls))
+		return '\n'.join(lines) + '\n'
+
+
+	def _write_textfile(self) -> None:
+		temporary = '{}.{}.tmp'.format(self.textfile, os.getpid())
+		with open(temporary, 'w') as f:
+			f.write(self.render())
+		os.replace(temporary, self.textfile)
+
+
+	def _write_periodically(self) -> None:
+		while not self._stop.wait(self.interval):
+			try:
+				self._write_textfile()
+			except Exception:
+				global_config.last_resort_handler({'message': 'MetricsHandler failed to write {}'.format(self.textfile)})
+
+
+	def flush(self) -> None:
+		''' Write the textfile now. '''
+		if self.textfile is not None and not self._stop.is_set():
+			self._write_textfile()
+
+
+	def before_fork(self) -> None:
+		''' Nothing to write out, the textfile is written by a thread. '''
+
+
+	def after_fork_in_child(self) -> None:
+		self._lock = threading.Lock()
+		# The parent's writer thread may have held the event's internal lock during the fork
+		self._stop = threading.Event()
+		self._stop.set()
+		self._threads = []
+		if self._server is not None:
+			# The serving thread does not exist here, so shutdown() would wait forever
+			self._server.socket.close()
+			self._server = None
+
+
+	def close(self, timeout: Optional[float] = None) -> None:
+		'''
+		Write the textfile a last time and stop the server and the writer thread.
+		'''
+		super().close(timeout)
+		if self._track in logwood.state.handler_hooks:
+			logwood.state.handler_hooks.remove(self._track)
+		try:
+			self.flush()
+		finally:
+			self._stop.set()
+			if self._server is not None:
+				self._server.shutdown()
+				self._server.server_close()
+			for thread in self._threads:
+				thread.join(timeout)
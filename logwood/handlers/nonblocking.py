@@ -0,0 +1,231 @@
+from typing import Any, Deque, Dict, Optional # noqa
+import collections
+import os
+import select
+import stat
+import sys
+import threading
+import time
+
+from logwood import global_config
+from logwood.base_handler import Handler
+
+
+
+class NonBlockingStreamHandler(Handler):
+	'''
+	Stream handler which never blocks the logging thread, meant for stderr or stdout read by a collector that can
+	fall behind (e.g. a container runtime reading a pipe).
+
+	Records are written to a non-blocking file descriptor. Whatever the descriptor does not accept right away is kept
+	in an overflow buffer of at most `buffer_size` bytes and written later, by the next emit or by a helper thread
+	which waits until the descriptor is writable (unless `flush_interval` is None). When the buffer is full, lines
+	are dropped according to `drop`: ``'newest'`` drops the line being logged, ``'oldest'`` drops the oldest buffered
+	lines. Dropped lines are counted in :attr:`dropped`.
+
+	The descriptor is reopened through ``/proc/self/fd`` with ``O_NONBLOCK`` so other users of the stream (or other
+	processes sharing it) keep their blocking mode. Where that is not possible (e.g. sockets) the descriptor is
+	duplicated and switched to non-blocking mode, which also affects the original descriptor. Regular files (stderr
+	redirected to a file) never block, their descriptor is only duplicated so writes share its file offset.
+	'''
+
+	terminator = '\n'
+
+	def __init__(self, level: int = None, format: str = None, stream = None, encoding: str = 'utf-8', *,
+	buffer_size: int = 1024 * 1024, drop: str = 'newest', flush_interval: Optional[float] = 0.1,
+	close_timeout: float = 1.0) -> None:
+		if drop not in ('newest', 'oldest'):
+			raise ValueError("drop must be 'newest' or 'oldest', got {!r}".format(drop))
+		super().__init__(level, format)
+		if stream is None:
+			stream = sys.stderr
+		if hasattr(stream, 'flush'):
+			# Do not reorder output buffered by the stream object itself
+			stream.flush()
+		self.fd = self._open(stream if isinstance(stream, int) else stream.fileno())
+		self.encoding = encoding
+		self.buffer_size = buffer_size
+		self.drop = drop
+		self.flush_interval = flush_interval
+		self.close_timeout = close_timeout
+		self.dropped = 0
+		self._pending = collections.deque() # type: Deque[bytes]
+		self._pending_bytes = 0
+		# The first pending line was partially written and must not be dropped, or the stream gets a torn line
+		self._head_started = False
+		self._lock = threading.Lock()
+		self._wakeup = threading.Event()
+		self._closing = False
+		self._writer = None # type: Optional[threading.Thread]
+		if flush_interval is not None:
+			self._writer = threading.Thread(target = self._write_loop, name = 'logwood-nonblocking-writer', daemon = True)
+			self._writer.start()
+
+
+	@staticmethod
+	def _open(fd: int) -> int:
+		if stat.S_ISREG(os.fstat(fd).st_mode):
+			# Writes to regular files never block. A duplicate shares the file offset with the original descriptor,
+			# a reopened file would have its own and overwrite other output.
+			return os.dup(fd)
+		flags = os.O_WRONLY | os.O_APPEND | os.O_NONBLOCK | getattr(os, 'O_CLOEXEC', 0)
+		try:
+			# A new open file description, O_NONBLOCK does not leak to other users of the stream
+			return os.open('/proc/self/fd/{}'.format(fd), flags)
+		except OSError:
+			new_fd = os.dup(fd)
+			os.set_blocking(new_fd, False)
+			return new_fd
+
+
+	def _write(self, data: bytes) -> int:
+		''' Write as much of `data` as the descriptor accepts now, return the number of bytes written. '''
+		try:
+			written = os.write(self.fd, data)
+		except BlockingIOError:
+			return 0
+		self.count_written(written)
+		return written
+
+
+	def _write_pending(self) -> None:
+		''' Write buffered lines until the descriptor would block. The caller must hold the lock. '''
+		pending = self._pending
+		while pending:
+			data = pending[0]
+			written = self._write(data)
+			self._pending_bytes -= written
+			if written < len(data):
+				if written:
+					pending[0] = data[written:]
+					self._head_started = True
+				return
+			pending.popleft()
+			self._head_started = False
+
+
+	def _buffer(self, data: bytes, started: bool) -> None:
+		''' Add the rest of a line to the overflow buffer, dropping lines if it is full. The caller must hold the lock. '''
+		pending = self._pending
+		if not started and self._pending_bytes + len(data) > self.buffer_size:
+			if self.drop == 'newest':
+				self.dropped += 1
+				return
+			# Drop the oldest lines, except a line that was already partially written
+			keep_head = 1 if self._head_started else 0
+			while len(pending) > keep_head and self._pending_bytes + len(data) > self.buffer_size:
+				if keep_head:
+					self._pending_bytes -= len(pending[1])
+					del pending[1]
+				else:
+					self._pending_bytes -= len(pending.popleft())
+				self.dropped += 1
+			if self._pending_bytes + len(data) > self.buffer_size:
+				self.dropped += 1
+				return
+		pending.append(data)
+		self._pending_bytes += len(data)
+		if started and len(pending) == 1:
+			self._head_started = True
+
+
+	def emit(self, record: Dict[str, Any]) -> None:
+		if self.fd is None:
+			raise RuntimeError('NonBlockingStreamHandler is closed')
+		data = (self.format_message(record) + self.terminator).encode(self.encoding, 'backslashreplace')
+		with self._lock:
+			if self._pending:
+				self._write_pending()
+			if self._pending:
+				self._buffer(data, False)
+			else:
+				written = self._write(data)
+				if written == len(data):
+					return
+				self._buffer(data[written:], written > 0)
+		self._wakeup.set()
+
+
+	def flush(self) -> None:
+		'''
+		Write as much of the overflow buffer as possible without blocking.
+		'''
+		with self._lock:
+			self._write_pending()
+
+
+	def _wait_writable(self, timeout: float) -> None:
+		try:
+			select.select([], [self.fd], [], timeout)
+		except (OSError, ValueError):
+			time.sleep(timeout)
+
+
+	def _write_loop(self) -> None:
+		while not self._closing:
+			self._wakeup.wait(self.flush_interval)
+			self._wakeup.clear()
+			try:
+				while self._pending and not self._closing:
+					self._wait_writable(self.flush_interval)
+					self.flush()
+			except Exception:
+				global_config.last_resort_handler({'message': 'NonBlockingStreamHandler failed to write buffered lines'})
+
+
+	def before_fork(self) -> None:
+		'''
+		Write as much of the overflow buffer as possible and hold the lock until the fork is done.
+		'''
+		self._lock.acquire()
+		self._write_pending()
+
+
+	def after_fork_in_parent(self) -> None:
+		self._lock.release()
+
+
+	def after_fork_in_child(self) -> None:
+		'''
+		Start with an empty overflow buffer, lines the parent could not write yet are left to the parent.
+		'''
+		self._lock = threading.Lock()
+		self._pending.clear()
+		self._pending_bytes = 0
+		self._head_started = False
+		self._wakeup = threading.Event()
+		if self.flush_interval is not None and not self._closing:
+			self._writer = threading.Thread(target = self._write_loop, name = 'logwood-nonblocking-writer', daemon = True)
+			self._writer.start()
+
+
+	@property
+	def lost_records(self) -> int:
+		return self.dropped
+
+
+	def close(self, timeout: Optional[float] = None) -> None:
+		'''
+		Stop the helper thread and try to write the overflow buffer for at most `timeout` seconds (`close_timeout`
+		if None). Lines still buffered after that are counted as dropped. The original stream is not closed.
+		'''
+		super().close(timeout)
+		self._closing = True
+		self._wakeup.set()
+		deadline = time.monotonic() + (self.close_timeout if timeout is None else timeout)
+		if self._writer is not None:
+			self._writer.join()
+		with self._lock:
+			self._write_pending()
+			while self._pending:
+				remaining = deadline - time.monotonic()
+				if remaining <= 0:
+					break
+				self._wait_writable(remaining)
+				self._write_pending()
+			self.dropped += len(self._pending)
+			self._pending.clear()
+			self._pending_bytes = 0
+			if self.fd is not None:
+				os.close(self.fd)
+				self.fd = None
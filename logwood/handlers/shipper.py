@@ -0,0 +1,577 @@
+from typing import Any, Deque, Dict, FrozenSet, List, Optional, Tuple # noqa
+import collections
+import itertools
+import os
+import socket
+import struct
+import threading
+import time
+import urllib.parse
+
+from logwood import global_config
+from logwood.base_handler import Handler
+from logwood.handlers.compressed import CODECS
+from logwood.handlers.json import to_json
+
+
+
+# Frame header of the 'length' framing, a big-endian payload length
+FRAME = struct.Struct('>I')
+
+
+
+class BatchRejected(Exception):
+	'''
+	The collector refused a batch for good, e.g. with HTTP status 400. Sending it again would not help.
+	'''
+
+
+
+class TcpTransport:
+	'''
+	A persistent TCP connection, opened on the first send and after errors. Batches are written one after another,
+	so the connection carries a single stream of frames or lines (and of concatenated gzip members or zstd frames
+	when compressed).
+	'''
+
+	def __init__(self, host: str, port: int, timeout: float) -> None:
+		self.host = host
+		self.port = port
+		self.timeout = timeout
+		self._socket = None # type: Optional[socket.socket]
+
+
+	def _peer_closed(self) -> bool:
+		# A collector never sends anything, so readable data or EOF means it closed the connection (or reset it).
+		# A non-blocking peek works for any descriptor number, unlike select(). The socket's timeout would make recv()
+		# wait for data first, so it is switched to non-blocking mode meanwhile.
+		self._socket.setblocking(False)
+		try:
+			return not self._socket.recv(1, socket.MSG_PEEK)
+		except BlockingIOError:
+			return False
+		finally:
+			self._socket.settimeout(self.timeout)
+
+
+	def send(self, payload: bytes, compression: Optional[str]) -> None:
+		if self._socket is not None:
+			try:
+				closed = self._peer_closed()
+			except Exception:
+				closed = True
+			if closed:
+				self.close()
+		if self._socket is None:
+			self._socket = socket.create_connection((self.host, self.port), self.timeout)
+		try:
+			self._socket.sendall(payload)
+		except OSError:
+			self.close()
+			raise
+
+
+	def close(self) -> None:
+		if self._socket is not None:
+			self._socket.close()
+			self._socket = None
+
+
+
+class HttpTransport:
+	'''
+	A persistent HTTP/1.1 connection posting one batch per request. Any 2xx status acknowledges the batch. Statuses
+	408, 429 and 5xx are retried like network errors, other statuses reject the batch (:class:`BatchRejected`).
+	'''
+
+	CONTENT_TYPES = {
+		'ndjson': 'application/x-ndjson',
+		'length': 'application/octet-stream',
+	}
+
+	def __init__(self, url: urllib.parse.SplitResult, framing: str, timeout: float) -> None:
+		self.url = url
+		self.path = (url.path or '/') + ('?' + url.query if url.query else '')
+		self.content_type = self.CONTENT_TYPES[framing]
+		self.timeout = timeout
+		self._connection = None # type: Any
+
+
+	def _connect(self) -> Any:
+		import http.client
+
+		if self.url.scheme == 'https':
+			return http.client.HTTPSConnection(self.url.hostname, self.url.port, timeout = self.timeout)
+		return http.client.HTTPConnection(self.url.hostname, self.url.port, timeout = self.timeout)
+
+
+	def send(self, payload: bytes, compression: Optional[str]) -> None:
+		import http.client
+
+		if self._connection is None:
+			self._connection = self._connect()
+		headers = {'Content-Type': self.content_type}
+		if compression is not None:
+			headers['Content-Encoding'] = compression
+		try:
+			self._connection.request('POST', self.path, payload, headers)
+			response = self._connection.getresponse()
+			response.read()
+		except (OSError, http.client.HTTPException):
+			self.close()
+			raise
+		if response.will_close:
+			self.close()
+		if response.status == 408 or response.status == 429 or response.status >= 500:
+			raise ConnectionError('HTTP status {} from {}'.format(response.status, self.url.geturl()))
+		if not 200 <= response.status < 300:
+			raise BatchRejected('HTTP status {} from {}'.format(response.status, self.url.geturl()))
+
+
+	def close(self) -> None:
+		if self._connection is not None:
+			self._connection.close()
+			self._connection = None
+
+
+
+class DiskSpool:
+	'''
+	Records waiting for the collector, in a file. Records are stored as length-prefixed frames after a header holding
+	the offset of the first record not sent yet, which is updated after every sent batch. After a crash the spool is
+	replayed from that offset, a torn frame at the end is cut off. The file is truncated whenever it has been replayed
+	completely.
+	'''
+
+	HEADER = struct.Struct('<Q')
+	FRAME = struct.Struct('<I')
+	READ_SIZE = 1024 * 1024
+
+	def __init__(self, filename: str, max_bytes: int) -> None:
+		self.filename = filename
+		self.max_bytes = max_bytes
+		self.fd = os.open(filename, os.O_RDWR | os.O_CREAT | getattr(os, 'O_CLOEXEC', 0), 0o600)
+		self._peeked = [] # type: List[int]
+		header = os.pread(self.fd, self.HEADER.size, 0)
+		if len(header) < self.HEADER.size:
+			self._reset()
+			return
+		self.start, = self.HEADER.unpack(header)
+		self.end = self._last_complete_frame(os.fstat(self.fd).st_size)
+		if self.start >= self.end:
+			self._reset()
+
+
+	def _last_complete_frame(self, size: int) -> int:
+		''' Return the end of the last complete frame, cutting off a frame torn by a crash. '''
+		offset = self.start
+		data, data_offset = b'', offset
+		while offset + self.FRAME.size <= size:
+			position = offset - data_offset
+			if position + self.FRAME.size > len(data):
+				data, data_offset, position = os.pread(self.fd, self.READ_SIZE, offset), offset, 0
+			length, = self.FRAME.unpack_from(data, position)
+			if offset + self.FRAME.size + length > size:
+				break
+			offset += self.FRAME.size + length
+		if offset < size:
+			os.ftruncate(self.fd, offset)
+		return offset
+
+
+	def _reset(self) -> None:
+		self.start = self.end = self.HEADER.size
+		os.ftruncate(self.fd, 0)
+		os.pwrite(self.fd, self.HEADER.pack(self.start), 0)
+
+
+	def __bool__(self) -> bool:
+		return self.end > self.start
+
+
+	def append(self, records: List[bytes]) -> int:
+		''' Append records, return the number of records which did not fit and were dropped. '''
+		room = self.max_bytes - (self.end - self.start)
+		frames = []
+		for count, record in enumerate(records):
+			room -= self.FRAME.size + len(record)
+			if room < 0:
+				break
+			frames.append(self.FRAME.pack(len(record)))
+			frames.append(record)
+		else:
+			count = len(records)
+		data = b''.join(frames)
+		if data:
+			os.pwrite(self.fd, data, self.end)
+			self.end += len(data)
+		return len(records) - count
+
+
+	def peek(self, count: int) -> List[bytes]:
+		''' Return up to `count` records from the start of the spool. '''
+		records = [] # type: List[bytes]
+		self._peeked = []
+		offset = self.start
+		data = b''
+		position = 0
+		while len(records) < count and offset < self.end:
+			if position + self.FRAME.size > len(data):
+				data, position = os.pread(self.fd, min(self.READ_SIZE, self.end - offset), offset), 0
+			length, = self.FRAME.unpack_from(data, position)
+			size = self.FRAME.size + length
+			if position + size > len(data):
+				data, position = os.pread(self.fd, max(size, min(self.READ_SIZE, self.end - offset)), offset), 0
+			records.append(data[position + self.FRAME.size:position + size])
+			self._peeked.append(size)
+			position += size
+			offset += size
+		return records
+
+
+	def consume(self, count: int) -> None:
+		''' Remove the first `count` records returned by :meth:`peek`. '''
+		self.start += sum(self._peeked[:count])
+		del self._peeked[:count]
+		if self.start >= self.end:
+			self._reset()
+		else:
+			os.pwrite(self.fd, self.HEADER.pack(self.start), 0)
+
+
+	def close(self) -> None:
+		os.close(self.fd)
+
+
+
+class ShipperHandler(Handler):
+	'''
+	Ships records straight to a log collector over TCP or HTTP, instead of writing them for a sidecar to pick up.
+
+	Records are serialized in the logging thread (to JSON like :class:`JsonHandler` does, or with the handler's
+	`format` if given) and appended to a queue of about `queue_size` records (a deque, no lock is taken). A worker
+	thread sends them in batches of up to `batch_size` records, at least every `flush_interval` seconds, over one
+	persistent connection, so the collector receives them in order. A batch is either newline-delimited (`framing` ``'ndjson'``) or every
+	record is preceded by its length as a four byte big-endian integer (``'length'``, for formatted messages with
+	line breaks). With `compression` (``'gzip'`` or another codec of :mod:`logwood.handlers.compressed`), every batch
+	is compressed on its own.
+
+	`url` is ``tcp://host:port`` or an ``http://`` or ``https://`` URL batches are posted to. Over TCP a batch counts
+	as delivered once the kernel accepted it, over HTTP once the collector answered with a 2xx status.
+
+	When the collector is unreachable, the worker retries every `retry_interval` seconds. Meanwhile records are
+	kept in memory, and when the queue is full too, logging threads wait up to `block_timeout` seconds for room
+	before the record is dropped. With a `spool` file, records are written there instead while the collector is
+	down (up to `spool_max_bytes`) and replayed in order once it is back, also by the next process using the spool
+	after a crash or an unsuccessful shutdown. Records are delivered at least once: a batch which was sent but not
+	marked in the spool before a crash is sent again. A forked child uses its own spool, with its pid appended.
+	'''
+
+	def __init__(self, level: int = None, format: str = None, url: str = None, *, framing: str = 'ndjson',
+	compression: Optional[str] = None, compression_level: Optional[int] = None, batch_size: int = 500,
+	flush_interval: float = 0.5, queue_size: int = 10000, block_timeout: float = 1.0, spool: Optional[str] = None,
+	spool_max_bytes: int = 256 * 1024 * 1024, retry_interval: float = 1.0, timeout: float = 5.0,
+	close_timeout: float = 5.0) -> None:
+		if url is None:
+			raise ValueError('ShipperHandler needs the url of the collector')
+		if framing not in ('ndjson', 'length'):
+			raise ValueError("framing must be 'ndjson' or 'length', got {!r}".format(framing))
+		if compression is not None and compression not in CODECS:
+			raise ValueError('Unknown compression {!r}, known codecs are {}'.format(compression, ', '.join(sorted(CODECS))))
+		parts = urllib.parse.urlsplit(url)
+		if parts.scheme == 'tcp':
+			transport = TcpTransport(parts.hostname, parts.port, timeout) # type: Any
+		elif parts.scheme in ('http', 'https'):
+			transport = HttpTransport(parts, framing, timeout)
+		else:
+			raise ValueError('url must start with tcp://, http:// or https://, got {!r}'.format(url))
+		super().__init__(level, format)
+		self.url = url
+		self.framing = framing
+		self.compression = compression
+		self.compression_level = compression_level
+		self.batch_size = batch_size
+		self.flush_interval = flush_interval
+		self.queue_size = queue_size
+		self.block_timeout = block_timeout
+		self.spool_filename = None if spool is None else os.path.abspath(spool)
+		self.spool_max_bytes = spool_max_bytes
+		self.retry_interval = retry_interval
+		self.close_timeout = close_timeout
+		self.shipped = 0
+		self.dropped = 0
+		self._transport = transport
+		self._setup()
+
+
+	def _setup(self) -> None:
+		''' Create the queue, spool and worker. '''
+		# Serialized records, appended by logging threads without a lock
+		self._queue = collections.deque() # type: Deque[bytes]
+		# Set by logging threads when a batch is ready, and by flush() and close()
+		self._wakeup = threading.Event()
+		# Cleared by logging threads waiting for room in the queue, set by the worker when it took records
+		self._room = threading.Event()
+		# Records taken from the queue and not sent yet. With a spool, they are older than the records in the spool
+		# only while the spool is empty.
+		self._backlog = collections.deque() # type: Deque[bytes]
+		self._spool = None if self.spool_filename is None else DiskSpool(self.spool_filename, self.spool_max_bytes)
+		# Flush requests not seen by the worker yet, and the ones waiting for the backlog to be sent
+		self._flush_requests = [] # type: List[threading.Event]
+		self._flush_lock = threading.Lock()
+		self._flushes = [] # type: List[threading.Event]
+		self._dropped_lock = threading.Lock()
+		self._closing = threading.Event()
+		self._close_deadline = 0.0
+		self._next_attempt = 0.0
+		self._worker = threading.Thread(target = self._work, name = 'logwood-shipper', daemon = True)
+		self._worker.start()
+
+
+	def record_fields(self) -> FrozenSet[str]:
+		''' Records shipped as JSON contain all fields present, no optional fields are requested. '''
+		if self.format is None:
+			return frozenset()
+		return super().record_fields()
+
+
+	def serialize(self, record: Dict[str, Any]) -> bytes:
+		''' Return the record as it is shipped, without framing. '''
+		if self.format is None:
+			self.prepare_message(record)
+			return to_json(record).encode('utf-8')
+		return self.format_message(record).encode('utf-8', 'backslashreplace')
+
+
+	def emit(self, record: Dict[str, Any]) -> None:
+		if self.is_shutdown:
+			raise RuntimeError('ShipperHandler is closed')
+		data = self.serialize(record)
+		queue = self._queue
+		if len(queue) >= self.queue_size and not self._wait_for_room():
+			with self._dropped_lock:
+				self.dropped += 1
+			return
+		queue.append(data)
+		if len(queue) >= self.batch_size and not self._wakeup.is_set():
+			self._wakeup.set()
+
+
+	def _wait_for_room(self) -> bool:
+		''' Backpressure, the collector or the spool cannot keep up. Return whether there is room in the queue. '''
+		deadline = time.monotonic() + self.block_timeout
+		while len(self._queue) >= self.queue_size:
+			self._room.clear()
+			# The worker may have taken records before the event was cleared
+			if len(self._queue) < self.queue_size:
+				break
+			self._wakeup.set()
+			remaining = deadline - time.monotonic()
+			if remaining <= 0:
+				return False
+			self._room.wait(remaining)
+		return True
+
+
+	def encode(self, records: List[bytes]) -> bytes:
+		''' Frame and compress a batch. '''
+		if self.framing == 'ndjson':
+			data = b'\n'.join(records) + b'\n'
+		else:
+			data = b''.join(FRAME.pack(len(record)) + record for record in records)
+		if self.compression is not None:
+			codec = CODECS[self.compression](self.compression_level)
+			data = codec.compress_block(data) + codec.finish()
+		return data
+
+
+	def _take(self, closing: bool) -> List[bytes]:
+		'''
+		Take records from the queue, all of them unless the backlog is limited by the queue size (no spool). Flush
+		requests are taken along when no records queued before them are left behind.
+		'''
+		with self._flush_lock:
+			flushes, self._flush_requests = self._flush_requests, []
+		queue = self._queue
+		count = len(queue)
+		if self._spool is None and not closing:
+			count = min(count, max(self.queue_size - len(self._backlog), 0))
+		records = [queue.popleft() for _ in range(count)]
+		self._room.set()
+		if queue and flushes and not closing:
+			with self._flush_lock:
+				self._flush_requests[:0] = flushes
+		else:
+			self._flushes.extend(flushes)
+		return records
+
+
+	def _spool_records(self, records: List[bytes]) -> None:
+		dropped = self._spool.append(records)
+		if dropped:
+			with self._dropped_lock:
+				self.dropped += dropped
+
+
+	def _add(self, records: List[bytes]) -> None:
+		if not records:
+			return
+		if self._spool:
+			# Keep the order, the spool holds older records
+			self._spool_records(records)
+		else:
+			self._backlog.extend(records)
+
+
+	def _pending(self) -> bool:
+		return bool(self._backlog) or bool(self._spool)
+
+
+	def _send_pending(self) -> None:
+		''' Send the spool and the backlog, oldest records first, until they are empty or sending fails. '''
+		while True:
+			from_spool = bool(self._spool)
+			if from_spool:
+				batch = self._spool.peek(self.batch_size)
+			elif self._backlog:
+				batch = list(itertools.islice(self._backlog, self.batch_size))
+			else:
+				return
+			payload = self.encode(batch)
+			try:
+				self._transport.send(payload, self.compression)
+			except BatchRejected as e:
+				global_config.last_resort_handler({'message': 'ShipperHandler dropped {} records: {}'.format(len(batch), e)})
+				with self._dropped_lock:
+					self.dropped += len(batch)
+			except Exception:
+				self._next_attempt = time.monotonic() + self.retry_interval
+				if self._spool is not None and self._backlog:
+					self._spool_records(list(self._backlog))
+					self._backlog.clear()
+				return
+			else:
+				self.shipped += len(batch)
+				self.count_written(len(payload))
+			if from_spool:
+				self._spool.consume(len(batch))
+			else:
+				for _ in range(len(batch)):
+					self._backlog.popleft()
+
+
+	def _work(self) -> None:
+		while True:
+			if self._closing.is_set():
+				# Ship what is left without waiting for more
+				pass
+			elif self._spool is None and len(self._backlog) >= self.queue_size:
+				# The backlog is full, leave records in the queue so logging threads wait for room
+				self._closing.wait(max(self._next_attempt - time.monotonic(), 0))
+			else:
+				# Collect records for a batch
+				self._wakeup.wait(self.flush_interval)
+				self._wakeup.clear()
+			closing = self._closing.is_set()
+			records = self._take(closing)
+			try:
+				self._add(records)
+				if self._pending() and time.monotonic() >= self._next_attempt:
+					self._send_pending()
+			except Exception:
+				# E.g. the spool's disk is full, there is no single record to blame
+				global_config.last_resort_handler({'message': 'ShipperHandler failed to ship or spool records'})
+				self._next_attempt = time.monotonic() + self.retry_interval
+			if not self._pending():
+				for flushed in self._flushes:
+					flushed.set()
+				self._flushes = []
+			if closing:
+				now = time.monotonic()
+				if not self._pending() or now >= self._close_deadline:
+					self._give_up()
+					return
+				self._closing_retry(now)
+
+
+	def _closing_retry(self, now: float) -> None:
+		# Sleep until the next attempt, but do not overshoot the close deadline
+		time.sleep(max(min(self._next_attempt, self._close_deadline) - now, 0))
+
+
+	def _give_up(self) -> None:
+		''' Keep unsent records in the spool, or count them as lost without one. '''
+		if self._backlog:
+			if self._spool is not None:
+				try:
+					self._spool_records(list(self._backlog))
+				except Exception:
+					with self._dropped_lock:
+						self.dropped += len(self._backlog)
+			else:
+				with self._dropped_lock:
+					self.dropped += len(self._backlog)
+			self._backlog.clear()
+		for flushed in self._flushes:
+			flushed.set()
+		self._flushes = []
+		self._transport.close()
+		if self._spool is not None:
+			self._spool.close()
+
+
+	def flush(self, timeout: Optional[float] = None) -> bool:
+		'''
+		Wait until records queued so far are shipped, for at most `timeout` seconds. Return whether they were.
+		'''
+		if self.is_shutdown:
+			return not self._pending()
+		done = threading.Event()
+		with self._flush_lock:
+			self._flush_requests.append(done)
+		self._wakeup.set()
+		return done.wait(timeout)
+
+
+	def before_fork(self) -> None:
+		'''
+		Records queued in the parent stay with the parent, nothing needs to be written before the fork.
+		'''
+
+
+	def after_fork_in_child(self) -> None:
+		'''
+		Start with an empty queue, a new connection and a spool of the child's own. Records queued or spooled by the
+		parent are left to the parent.
+		'''
+		if self.is_shutdown:
+			# The worker closed the connection and the spool already
+			return
+		# Close only the child's copies of the descriptors, the parent keeps using the connection and the spool
+		self._transport.close()
+		if self._spool is not None:
+			self._spool.close()
+			self.spool_filename = '{}.{}'.format(self.spool_filename, os.getpid())
+		self._setup()
+
+
+	@property
+	def lost_records(self) -> int:
+		return self.dropped
+
+
+	def close(self, timeout: Optional[float] = None) -> None:
+		'''
+		Ship the remaining records for at most `timeout` seconds (`close_timeout` if None). Records which could not be
+		shipped by then are kept in the spool, or counted as dropped without one.
+		'''
+		super().close(timeout)
+		timeout = self.close_timeout if timeout is None else timeout
+		self._close_deadline = time.monotonic() + timeout
+		self._closing.set()
+		self._wakeup.set()
+		self._worker.join(timeout + self.flush_interval)
+		if self._worker.is_alive():
+			# Stuck sending, e.g. a collector that stopped reading
+			with self._dropped_lock:
+				self.dropped += len(self._queue) + len(self._backlog)
@@ -1,10 +1,20 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional # noqa
 
+from logwood import global_config
+from logwood.formatting import CompiledFormat, compile_format
 from logwood.handlers.logging import StderrHandler
 
 
 
 class ColoredStderrHandler(StderrHandler):
+	'''
+	Stderr handler which colors messages by their level.
+
+	The color sequence of each level is folded into a per-level copy of the compiled format, and the reset sequence
+	into the line terminator, so coloring costs nothing per record. With `colors` left as None, colors are used only
+	when stderr is a terminal.
+	'''
+
 	GRAY, RED, GREEN, YELLOW, BLUE, MAGENTA, CYAN, WHITE = range(30, 38)
 
 	COLOR_SEQ = '\033[1;{color:d}m'
@@ -20,13 +30,35 @@ class ColoredStderrHandler(StderrHandler):
 		'FATAL': MAGENTA,
 	}
 
+	def __init__(self, level: int = None, format: str = None, colors: Optional[bool] = None) -> None:
+		super().__init__(level, format)
+		if colors is None:
+			colors = hasattr(self.stream, 'isatty') and self.stream.isatty()
+		self.colors = colors
+		if colors:
+			self.terminator = self.RESET_SEQ + self.terminator
+		# Level name -> compiled format with the color prefix, valid for the format in self._level_formats_for
+		self._level_formats = {} # type: Dict[str, CompiledFormat]
+		self._level_formats_for = None # type: Optional[str]
+
+
+	def _compile_level_formats(self, format: str) -> None:
+		# Color sequences contain no braces nor percent signs, so both formatting styles keep working
+		self._level_formats = {
+			level: compile_format(self.COLOR_SEQ.format(color = color) + format)
+			for level, color in self.COLORS.items()
+		}
+		self._level_formats_for = format
+
+
 	def format_message(self, record: Dict[str, Any]) -> str:
 		'''
-		Add colors to stderr output.
+		Format the record with the color of its level. The reset sequence is written as part of the terminator.
 		'''
-		message = super().format_message(record)
-
-		if record['level'] in self.COLORS:
-			return self.COLOR_SEQ.format(color = self.COLORS[record['level']]) + message + self.RESET_SEQ
+		if not self.colors:
+			return super().format_message(record)
 
-		return message
+		format = self._format or global_config.default_format
+		if format is not self._level_formats_for:
+			self._compile_level_formats(format)
+		return super().format_message(record, self._level_formats.get(record['level']))
@@ -1,4 +1,8 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import errno
+import os
+import socket
+import sys
 import syslog
 
 from logwood.base_handler import Handler
@@ -27,3 +31,79 @@ class SysLogLibHandler(Handler):
 
 	def emit(self, record: Dict[str, Any]) -> None:
 		syslog.syslog(self.facility | self.priority_map[record['level_number']], self.format_message(record))
+
+
+
+class SysLogUnixHandler(Handler):
+	'''
+	A logging handler that sends messages directly to the local syslog daemon's unix datagram socket.
+
+	It is a faster alternative to :class:`SysLogLibHandler`: there is no C library lock and no header formatting per
+	record. The ``<priority>ident[pid]: `` header of every level is computed once and sent together with the
+	message in a single ``send`` call on a connected socket. The timestamp is left to the syslog daemon, which
+	stamps messages on receipt. When the daemon restarts, the handler reconnects and resends the message.
+	'''
+
+	priority_map = SysLogLibHandler.priority_map
+
+
+	def __init__(self, level: int = None, format: str = None, facility = syslog.LOG_LOCAL0, address: str = '/dev/log',
+	ident: Optional[str] = None, encoding: str = 'utf-8') -> None:
+		super().__init__(level, format)
+		self.facility = facility
+		self.address = address
+		self.ident = os.path.basename(sys.argv[0]) if ident is None else ident
+		self.encoding = encoding
+		self.socket = None # type: socket.socket
+		self._headers = {} # type: Dict[int, bytes]
+		self._compute_headers()
+		self._connect()
+
+
+	def _header(self, level_number: int) -> bytes:
+		priority = self.facility | self.priority_map.get(level_number, syslog.LOG_NOTICE)
+		return '<{}>{}[{}]: '.format(priority, self.ident, os.getpid()).encode(self.encoding)
+
+
+	def _compute_headers(self) -> None:
+		self._headers = {level_number: self._header(level_number) for level_number in self.priority_map}
+
+
+	def _connect(self) -> None:
+		sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+		try:
+			sock.connect(self.address)
+		except OSError:
+			sock.close()
+			raise
+		self.socket = sock
+
+
+	def emit(self, record: Dict[str, Any]) -> None:
+		level_number = record['level_number']
+		try:
+			header = self._headers[level_number]
+		except KeyError:
+			header = self._headers[level_number] = self._header(level_number)
+		# Concatenating the short header is cheaper than passing both buffers to sendmsg
+		data = header + self.format_message(record).encode(self.encoding, 'backslashreplace')
+		try:
+			self.socket.send(data)
+		except OSError as e:
+			if e.errno == errno.EMSGSIZE:
+				raise
+			# The daemon was restarted (or a previous reconnect failed), reconnect and try once more
+			self.socket.close()
+			self._connect()
+			self.socket.send(data)
+		self.count_written(len(data))
+
+
+	def after_fork_in_child(self) -> None:
+		''' Headers contain the process id, compute them again. '''
+		self._compute_headers()
+
+
+	def close(self, timeout: Optional[float] = None) -> None:
+		super().close(timeout)
+		self.socket.close()
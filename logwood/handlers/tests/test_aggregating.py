@@ -0,0 +1,128 @@
+import io
+import json
+import unittest.mock
+
+import logwood
+from logwood.handlers.aggregating import AggregatingHandler
+from logwood.handlers.json import JsonHandler
+from logwood.testing import MockLogwoodHandler
+
+
+
+def _logger(*handlers):
+	logwood.basic_config(handlers = list(handlers), format = '{message}', level = logwood.DEBUG)
+	return logwood.get_logger('app')
+
+
+def _counts(summary):
+	return [(entry['level'], entry['template'], entry['count']) for entry in summary['templates']]
+
+
+def test_counts_per_template():
+	handler = AggregatingHandler()
+	logger = _logger(handler)
+	for i in range(5):
+		logger.info('Order {} filled', i)
+	logger.error('Order {} rejected', 7)
+	logger.info('Started')
+	logwood.get_logger('other').info('Order {} filled', 1)
+
+	summary = handler.current()
+	assert summary['records'] == 8
+	assert _counts(summary) == [
+		('INFO', 'Order {} filled', 5),
+		('ERROR', 'Order {} rejected', 1),
+		('INFO', 'Started', 1),
+		('INFO', 'Order {} filled', 1),
+	]
+	assert summary['templates'][0]['name'] == 'app'
+	assert summary['templates'][0]['samples'] == [(0,), (1,), (2,), (3,), (4,)]
+	assert summary['templates'][2]['samples'] == []
+
+
+def test_template_after_formatting():
+	''' Records already formatted by another handler are counted by their template. '''
+	aggregating, mock = AggregatingHandler(), MockLogwoodHandler()
+	logger = _logger(mock, aggregating)
+	logger.info('Order {} filled', 1)
+	logger.info('Order %d filled', 2)
+	assert mock['INFO'] == ['Order 1 filled', 'Order 2 filled']
+	assert [(entry['template'], entry['samples']) for entry in aggregating.current()['templates']] == [
+		('Order {} filled', [(1,)]),
+		('Order %d filled', [(2,)]),
+	]
+
+
+def test_unhashable_messages(capsys):
+	handler = AggregatingHandler()
+	logger = _logger(handler)
+	logger.info({'a': 1})
+	logger.info({'a': 1})
+	logger.info(['a'])
+	assert _counts(handler.current()) == [('INFO', "{'a': 1}", 2), ('INFO', "['a']", 1)]
+	assert 'LOGWOOD ERROR' not in capsys.readouterr()[1]
+
+
+def test_reservoir_sample():
+	handler = AggregatingHandler(sample_size = 10)
+	logger = _logger(handler)
+	for i in range(10000):
+		logger.debug('Tick {}', i)
+	entry, = handler.current()['templates']
+	assert entry['count'] == 10000
+	assert len(entry['samples']) == 10
+	assert len(set(entry['samples'])) == 10
+	# A uniform sample, not just the first records
+	assert max(args[0] for args in entry['samples']) >= 1000
+
+
+def test_windows_and_summaries():
+	summaries = MockLogwoodHandler(format = '{message} {samples}')
+	handler = AggregatingHandler(summary_handler = summaries, window = 10, sample_size = 1)
+	logger = _logger(handler)
+	with unittest.mock.patch('time.time', return_value = 1005.0):
+		logger.warning('Slow {}', 'db')
+		logger.warning('Slow {}', 'db')
+		logger.info('Quiet')
+	assert summaries['WARNING'] == []
+	with unittest.mock.patch('time.time', return_value = 1012.0):
+		logger.info('Quiet')
+
+	assert summaries['WARNING'] == ["2 records in 10 s: Slow {} [('db',)]"]
+	assert summaries['INFO'] == ['1 records in 10 s: Quiet []']
+	closed, = handler.history
+	assert (closed['start'], closed['end'], closed['records']) == (1000.0, 1010.0, 3)
+	assert handler.current()['start'] == 1010.0
+
+	handler.close()
+	assert summaries['INFO'][-1] == '1 records in 10 s: Quiet []'
+	assert len(handler.history) == 2
+	assert summaries.is_shutdown
+
+
+def test_max_templates():
+	handler = AggregatingHandler(max_templates = 2)
+	logger = _logger(handler)
+	for template in ('a {}', 'b {}', 'c {}', 'd {}', 'a {}'):
+		logger.info(template, 1)
+	assert _counts(handler.current()) == [('INFO', 'a {}', 2), ('INFO', None, 2), ('INFO', 'b {}', 1)]
+
+
+def test_level():
+	handler = AggregatingHandler(level = logwood.WARNING)
+	logger = _logger(handler)
+	logger.info('Ignored')
+	logger.error('Counted')
+	assert _counts(handler.current()) == [('ERROR', 'Counted', 1)]
+
+
+def test_json_summaries():
+	''' Summaries written by JsonHandler keep their template. '''
+	stream = io.StringIO()
+	handler = AggregatingHandler(summary_handler = JsonHandler(stream = stream))
+	logger = _logger(handler)
+	logger.warning('Slow {}', 'db')
+	handler.flush()
+	summary = json.loads(stream.getvalue())
+	assert (summary['message_template'], summary['count'], summary['samples']) == ('Slow {}', 1, [['db']])
+	assert summary['message'] == '1 records in 60 s: Slow {}'
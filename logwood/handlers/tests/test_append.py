@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+import logwood
+import logwood.testing
+from logwood.handlers.append import AppendFileHandler
+
+
+
+def _write_lines(filename, process_number):
+	logwood.testing.reset_state()
+	logwood.basic_config(handlers = [AppendFileHandler(format = '{message}', filename = filename, batch_size = 5)])
+	logger = logwood.get_logger('Test')
+	for i in range(200):
+		logger.info('{}-{:03d}-{}', process_number, i, 'x' * 500)
+	logwood.shutdown()
+
+
+def test_many_processes(tmpdir):
+	'''
+	Lines written by several processes to one file do not tear.
+	'''
+	filename = str(tmpdir.join('shared.log'))
+	context = multiprocessing.get_context('fork')
+	processes = [context.Process(target = _write_lines, args = (filename, n)) for n in range(4)]
+	for process in processes:
+		process.start()
+	for process in processes:
+		process.join()
+		assert process.exitcode == 0
+
+	with open(filename) as f:
+		lines = f.read().splitlines()
+	assert sorted(lines) == sorted('{}-{:03d}-{}'.format(n, i, 'x' * 500) for n in range(4) for i in range(200))
+
+
+def test_batches(tmpdir, monkeypatch):
+	filename = str(tmpdir.join('batched.log'))
+	handler = AppendFileHandler(format = '{message}', filename = filename, batch_size = 3, max_write_size = 20)
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+
+	writes = []
+	original_write = os.write
+	monkeypatch.setattr(os, 'write', lambda fd, data: writes.append(data) or original_write(fd, data))
+
+	for message in ('aaaa', 'bbbb', 'cccc', 'dddd', 'eeeeeeeeeeeeeeeeeeeeeeee', 'ffff'):
+		logger.info(message)
+	handler.close()
+
+	assert writes == [
+		b'aaaa\nbbbb\ncccc\n',
+		b'dddd\n',
+		b'eeeeeeeeeeeeeeeeeeeeeeee\n',
+		b'ffff\n',
+	]
+	with open(filename) as f:
+		assert f.read() == 'aaaa\nbbbb\ncccc\ndddd\neeeeeeeeeeeeeeeeeeeeeeee\nffff\n'
+
+
+def test_delay(tmpdir):
+	filename = str(tmpdir.join('delayed.log'))
+	handler = AppendFileHandler(format = '{message}', filename = filename, delay = True)
+	assert not os.path.exists(filename)
+	logwood.basic_config(handlers = [handler])
+	logwood.get_logger('Test').info('Message')
+	handler.close()
+	with open(filename) as f:
+		assert f.read() == 'Message\n'
+
+
+def test_idle_batch_is_written(tmpdir):
+	''' A batch is written after flush_interval seconds even if no further record arrives. '''
+	filename = str(tmpdir.join('idle.log'))
+	handler = AppendFileHandler(format = '{message}', filename = filename, batch_size = 100, flush_interval = 0.05)
+	logwood.basic_config(handlers = [handler])
+	logwood.get_logger('Test').info('Idle')
+	deadline = time.monotonic() + 5
+	while os.path.getsize(filename) == 0 and time.monotonic() < deadline:
+		time.sleep(0.01)
+	with open(filename) as f:
+		assert f.read() == 'Idle\n'
+	handler.close()
+
+
+def test_delayed_open_from_threads(tmpdir):
+	''' Threads logging the first records at the same time open the file once. '''
+	filename = str(tmpdir.join('delayed.log'))
+	handler = AppendFileHandler(format = '{message}', filename = filename, delay = True)
+	opened = []
+	original_open = handler._open
+
+	def slow_open():
+		opened.append(1)
+		time.sleep(0.05)
+		return original_open()
+
+	handler._open = slow_open
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+	threads = [threading.Thread(target = logger.info, args = ('Thread {}', i)) for i in range(4)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	handler.close()
+	assert len(opened) == 1
+	with open(filename) as f:
+		assert sorted(f.read().splitlines()) == ['Thread {}'.format(i) for i in range(4)]
+
+
+def test_emit_after_close(tmpdir):
+	handler = AppendFileHandler(format = '{message}', filename = str(tmpdir.join('closed.log')))
+	handler.close()
+	with pytest.raises(RuntimeError, match = 'AppendFileHandler is closed'):
+		handler.emit({'message': 'Late', 'timestamp': time.time()})
@@ -0,0 +1,83 @@
+import io
+import threading
+
+import pytest
+
+import logwood
+from logwood.handlers.buffered import ThreadBufferedStreamHandler
+
+
+
+def test_lines_from_many_threads():
+	'''
+	All lines from all threads are written whole.
+	'''
+	stream = io.StringIO()
+	handler = ThreadBufferedStreamHandler(stream = stream, format = '{message}', flush_interval = 0.01, chunk_lines = 10)
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+
+	def log(thread_number):
+		for i in range(100):
+			logger.info('{}-{}-' + 'x' * 100, thread_number, i)
+
+	threads = [threading.Thread(target = log, args = (n,)) for n in range(8)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	handler.close()
+
+	lines = stream.getvalue().splitlines()
+	assert sorted(lines) == sorted('{}-{}-'.format(n, i) + 'x' * 100 for n in range(8) for i in range(100))
+	# Lines of finished threads are not kept around
+	assert handler._buffers == [] or all(thread_ref() is threading.current_thread() for thread_ref, _ in handler._buffers)
+
+
+def test_ordered():
+	stream = io.StringIO()
+	handler = ThreadBufferedStreamHandler(stream = stream, format = '{message}', flush_interval = 60, ordered = True)
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+
+	barrier = threading.Barrier(2)
+	def log(name):
+		for i in range(20):
+			logger.info(name)
+			barrier.wait()
+
+	threads = [threading.Thread(target = log, args = (name,)) for name in 'ab']
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert stream.getvalue() == ''
+	handler.flush()
+	lines = stream.getvalue().splitlines()
+	assert len(lines) == 40
+	# Each round of both threads must be written before the next one
+	for i in range(0, 40, 2):
+		assert sorted(lines[i:i + 2]) == ['a', 'b']
+	handler.close()
+
+
+def test_failed_write_is_counted():
+	class FailingStream(io.StringIO):
+		def write(self, data):
+			raise OSError('Disk full')
+
+	handler = ThreadBufferedStreamHandler(stream = FailingStream(), format = '{message}', flush_interval = 60)
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+	for i in range(3):
+		logger.info('Line {}', i)
+	with pytest.raises(OSError):
+		handler.flush()
+	assert handler.lost_records == 3
+
+
+def test_emit_after_close():
+	handler = ThreadBufferedStreamHandler(stream = io.StringIO(), format = '{message}')
+	handler.close()
+	with pytest.raises(RuntimeError, match = 'ThreadBufferedStreamHandler is closed'):
+		handler.emit({'message': 'Late', 'timestamp': 0.0})
@@ -0,0 +1,166 @@
+import gzip
+import os
+import time
+import zlib
+
+import pytest
+
+import logwood
+from logwood.handlers import compressed
+from logwood.handlers.compressed import CompressedFileHandler
+
+
+
+def _logger(handler):
+	logwood.basic_config(handlers = [handler], format = '{message}')
+	return logwood.get_logger('Test')
+
+
+def _decompress_partial(filename):
+	''' Decompress a gzip stream which was not finished, like a tail reader would. '''
+	with open(filename, 'rb') as f:
+		return zlib.decompressobj(31).decompress(f.read())
+
+
+def test_gzip_stream(tmpdir):
+	filename = str(tmpdir.join('app.log.gz'))
+	handler = CompressedFileHandler(filename = filename)
+	logger = _logger(handler)
+	for i in range(1000):
+		logger.info('Order {} filled', i)
+	handler.close()
+
+	with gzip.open(filename, 'rt') as f:
+		assert f.read() == ''.join('Order {} filled\n'.format(i) for i in range(1000))
+	assert os.path.getsize(filename) < 1000 * len('Order 999 filled\n') / 4
+
+
+def test_blocks_are_readable_before_close(tmpdir, monkeypatch):
+	filename = str(tmpdir.join('app.log.gz'))
+	handler = CompressedFileHandler(filename = filename, block_size = 30)
+	logger = _logger(handler)
+
+	writes = []
+	original_write = os.write
+	monkeypatch.setattr(os, 'write', lambda fd, data: writes.append(data) or original_write(fd, data))
+
+	for message in ('aaaaaaaaaa', 'bbbbbbbbbb', 'cccccccccc', 'dddddddddd'):
+		logger.info(message)
+	# The first three lines filled a block, the last one waits for more
+	assert len(writes) == 1
+	assert _decompress_partial(filename) == b'aaaaaaaaaa\nbbbbbbbbbb\ncccccccccc\n'
+
+	handler.flush()
+	assert len(writes) == 2
+	assert _decompress_partial(filename) == b'aaaaaaaaaa\nbbbbbbbbbb\ncccccccccc\ndddddddddd\n'
+
+
+def test_flush_interval(tmpdir):
+	filename = str(tmpdir.join('app.log.gz'))
+	handler = CompressedFileHandler(filename = filename, flush_interval = 0)
+	logger = _logger(handler)
+	logger.info('written right away')
+	assert _decompress_partial(filename) == b'written right away\n'
+
+
+def test_idle_block_is_written(tmpdir):
+	''' A block is written after flush_interval seconds even if no further record arrives. '''
+	filename = str(tmpdir.join('app.log.gz'))
+	handler = CompressedFileHandler(filename = filename, flush_interval = 0.05)
+	logger = _logger(handler)
+	logger.info('idle')
+	deadline = time.monotonic() + 5
+	while os.path.getsize(filename) == 0 and time.monotonic() < deadline:
+		time.sleep(0.01)
+	assert _decompress_partial(filename) == b'idle\n'
+	handler.close()
+
+
+def test_appending_to_existing_file(tmpdir):
+	filename = str(tmpdir.join('app.log.gz'))
+	for message in ('first run', 'second run'):
+		handler = CompressedFileHandler(format = '{message}', filename = filename)
+		handler.emit({'message': message, 'timestamp': 0.0})
+		handler.close()
+
+	with gzip.open(filename, 'rt') as f:
+		assert f.read() == 'first run\nsecond run\n'
+
+
+def test_delay_without_records(tmpdir):
+	filename = str(tmpdir.join('app.log.gz'))
+	CompressedFileHandler(filename = filename, delay = True).close()
+	assert not os.path.exists(filename)
+
+
+def test_custom_codec(tmpdir, monkeypatch):
+	class UpperCodec:
+		def __init__(self, compression_level):
+			pass
+
+		def compress_block(self, data):
+			return data.upper()
+
+		def finish(self):
+			return b'END\n'
+
+	monkeypatch.setitem(compressed.CODECS, 'upper', None)
+	compressed.register_codec('upper', UpperCodec)
+	filename = str(tmpdir.join('app.log.upper'))
+	handler = CompressedFileHandler(filename = filename, codec = 'upper')
+	_logger(handler).info('hello')
+	handler.close()
+
+	with open(filename) as f:
+		assert f.read() == 'HELLO\nEND\n'
+
+
+def test_unknown_codec(tmpdir):
+	with pytest.raises(ValueError):
+		CompressedFileHandler(filename = str(tmpdir.join('app.log.br')), codec = 'brotli')
+
+
+def test_zstd(tmpdir):
+	zstandard = pytest.importorskip('zstandard')
+	filename = str(tmpdir.join('app.log.zst'))
+	handler = CompressedFileHandler(filename = filename, codec = 'zstd')
+	_logger(handler).info('hello')
+	handler.close()
+
+	with open(filename, 'rb') as f:
+		assert zstandard.ZstdDecompressor().decompressobj().decompress(f.read()) == b'hello\n'
+
+
+def test_fork(tmpdir):
+	filename = str(tmpdir.join('app.log.gz'))
+	handler = CompressedFileHandler(filename = filename)
+	logger = _logger(handler)
+	logger.info('parent before')
+
+	pid = os.fork()
+	if pid == 0:
+		try:
+			logger.info('child')
+			handler.close()
+		finally:
+			os._exit(0)
+	os.waitpid(pid, 0)
+	logger.info('parent after')
+	handler.close()
+
+	with gzip.open(filename, 'rt') as f:
+		assert f.read() == 'parent before\nparent after\n'
+	with gzip.open(str(tmpdir.join('app.log.{}.gz'.format(pid))), 'rt') as f:
+		assert f.read() == 'child\n'
+
+
+def test_emit_after_close(tmpdir):
+	''' Records emitted after close raise instead of writing into the finished stream. '''
+	filename = str(tmpdir.join('app.log.gz'))
+	handler = CompressedFileHandler(filename = filename)
+	_logger(handler).info('Written')
+	handler.close()
+	with pytest.raises(RuntimeError, match = 'CompressedFileHandler is closed'):
+		handler.emit({'message': 'Late', 'timestamp': time.time()})
+	with gzip.open(filename, 'rt') as f:
+		assert f.read() == 'Written\n'
@@ -0,0 +1,75 @@
+import io
+import json
+
+import logwood
+from logwood.handlers.json import JsonHandler
+
+
+
+def test_emit():
+	stream = io.StringIO()
+	logwood.basic_config(handlers = [JsonHandler(stream = stream)])
+	logger = logwood.get_logger('Test')
+	logger.warning('Value is {}', 42)
+	data = json.loads(stream.getvalue())
+	assert data['message'] == 'Value is 42'
+	assert data['name'] == 'Test'
+	assert data['level'] == 'WARNING'
+	assert 'args' not in data
+
+
+def test_emit_selected_fields():
+	stream = io.StringIO()
+	logwood.basic_config(handlers = [JsonHandler(stream = stream, fields = ['level', 'message', 'funcName'])])
+	logger = logwood.get_logger('Test')
+	logger.info('Hello')
+	assert json.loads(stream.getvalue()) == {'level': 'INFO', 'message': 'Hello', 'funcName': 'test_emit_selected_fields'}
+
+
+def test_structured_exception():
+	stream = io.StringIO()
+	logwood.basic_config(handlers = [JsonHandler(stream = stream)])
+	logger = logwood.get_logger('Test')
+	try:
+		raise ValueError('My value error')
+	except ValueError:
+		logger.exception('Failed')
+	data = json.loads(stream.getvalue())
+	assert data['message'] == 'Failed'
+	assert data['exception']['type'] == 'ValueError'
+	assert data['exception']['message'] == 'My value error'
+	assert data['exception']['frames'][0]['function'] == 'test_structured_exception'
+
+
+def test_text_exception():
+	stream = io.StringIO()
+	logwood.basic_config(handlers = [JsonHandler(stream = stream, structured_exceptions = False)])
+	logger = logwood.get_logger('Test')
+	try:
+		raise ValueError('My value error')
+	except ValueError:
+		logger.exception('Failed')
+	data = json.loads(stream.getvalue())
+	assert 'exception' not in data
+	assert data['exc_text'].endswith('ValueError: My value error')
+
+
+def test_keyword_fields():
+	stream = io.StringIO()
+	logwood.basic_config(handlers = [JsonHandler(stream = stream, fields = ['message', 'qty', 'px'])])
+	logger = logwood.get_logger('Test')
+	logger.info('Order filled', qty = 5, px = 101.2)
+	assert json.loads(stream.getvalue()) == {'message': 'Order filled', 'qty': 5, 'px': 101.2}
+
+
+def test_selected_fields_outside_record():
+	'''
+	Selected fields are found in context variables, bound fields and default record variables as well.
+	'''
+	stream = io.StringIO()
+	logwood.basic_config(handlers = [JsonHandler(stream = stream, fields = ['hostname', 'request_id', 'message', 'venue', 'missing'])],
+		record_variables = {'hostname': 'host'})
+	logger = logwood.get_logger('Test').bind(venue = 'X')
+	with logwood.context(request_id = 7):
+		logger.info('hi')
+	assert json.loads(stream.getvalue()) == {'hostname': 'host', 'request_id': 7, 'message': 'hi', 'venue': 'X'}
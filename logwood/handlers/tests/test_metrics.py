@@ -0,0 +1,131 @@
+import itertools
+import threading
+import time
+import urllib.error
+import unittest.mock
+import urllib.request
+
+import pytest
+
+import logwood
+import logwood.state
+from logwood.handlers.metrics import MetricsHandler, _counter_value
+from logwood.handlers.threaded import ThreadedHandler
+
+
+
+def _logger(handler, name = 'app'):
+	logwood.basic_config(handlers = [handler], level = logwood.DEBUG)
+	return logwood.get_logger(name)
+
+
+def test_counts():
+	handler = MetricsHandler()
+	logger = _logger(handler)
+	logger.info('a')
+	logger.info('b')
+	logger.error('c')
+	logwood.get_logger('other').debug('d')
+	assert handler.counts() == {('app', 'INFO'): 2, ('app', 'ERROR'): 1, ('other', 'DEBUG'): 1}
+
+
+def test_concurrent_counting():
+	handler = MetricsHandler()
+	logger = _logger(handler)
+
+	def log():
+		for _ in range(2000):
+			logger.info('x')
+
+	threads = [threading.Thread(target = log) for _ in range(8)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert handler.counts() == {('app', 'INFO'): 16000}
+
+
+def test_render():
+	handler = MetricsHandler()
+	logger = _logger(handler, 'app "main"\n')
+	logger.warning('a')
+	logwood.state.last_resort_calls = 3
+
+	assert handler.render() == (
+		'# HELP logwood_records_total Records logged, by logger and level.\n'
+		'# TYPE logwood_records_total counter\n'
+		'logwood_records_total{logger="app \\"main\\"\\n",level="WARNING"} 1\n'
+		'# HELP logwood_lost_records_total Records accepted by handlers but never written, by handler class.\n'
+		'# TYPE logwood_lost_records_total counter\n'
+		'logwood_lost_records_total{handler="MetricsHandler"} 0\n'
+		'# HELP logwood_handler_errors_total Records passed to the last resort handler because a handler failed.\n'
+		'# TYPE logwood_handler_errors_total counter\n'
+		'logwood_handler_errors_total 3\n'
+	)
+
+
+def test_lost_records_of_closed_handlers():
+	''' Records lost while a handler closes are exported, after it left the defined handlers. '''
+	handler = MetricsHandler()
+	release = threading.Event()
+	stuck = ThreadedHandler(underlying_handler = unittest.mock.Mock(emit = lambda record: release.wait(10)))
+	logger = _logger(handler)
+	logwood.get_logger('app').add_handler(stuck)
+	for _ in range(3):
+		logger.info('a')
+	stuck.close(timeout = 0.1)
+	release.set()
+	assert stuck not in logwood.state.defined_handlers
+	assert 'logwood_lost_records_total{handler="ThreadedHandler"} 2\n' in handler.render()
+
+
+def test_counter_repr():
+	''' Counter values are read from the repr of itertools.count, make sure its format still fits. '''
+	counter = itertools.count(1)
+	assert _counter_value(counter) == 1
+	for _ in range(12345):
+		next(counter)
+	assert _counter_value(counter) == 12346
+
+
+def test_http_server():
+	handler = MetricsHandler(port = 0)
+	logger = _logger(handler)
+	logger.info('a')
+	host, port = handler.server_address
+	assert host == '127.0.0.1'
+
+	with urllib.request.urlopen('http://127.0.0.1:{}/metrics'.format(port)) as response:
+		assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+		assert 'logwood_records_total{logger="app",level="INFO"} 1\n' in response.read().decode()
+	with pytest.raises(urllib.error.HTTPError):
+		urllib.request.urlopen('http://127.0.0.1:{}/other'.format(port))
+
+	handler.close()
+	with pytest.raises(urllib.error.URLError):
+		urllib.request.urlopen('http://127.0.0.1:{}/metrics'.format(port), timeout = 1)
+
+
+def test_textfile(tmpdir):
+	filename = str(tmpdir.join('logwood.prom'))
+	handler = MetricsHandler(textfile = filename, interval = 0.01)
+	logger = _logger(handler)
+	logger.error('a')
+
+	deadline = time.monotonic() + 5
+	while time.monotonic() < deadline:
+		try:
+			with open(filename) as f:
+				if 'level="ERROR"} 1\n' in f.read():
+					break
+		except FileNotFoundError:
+			pass
+		time.sleep(0.01)
+	else:
+		pytest.fail('textfile was not written')
+
+	logger.error('b')
+	handler.close()
+	with open(filename) as f:
+		assert 'logwood_records_total{logger="app",level="ERROR"} 2\n' in f.read()
+	assert tmpdir.listdir() == [tmpdir.join('logwood.prom')]
@@ -0,0 +1,140 @@
+import os
+import time
+
+import pytest
+
+import logwood
+from logwood.handlers.nonblocking import NonBlockingStreamHandler
+
+
+
+@pytest.fixture
+def pipe():
+	read_fd, write_fd = os.pipe()
+	yield read_fd, write_fd
+	os.close(read_fd)
+	os.close(write_fd)
+
+
+def _read_all(fd):
+	os.set_blocking(fd, False)
+	chunks = []
+	while True:
+		try:
+			chunk = os.read(fd, 65536)
+		except BlockingIOError:
+			break
+		if not chunk:
+			break
+		chunks.append(chunk)
+	return b''.join(chunks)
+
+
+def _fill(handler, logger, line):
+	''' Log until the pipe is full and some lines are buffered. Return number of logged lines. '''
+	count = 0
+	while not handler._pending:
+		logger.info(line, count)
+		count += 1
+	return count
+
+
+def test_write(pipe):
+	read_fd, write_fd = pipe
+	handler = NonBlockingStreamHandler(format = '{message}', stream = write_fd, flush_interval = None)
+	logwood.basic_config(handlers = [handler])
+	logwood.get_logger('Test').info('Hello')
+	assert os.read(read_fd, 100) == b'Hello\n'
+	# The original descriptor stays blocking
+	assert os.get_blocking(write_fd)
+	handler.close()
+
+
+def test_full_pipe_does_not_block(pipe):
+	read_fd, write_fd = pipe
+	handler = NonBlockingStreamHandler(format = '{message}', stream = write_fd, buffer_size = 10000, flush_interval = None)
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+	line = '{:06d}' + 'x' * 93
+	logged = _fill(handler, logger, line)
+	start = time.perf_counter()
+	for _ in range(1000):
+		logger.info(line, logged)
+		logged += 1
+	assert time.perf_counter() - start < 1
+	assert handler._pending_bytes <= 10000
+	assert handler.dropped > 0
+
+	output = _read_all(read_fd)
+	handler.close()
+	output += _read_all(read_fd)
+	lines = output.decode().splitlines()
+	# Only whole lines were written and the kept ones are the oldest
+	assert lines == [line.format(i) for i in range(len(lines))]
+	assert len(lines) + handler.dropped == logged
+
+
+def test_drop_oldest(pipe):
+	read_fd, write_fd = pipe
+	handler = NonBlockingStreamHandler(format = '{message}', stream = write_fd, buffer_size = 1000, drop = 'oldest',
+		flush_interval = None)
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+	line = '{:06d}' + 'x' * 93
+	logged = _fill(handler, logger, line)
+	for _ in range(100):
+		logger.info(line, logged)
+		logged += 1
+
+	output = _read_all(read_fd)
+	handler.close()
+	output += _read_all(read_fd)
+	lines = output.decode().splitlines()
+	# The newest lines survived
+	assert lines[-1] == line.format(logged - 1)
+	assert all(len(l) == 99 for l in lines)
+	assert len(lines) + handler.dropped == logged
+
+
+def test_helper_thread_writes_buffer(pipe):
+	read_fd, write_fd = pipe
+	handler = NonBlockingStreamHandler(format = '{message}', stream = write_fd, flush_interval = 0.01)
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+	line = '{:06d}' + 'x' * 93
+	logged = _fill(handler, logger, line)
+
+	output = b''
+	deadline = time.monotonic() + 5
+	while handler._pending and time.monotonic() < deadline:
+		output += _read_all(read_fd)
+		time.sleep(0.01)
+	output += _read_all(read_fd)
+	assert output.decode().splitlines() == [line.format(i) for i in range(logged)]
+	assert handler.dropped == 0
+	handler.close()
+
+
+def test_regular_file_shares_offset(tmpdir):
+	''' A file opened without O_APPEND is written at its current offset, other output is not overwritten. '''
+	filename = str(tmpdir.join('stderr'))
+	with open(filename, 'wb', buffering = 0) as f:
+		f.write(b'before\n')
+		handler = NonBlockingStreamHandler(format = '{message}', stream = f)
+		logwood.basic_config(handlers = [handler])
+		logwood.get_logger('Test').info('Logged')
+		f.write(b'after\n')
+		handler.close()
+	with open(filename, 'rb') as f:
+		assert f.read() == b'before\nLogged\nafter\n'
+
+
+def test_closed(pipe):
+	read_fd, write_fd = pipe
+	handler = NonBlockingStreamHandler(format = '{message}', stream = write_fd, flush_interval = None)
+	handler.close()
+	assert handler.fd is None
+	# A second close does not touch a descriptor number reused meanwhile
+	handler.close()
+	with pytest.raises(RuntimeError):
+		handler.emit({'message': 'Late', 'level_number': logwood.INFO})
@@ -0,0 +1,357 @@
+import gzip
+import http.server
+import json
+import os
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+import logwood
+import logwood.testing
+from logwood.handlers.shipper import DiskSpool, ShipperHandler
+
+
+
+class Collector:
+	'''
+	TCP collector stand-in on localhost, keeps everything it receives.
+	'''
+
+	def __init__(self, port = 0):
+		self.socket = socket.socket()
+		self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self.socket.bind(('127.0.0.1', port))
+		self.socket.listen()
+		self.socket.settimeout(0.05)
+		self.data = b''
+		self.connections = 0
+		self.disconnections = 0
+		self._lock = threading.Lock()
+		self._running = True
+		self._threads = [threading.Thread(target = self._accept, daemon = True)]
+		self._threads[0].start()
+
+
+	@property
+	def port(self):
+		return self.socket.getsockname()[1]
+
+
+	def _accept(self):
+		while self._running:
+			try:
+				connection, _ = self.socket.accept()
+			except socket.timeout:
+				continue
+			self.connections += 1
+			thread = threading.Thread(target = self._receive, args = (connection,), daemon = True)
+			thread.start()
+			self._threads.append(thread)
+
+
+	def _receive(self, connection):
+		connection.settimeout(0.05)
+		with connection:
+			while self._running:
+				try:
+					data = connection.recv(65536)
+				except socket.timeout:
+					continue
+				if not data:
+					with self._lock:
+						self.disconnections += 1
+					return
+				with self._lock:
+					self.data += data
+
+
+	def lines(self):
+		with self._lock:
+			return self.data.decode().splitlines()
+
+
+	def wait(self, condition):
+		''' Wait until `condition()` is true, the shipper's flush only means the kernel accepted the data. '''
+		deadline = time.monotonic() + 5
+		while not condition() and time.monotonic() < deadline:
+			time.sleep(0.01)
+
+
+	def messages(self, count):
+		''' Wait until `count` JSON lines arrived and return their messages. '''
+		self.wait(lambda: len(self.lines()) >= count)
+		return [json.loads(line)['message'] for line in self.lines()]
+
+
+	def close(self):
+		self._running = False
+		for thread in self._threads:
+			thread.join()
+		self.socket.close()
+
+
+@pytest.fixture
+def collector():
+	collector = Collector()
+	yield collector
+	collector.close()
+
+
+def _free_port():
+	with socket.socket() as s:
+		s.bind(('127.0.0.1', 0))
+		return s.getsockname()[1]
+
+
+def _logger(handler):
+	logwood.basic_config(handlers = [handler], level = logwood.DEBUG)
+	return logwood.get_logger('app')
+
+
+def test_tcp_ndjson(collector):
+	handler = ShipperHandler(url = 'tcp://127.0.0.1:{}'.format(collector.port), flush_interval = 0.01)
+	logger = _logger(handler)
+	logger.info('Order {} filled', 1, qty = 5)
+	logger.error('Rejected')
+	assert handler.flush(5)
+	collector.wait(lambda: len(collector.lines()) >= 2)
+	record = json.loads(collector.lines()[0])
+	assert (record['name'], record['level'], record['message'], record['qty']) == ('app', 'INFO', 'Order 1 filled', 5)
+	assert 'template' not in record
+
+	logger.info('Again')
+	assert collector.messages(3) == ['Order 1 filled', 'Rejected', 'Again']
+	# One persistent connection
+	assert collector.connections == 1
+	handler.close()
+	assert (handler.shipped, handler.lost_records) == (3, 0)
+
+
+def test_length_framing_and_gzip(collector):
+	handler = ShipperHandler(url = 'tcp://127.0.0.1:{}'.format(collector.port), format = '{level} {message}',
+		framing = 'length', compression = 'gzip', flush_interval = 0.01)
+	logger = _logger(handler)
+	logger.info('one\ntwo')
+	assert handler.flush(5)
+	logger.warning('three')
+	handler.close()
+	# All data was received once the collector sees the connection closed
+	collector.wait(lambda: collector.disconnections == 1)
+
+	# Every batch is a gzip member, the connection carries a multi-member gzip stream
+	data = gzip.decompress(collector.data)
+	messages = []
+	while data:
+		length, = struct.unpack('>I', data[:4])
+		messages.append(data[4:4 + length].decode())
+		data = data[4 + length:]
+	assert messages == ['INFO one\ntwo', 'WARNING three']
+
+
+def test_reconnect(collector):
+	handler = ShipperHandler(url = 'tcp://127.0.0.1:{}'.format(collector.port), flush_interval = 0.01)
+	logger = _logger(handler)
+	logger.info('one')
+	assert collector.messages(1) == ['one']
+
+	port = collector.port
+	collector.close()
+	restarted = Collector(port)
+	try:
+		# The closed connection is noticed before sending
+		logger.info('two')
+		assert restarted.messages(1) == ['two']
+		handler.close()
+	finally:
+		restarted.close()
+
+
+def test_high_descriptor_numbers(collector):
+	''' Sockets above FD_SETSIZE (1024), which select() cannot handle, are checked for liveness too. '''
+	resource = pytest.importorskip('resource')
+	soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+	if soft != resource.RLIM_INFINITY and soft < 1200:
+		pytest.skip('Too few file descriptors allowed')
+	fds = [os.open(os.devnull, os.O_RDONLY) for _ in range(1100)]
+	try:
+		handler = ShipperHandler(url = 'tcp://127.0.0.1:{}'.format(collector.port), flush_interval = 0.01)
+		logger = _logger(handler)
+		logger.info('one')
+		assert handler.flush(5)
+		logger.info('two')
+		assert handler.flush(5)
+		assert collector.messages(2) == ['one', 'two']
+		handler.close()
+		assert handler.lost_records == 0
+	finally:
+		for fd in fds:
+			os.close(fd)
+
+
+def test_backpressure_without_spool():
+	port = _free_port()
+	handler = ShipperHandler(url = 'tcp://127.0.0.1:{}'.format(port), queue_size = 10, batch_size = 5,
+		flush_interval = 0.01, block_timeout = 0.01, retry_interval = 0.05)
+	logger = _logger(handler)
+	start = time.monotonic()
+	for i in range(100):
+		logger.info('Record {}', i)
+	assert time.monotonic() - start < 5
+	# At most the queue and the backlog are kept
+	assert handler.dropped >= 100 - 2 * 10 - 5
+
+	collector = Collector(port)
+	try:
+		assert handler.flush(5)
+		handler.close()
+		messages = collector.messages(100 - handler.dropped)
+		assert len(messages) + handler.lost_records == 100
+		# The oldest records are kept, in order
+		assert messages == ['Record {}'.format(i) for i in range(len(messages))]
+	finally:
+		collector.close()
+
+
+def test_spool_replay(tmpdir):
+	port = _free_port()
+	spool = str(tmpdir.join('shipper.spool'))
+	handler = ShipperHandler(url = 'tcp://127.0.0.1:{}'.format(port), spool = spool, queue_size = 10,
+		flush_interval = 0.01, block_timeout = 1, retry_interval = 0.05)
+	logger = _logger(handler)
+	for i in range(100):
+		logger.info('Record {}', i)
+	assert not handler.flush(0.2)
+	assert os.path.getsize(spool) > 8
+
+	collector = Collector(port)
+	try:
+		assert handler.flush(5)
+		assert collector.messages(100) == ['Record {}'.format(i) for i in range(100)]
+		assert handler.lost_records == 0
+		# Replayed completely, only the header is left
+		assert os.path.getsize(spool) == 8
+		handler.close()
+	finally:
+		collector.close()
+
+
+def test_spool_survives_restart(tmpdir):
+	port = _free_port()
+	spool = str(tmpdir.join('shipper.spool'))
+	handler = ShipperHandler(url = 'tcp://127.0.0.1:{}'.format(port), spool = spool, flush_interval = 0.01)
+	logger = _logger(handler)
+	logger.info('Before restart')
+	handler.close(timeout = 0.1)
+	assert handler.lost_records == 0
+
+	collector = Collector(port)
+	try:
+		logwood.testing.reset_state()
+		handler = ShipperHandler(url = 'tcp://127.0.0.1:{}'.format(port), spool = spool, flush_interval = 0.01)
+		logger = _logger(handler)
+		logger.info('After restart')
+		assert collector.messages(2) == ['Before restart', 'After restart']
+		handler.close()
+	finally:
+		collector.close()
+
+
+def test_disk_spool(tmpdir):
+	filename = str(tmpdir.join('shipper.spool'))
+	spool = DiskSpool(filename, max_bytes = 100)
+	assert not spool
+	assert spool.append([b'a' * 40, b'b' * 40, b'c' * 40]) == 1
+	assert spool.peek(1) == [b'a' * 40]
+	spool.consume(1)
+	spool.close()
+	# A frame torn by a crash
+	with open(filename, 'ab') as f:
+		f.write(struct.pack('<I', 10) + b'abc')
+
+	spool = DiskSpool(filename, max_bytes = 100)
+	assert spool.peek(10) == [b'b' * 40]
+	spool.consume(1)
+	assert not spool
+	assert spool.append([b'd']) == 0
+	assert spool.peek(10) == [b'd']
+	spool.close()
+
+
+class HttpCollector(http.server.ThreadingHTTPServer):
+	'''
+	HTTP collector stand-in on localhost answering with the statuses in `statuses`, then 200.
+	'''
+
+	def __init__(self, statuses = ()):
+		self.statuses = list(statuses)
+		self.requests = []
+		self.clients = set()
+		super().__init__(('127.0.0.1', 0), HttpCollectorRequestHandler)
+		self.daemon_threads = True
+		self.thread = threading.Thread(target = self.serve_forever, kwargs = {'poll_interval': 0.01}, daemon = True)
+		self.thread.start()
+
+
+	def close(self):
+		self.shutdown()
+		self.server_close()
+
+
+
+class HttpCollectorRequestHandler(http.server.BaseHTTPRequestHandler):
+	protocol_version = 'HTTP/1.1'
+
+	def do_POST(self):
+		body = self.rfile.read(int(self.headers['Content-Length']))
+		if self.headers['Content-Encoding'] == 'gzip':
+			body = gzip.decompress(body)
+		self.server.clients.add(self.client_address)
+		status = self.server.statuses.pop(0) if self.server.statuses else 200
+		if status == 200:
+			self.server.requests.append((self.path, self.headers['Content-Type'], body))
+		self.send_response(status)
+		self.send_header('Content-Length', '0')
+		self.end_headers()
+
+
+	def log_message(self, format, *args):
+		pass
+
+
+def test_http():
+	collector = HttpCollector(statuses = [503])
+	try:
+		handler = ShipperHandler(url = 'http://127.0.0.1:{}/ingest?source=app'.format(collector.server_address[1]),
+			compression = 'gzip', flush_interval = 0.01, retry_interval = 0.01)
+		logger = _logger(handler)
+		logger.info('one')
+		assert handler.flush(5)
+		collector.statuses = [400]
+		logger.info('two')
+		assert handler.flush(5)
+		logger.info('three')
+		handler.close()
+
+		# 503 was retried, 400 rejected the batch with 'two'
+		assert [(path, content_type) for path, content_type, _ in collector.requests] == [
+			('/ingest?source=app', 'application/x-ndjson'),
+			('/ingest?source=app', 'application/x-ndjson'),
+		]
+		assert [json.loads(body)['message'] for _, _, body in collector.requests] == ['one', 'three']
+		assert handler.lost_records == 1
+		# Keep-alive, one connection for all requests
+		assert len(collector.clients) == 1
+	finally:
+		collector.close()
+
+
+def test_invalid_arguments():
+	with pytest.raises(ValueError):
+		ShipperHandler()
+	with pytest.raises(ValueError):
+		ShipperHandler(url = 'udp://127.0.0.1:514')
+	with pytest.raises(ValueError):
+		ShipperHandler(url = 'tcp://127.0.0.1:514', framing = 'xml')
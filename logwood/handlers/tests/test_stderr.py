@@ -0,0 +1,57 @@
+import io
+import sys
+import unittest.mock
+
+import logwood
+from logwood.handlers.stderr import ColoredStderrHandler
+
+
+
+class TtyStream(io.StringIO):
+	def isatty(self):
+		return True
+
+
+def colored_handler(stream, **kwargs):
+	# Patched in the test itself, pytest replaces sys.stderr between fixture setup and the test call
+	with unittest.mock.patch.object(sys, 'stderr', stream):
+		return ColoredStderrHandler(**kwargs)
+
+
+def test_colors():
+	tty = TtyStream()
+	logwood.basic_config(handlers = [colored_handler(tty, format = '{level} {message}')])
+	logger = logwood.get_logger('Test')
+	logger.error('Value is {}', 42)
+	logger.info('Info %s', 'message')
+	assert tty.getvalue() == '\033[1;31mERROR Value is 42\033[0m\n\033[1;37mINFO Info message\033[0m\n'
+
+
+def test_colors_default_format_and_exception():
+	tty = TtyStream()
+	logwood.basic_config(handlers = [colored_handler(tty)], format = '%(level)s %(message)s')
+	logger = logwood.get_logger('Test')
+	try:
+		raise ValueError('Bad value')
+	except ValueError:
+		logger.exception('Failed')
+	output = tty.getvalue()
+	assert output.startswith('\033[1;31mERROR Failed\nTraceback')
+	assert output.endswith('ValueError: Bad value\033[0m\n')
+
+
+def test_no_colors_without_tty():
+	stream = io.StringIO()
+	handler = colored_handler(stream, format = '{level} {message}')
+	assert not handler.colors
+	logwood.basic_config(handlers = [handler])
+	logwood.get_logger('Test').warning('Plain')
+	assert stream.getvalue() == 'WARNING Plain\n'
+
+
+def test_forced_colors():
+	stream = io.StringIO()
+	handler = colored_handler(stream, format = '{message}', colors = True)
+	logwood.basic_config(handlers = [handler])
+	logwood.get_logger('Test').warning('Colored')
+	assert stream.getvalue() == '\033[1;33mColored\033[0m\n'
@@ -1,5 +1,10 @@
+import os
+import socket
+import syslog
 import unittest.mock
 
+import pytest
+
 import logwood
 import logwood.handlers.syslog
 
@@ -17,3 +22,51 @@ def test_emit(syslog_mock):
 	logger.warning('Warning')
 	logwood.shutdown()
 	assert syslog_mock.called
+
+
+@pytest.fixture
+def syslog_socket(tmpdir):
+	'''
+	Unix datagram socket standing in for /dev/log.
+	'''
+	address = str(tmpdir.join('log'))
+	server = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+	server.bind(address)
+	server.settimeout(1)
+	yield server
+	server.close()
+
+
+def test_unix_emit(syslog_socket):
+	handler = logwood.handlers.syslog.SysLogUnixHandler(format = '{message}', address = syslog_socket.getsockname(), ident = 'app')
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+	logger.warning('Warning {}', 1)
+	logger.error('Error')
+	# facility LOG_LOCAL0 (16 << 3) | priority
+	assert syslog_socket.recv(1000) == '<{}>app[{}]: Warning 1'.format(syslog.LOG_LOCAL0 | syslog.LOG_WARNING, os.getpid()).encode()
+	assert syslog_socket.recv(1000) == '<{}>app[{}]: Error'.format(syslog.LOG_LOCAL0 | syslog.LOG_ERR, os.getpid()).encode()
+
+
+def test_unix_reconnect(syslog_socket):
+	'''
+	The handler reconnects when the syslog daemon is restarted.
+	'''
+	address = syslog_socket.getsockname()
+	handler = logwood.handlers.syslog.SysLogUnixHandler(format = '{message}', address = address, ident = 'app')
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+	logger.warning('Before')
+	assert syslog_socket.recv(1000).endswith(b'Before')
+
+	# Restart the daemon
+	syslog_socket.close()
+	os.unlink(address)
+	restarted = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+	restarted.bind(address)
+	restarted.settimeout(1)
+	try:
+		logger.warning('After')
+		assert restarted.recv(1000).endswith(b'After')
+	finally:
+		restarted.close()
@@ -1,3 +1,4 @@
+import threading
 import unittest.mock
 import time
 
@@ -24,3 +25,29 @@ def test_underlying_handler_is_called():
 	record = underlying_handler.emit.call_args[0][0]
 	assert record['message'] == 'Error message'
 	assert underlying_handler.close.called
+
+
+def test_fork_flush_is_bounded():
+	'''
+	A stuck underlying handler delays a fork by at most fork_timeout seconds.
+	'''
+	release = threading.Event()
+	underlying_handler = unittest.mock.Mock()
+	underlying_handler.emit.side_effect = lambda record: release.wait(10)
+	handler = ThreadedHandler(underlying_handler = underlying_handler)
+	logwood.basic_config(level = logwood.DEBUG, handlers = [handler])
+	logwood.get_logger('Test').error('Stuck')
+	with unittest.mock.patch.object(logwood.global_config, 'fork_timeout', 0.1):
+		start = time.monotonic()
+		handler.before_fork()
+		assert time.monotonic() - start < 5
+	handler.after_fork_in_parent()
+	release.set()
+	handler.close()
+
+
+def test_flush_after_close():
+	handler = ThreadedHandler(underlying_handler = unittest.mock.Mock())
+	logwood.basic_config(level = logwood.DEBUG, handlers = [handler])
+	handler.close()
+	assert not handler.flush()
@@ -1,6 +1,8 @@
-from typing import Dict, Any
-import concurrent.futures
+from typing import Dict, Any, FrozenSet, List, Optional # noqa
+import queue
+import threading
 
+from logwood import global_config
 from logwood.base_handler import Handler
 
 
@@ -8,24 +10,98 @@ from logwood.base_handler import Handler
 class ThreadedHandler(Handler):
 	'''
 	This handler calls an underlying handler in a different thread to avoid blocking the logging thread.
+
+	The worker is a daemon thread, so a stuck underlying handler (e.g. a syslog peer that stopped reading) cannot
+	prevent the process from exiting. :meth:`close` waits at most `timeout` seconds for queued records.
 	'''
 
 	def __init__(self, level: int = None, format: str = None, underlying_handler: Handler = None) -> None:
 		super().__init__(level, format)
 		self.underlying_handler = underlying_handler
+		self._queue = queue.SimpleQueue() # type: queue.SimpleQueue
 		# We do not need more then one worker to emit messages
-		self.executor = concurrent.futures.ThreadPoolExecutor(max_workers = 1)
+		self._worker = threading.Thread(target = self._work, name = 'logwood-threaded-handler', daemon = True)
+		self._worker.start()
+
+
+	def record_fields(self) -> FrozenSet[str]:
+		''' Records are formatted by the underlying handler, so report its fields too. '''
+		fields = super().record_fields()
+		if isinstance(self.underlying_handler, Handler):
+			fields |= self.underlying_handler.record_fields()
+		return fields
+
+
+	def underlying_handlers(self) -> List[Handler]:
+		return [self.underlying_handler]
+
+
+	def _work(self) -> None:
+		while True:
+			record = self._queue.get()
+			if record is None:
+				return
+			if isinstance(record, threading.Event):
+				# Flush marker, all records queued before it were emitted
+				record.set()
+				continue
+			try:
+				self.underlying_handler.emit(record)
+			except Exception:
+				global_config.last_resort_handler(record)
 
 
 	def emit(self, record: Dict[str, Any]) -> None:
 		''' Call underlying handler in a worker thread. '''
-		self.executor.submit(self.underlying_handler.emit, record)
+		if self.is_shutdown:
+			raise RuntimeError('ThreadedHandler is closed')
+		self._queue.put(record)
+
+
+	def flush(self, timeout: Optional[float] = None) -> bool:
+		'''
+		Wait until records queued so far are emitted, for at most `timeout` seconds. Return whether they were.
+		Returns False at once if the worker does not run, e.g. after :meth:`close`.
+		'''
+		if not self._worker.is_alive():
+			return False
+		done = threading.Event()
+		self._queue.put(done)
+		if not done.wait(timeout):
+			return False
+		self.underlying_handler.flush()
+		return True
+
+
+	def before_fork(self) -> None:
+		'''
+		Let the worker emit queued records, for at most `fork_timeout` seconds, so the underlying handler can write
+		them out before the fork.
+		'''
+		self.flush(global_config.fork_timeout)
+
+
+	def after_fork_in_child(self) -> None:
+		'''
+		Start a new worker thread, the parent's one does not exist in the child. Records still queued in the parent
+		are left to the parent.
+		'''
+		self._queue = queue.SimpleQueue()
+		self._worker = threading.Thread(target = self._work, name = 'logwood-threaded-handler', daemon = True)
+		if not self.is_shutdown:
+			self._worker.start()
 
 
-	def close(self) -> None:
-		''' End thread pool executor and wait for it to finish. '''
-		super().close()
-		# Stop thread executor and wait until it completes
-		self.executor.shutdown(wait = True)
+	def close(self, timeout: Optional[float] = None) -> None:
+		'''
+		Let the worker emit queued records, for at most `timeout` seconds, then close the underlying handler.
+		Records still queued after the timeout are counted in :attr:`lost_records`.
+		'''
+		super().close(timeout)
+		self._queue.put(None)
+		self._worker.join(timeout)
+		if self._worker.is_alive():
+			# Everything but the stop marker
+			self.lost_records += max(self._queue.qsize() - 1, 0)
 		# cleanup underlying handler too
 		self.underlying_handler.close()
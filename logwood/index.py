@@ -0,0 +1,133 @@
+'''
+Sidecar index of log files for time and level range queries.
+
+A handler writing a log file with an index (e.g. ``FileHandler(filename = 'app.log', index = True)``) keeps
+``app.log.idx`` next to it. The index holds a fixed-size entry for every run of records in the same time bucket
+and of the same level: the bucket start, the byte offset of the run's first record and the level. Entries are
+appended as runs start, so the index is always up to date with the log file. With the default one-second
+buckets a steady stream of records of one level costs one entry (18 bytes) per second.
+
+:func:`query` uses the index to read only the byte ranges of matching runs::
+
+	python -m logwood.query app.log --since 2024-05-01T10:00 --until 2024-05-01T10:05 --level ERROR
+
+Timestamps are matched with bucket precision, i.e. a run matches when its bucket overlaps the requested range.
+'''
+
+from typing import Callable, Iterator, List, Optional, Tuple # noqa
+import collections
+import os
+import struct
+
+
+
+MAGIC = b'LWIDX1'
+HEADER = struct.Struct('<6sd')
+ENTRY = struct.Struct('<dQH')
+
+Entry = collections.namedtuple('Entry', 'bucket, offset, level')
+
+# Read this much of the log file at once when copying matching ranges
+CHUNK_SIZE = 1024 * 1024
+
+
+
+def index_filename(filename: str) -> str:
+	return filename + '.idx'
+
+
+
+class IndexWriter:
+	'''
+	Appends index entries for a log file written by one handler. An existing index keeps its bucket size.
+	'''
+
+	def __init__(self, filename: str, bucket_size: float = 1.0, truncate: bool = False) -> None:
+		self.filename = filename
+		flags = os.O_RDWR | os.O_CREAT | os.O_APPEND | getattr(os, 'O_CLOEXEC', 0)
+		if truncate:
+			flags |= os.O_TRUNC
+		self.fd = os.open(filename, flags, 0o644)
+		header = os.pread(self.fd, HEADER.size, 0)
+		if len(header) == HEADER.size:
+			magic, bucket_size = HEADER.unpack(header)
+			if magic != MAGIC:
+				raise ValueError('{} is not a logwood index'.format(filename))
+		else:
+			os.ftruncate(self.fd, 0)
+			os.write(self.fd, HEADER.pack(MAGIC, bucket_size))
+		self.bucket_size = bucket_size
+		self._bucket = None # type: Optional[float]
+		self._level = None # type: Optional[int]
+
+
+	def add(self, timestamp: float, level: int, offset: Callable[[], int]) -> None:
+		'''
+		Account for a record about to be written. When it starts a new run, `offset` is called to get the position
+		of the record in the log file and an entry is written.
+		'''
+		bucket = timestamp - timestamp % self.bucket_size
+		if bucket == self._bucket and level == self._level:
+			return
+		self._bucket = bucket
+		self._level = level
+		os.write(self.fd, ENTRY.pack(bucket, offset(), level))
+
+
+	def close(self) -> None:
+		os.close(self.fd)
+
+
+
+def read_index(filename: str) -> Tuple[float, List[Entry]]:
+	'''
+	Return the bucket size and entries of an index. A partially written last entry is ignored.
+	'''
+	with open(filename, 'rb') as f:
+		data = f.read()
+	if len(data) < HEADER.size or data[:len(MAGIC)] != MAGIC:
+		raise ValueError('{} is not a logwood index'.format(filename))
+	_, bucket_size = HEADER.unpack_from(data)
+	end = HEADER.size + (len(data) - HEADER.size) // ENTRY.size * ENTRY.size
+	return bucket_size, [Entry(*fields) for fields in ENTRY.iter_unpack(data[HEADER.size:end])]
+
+
+def matching_ranges(bucket_size: float, entries: List[Entry], file_size: int, since: Optional[float] = None,
+until: Optional[float] = None, level: Optional[int] = None) -> List[Tuple[int, int]]:
+	'''
+	Return sorted, merged ``(start, end)`` byte ranges of runs overlapping ``[since, until]`` with a level of at
+	least `level`. A run ends where the next one starts, the last one at `file_size`.
+	'''
+	ranges = [] # type: List[Tuple[int, int]]
+	for i, entry in enumerate(entries):
+		if since is not None and entry.bucket + bucket_size <= since:
+			continue
+		if until is not None and entry.bucket > until:
+			continue
+		if level is not None and entry.level < level:
+			continue
+		end = entries[i + 1].offset if i + 1 < len(entries) else file_size
+		if ranges and ranges[-1][1] == entry.offset:
+			ranges[-1] = (ranges[-1][0], end)
+		elif entry.offset < end:
+			ranges.append((entry.offset, end))
+	return ranges
+
+
+def query(filename: str, since: Optional[float] = None, until: Optional[float] = None,
+level: Optional[int] = None) -> Iterator[bytes]:
+	'''
+	Yield chunks of the log file `filename` with records logged between `since` and `until` (Unix timestamps, None
+	for no limit) with a level of at least `level`, using its index.
+	'''
+	bucket_size, entries = read_index(index_filename(filename))
+	with open(filename, 'rb') as f:
+		file_size = os.fstat(f.fileno()).st_size
+		for start, end in matching_ranges(bucket_size, entries, file_size, since, until, level):
+			f.seek(start)
+			while start < end:
+				chunk = f.read(min(CHUNK_SIZE, end - start))
+				if not chunk:
+					break
+				start += len(chunk)
+				yield chunk
@@ -0,0 +1,191 @@
+'''
+Optional per-handler counters: records received, filtered and emitted, formatted message lengths, bytes written,
+emit time and exceptions.
+
+Instrumentation is off by default and then costs nothing: :func:`enable` installs counting versions of ``handle``,
+``emit``, ``format_message`` and ``count_written`` as instance attributes of every handler, and :func:`disable`
+removes them again, restoring the plain class methods.
+
+Counters are updated without locks to keep the overhead low. When several threads log through one handler at the
+same time an increment may be lost now and then, so the counts are approximate.
+'''
+
+from typing import Any, Dict, List # noqa
+import bisect
+import time
+
+import logwood.state
+from logwood import global_config
+from logwood.base_handler import Handler
+
+
+
+# Upper bounds (in seconds) of the emit time histogram buckets, the last bucket is unbounded.
+HISTOGRAM_BOUNDS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0)
+HISTOGRAM_LABELS = tuple('<={:g}s'.format(bound) for bound in HISTOGRAM_BOUNDS) + ('>{:g}s'.format(HISTOGRAM_BOUNDS[-1]),)
+
+_INSTRUMENTED_METHODS = ('handle', 'emit', 'format_message', 'count_written')
+
+
+
+class HandlerStats:
+	'''
+	Counters of one handler.
+	'''
+
+	__slots__ = ('received', 'emitted', 'chars', 'bytes', 'emit_time', 'histogram', 'exceptions')
+
+	def __init__(self) -> None:
+		self.received = 0
+		self.emitted = 0
+		# Length of formatted messages in characters. The encoded size depends on the destination and is not counted.
+		self.chars = 0
+		# Bytes written to the destination, counted only by handlers which encode records themselves
+		# (see Handler.count_written), e.g. AppendFileHandler counts its encoded lines and CompressedFileHandler
+		# the compressed blocks.
+		self.bytes = 0
+		self.emit_time = 0.0
+		self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+		self.exceptions = 0
+
+
+	def snapshot(self) -> Dict[str, Any]:
+		return {
+			'received': self.received,
+			'emitted': self.emitted,
+			'filtered': max(self.received - self.emitted, 0),
+			'chars': self.chars,
+			'bytes': self.bytes,
+			'emit_time': self.emit_time,
+			'emit_time_histogram': dict(zip(HISTOGRAM_LABELS, self.histogram)),
+			'exceptions': self.exceptions,
+		}
+
+
+
+def _instrument(handler: Handler) -> None:
+	'''
+	Install counting wrappers of the handler's methods as instance attributes.
+	'''
+	if hasattr(handler, '_logwood_saved_methods'):
+		return
+	# Methods some handlers set on the instance themselves, restored by _uninstrument
+	handler._logwood_saved_methods = {name: vars(handler)[name] for name in _INSTRUMENTED_METHODS if name in vars(handler)}
+	stats = handler._logwood_stats = HandlerStats()
+	clock = time.perf_counter
+	bounds = HISTOGRAM_BOUNDS
+	original_emit = handler.emit
+	original_format_message = handler.format_message
+
+	def emit(record: Dict[str, Any]) -> None:
+		stats.emitted += 1
+		start = clock()
+		try:
+			original_emit(record)
+		except:
+			stats.exceptions += 1
+			raise
+		finally:
+			elapsed = clock() - start
+			stats.emit_time += elapsed
+			stats.histogram[bisect.bisect_left(bounds, elapsed)] += 1
+
+	def format_message(record: Dict[str, Any]) -> str:
+		message = original_format_message(record)
+		stats.chars += len(message)
+		return message
+
+	def count_written(size: int) -> None:
+		stats.bytes += size
+
+	if type(handler).handle is Handler.handle:
+		def handle(record: Dict[str, Any]) -> None:
+			stats.received += 1
+			level = global_config.default_log_level if handler._level is None else handler._level
+			if record['level_number'] >= level:
+				emit(record)
+	else:
+		# Custom handle implementations are wrapped as a whole. Their filtered records are still derived
+		# from the difference between received and emitted records.
+		original_handle = handler.handle
+
+		def handle(record: Dict[str, Any]) -> None:
+			stats.received += 1
+			original_handle(record)
+
+	handler.handle = handle
+	handler.emit = emit
+	handler.format_message = format_message
+	handler.count_written = count_written
+
+
+def _uninstrument(handler: Handler) -> None:
+	saved_methods = vars(handler).pop('_logwood_saved_methods', None)
+	if saved_methods is None:
+		return
+	for name in _INSTRUMENTED_METHODS:
+		vars(handler).pop(name, None)
+	vars(handler).update(saved_methods)
+
+
+def is_enabled() -> bool:
+	return _instrument in logwood.state.handler_hooks
+
+
+def enable() -> None:
+	'''
+	Start counting in all existing handlers and in handlers created from now on. Counters are reset.
+	'''
+	disable()
+	logwood.state.handler_hooks.append(_instrument)
+	for handler in list(logwood.state.defined_handlers):
+		_instrument(handler)
+
+
+def disable() -> None:
+	'''
+	Stop counting and restore the handlers' original methods. Collected counters are kept until :func:`enable`.
+	'''
+	if _instrument in logwood.state.handler_hooks:
+		logwood.state.handler_hooks.remove(_instrument)
+	for handler in list(logwood.state.defined_handlers):
+		_uninstrument(handler)
+
+
+def stats() -> Dict[str, Any]:
+	'''
+	Return a snapshot of the counters::
+
+		{
+			'enabled': True,
+			'last_resort_calls': 0,  # records that failed in some handler, counted even when instrumentation is off
+			'handlers': [
+				{
+					'handler': <FileHandler object>,
+					'name': 'FileHandler',
+					'received': 10,  # records passed to the handler
+					'emitted': 8,  # records which passed the level filter
+					'filtered': 2,
+					'chars': 512,  # total length of formatted messages in characters
+					'bytes': 530,  # bytes written, 0 for handlers which do not count them (see Handler.count_written)
+					'emit_time': 0.0001,  # seconds spent in emit
+					'emit_time_histogram': {'<=1e-06s': 0, '<=1e-05s': 8, ...},
+					'exceptions': 0,
+				},
+			],
+		}
+	'''
+	handlers = [] # type: List[Dict[str, Any]]
+	for handler in list(logwood.state.defined_handlers):
+		handler_stats = getattr(handler, '_logwood_stats', None)
+		if handler_stats is None:
+			continue
+		snapshot = handler_stats.snapshot()
+		snapshot['handler'] = handler
+		snapshot['name'] = type(handler).__name__
+		handlers.append(snapshot)
+	return {
+		'enabled': is_enabled(),
+		'last_resort_calls': logwood.state.last_resort_calls,
+		'handlers': handlers,
+	}
@@ -1,10 +1,14 @@
-from typing import Any, Dict
+from __future__ import annotations
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+	from typing import Any, Dict
 
-import logging
 import sys
 
 
 
 def print_to_stderr(record: Dict[str, Any]) -> None:
-	traceback = logging.Formatter().formatException(sys.exc_info())
-	print('LOGWOOD ERROR - cannot log record {!r}\n{:s}'.format(record, traceback), file = sys.stderr)
+	import traceback
+	formatted_traceback = ''.join(traceback.format_exception(*sys.exc_info())).rstrip('\n')
+	print('LOGWOOD ERROR - cannot log record {!r}\n{:s}'.format(record, formatted_traceback), file = sys.stderr)
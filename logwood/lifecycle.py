@@ -0,0 +1,232 @@
+'''
+Flushing and shutting down handlers within a deadline.
+
+Independent handlers are flushed or closed in parallel, each in its own thread, so one slow destination does not
+delay the others. With a `timeout`, handlers with queues or buffers stop draining them a bit before it passes, and the
+caller stops waiting for handlers which are still busy (e.g. blocked on a stuck syslog TCP peer) once it does.
+
+:func:`logwood.basic_config` registers :func:`shutdown_at_exit` with :mod:`atexit`.
+:func:`install_signal_handlers` makes termination signals go through the same path.
+
+:func:`logwood.basic_config` also registers the fork hooks :func:`before_fork`, :func:`after_fork_in_parent` and
+:func:`after_fork_in_child` with :func:`os.register_at_fork`. Handlers write out buffered records before the fork and
+recreate their threads, locks and connections in the child, so logging keeps working in forked workers without
+duplicated or lost lines.
+'''
+
+from typing import Any, Callable, Dict, Iterable, List, Optional # noqa
+import _thread
+import signal
+import sys
+import threading
+import time
+
+import logwood.state
+from logwood import global_config
+from logwood.base_handler import Handler
+
+
+
+# Share of the shutdown timeout handlers spend draining queues and buffers
+DRAIN_SHARE = 0.8
+
+_previous_signal_handlers = {} # type: Dict[int, Any]
+
+# Handlers prepared by before_fork, in the order the after-fork hooks are called
+_forking_handlers = [] # type: List[Handler]
+
+
+
+def _run(handlers: List[Handler], action: Callable[[Handler], None], timeout: Optional[float]) -> Dict[str, Any]:
+	'''
+	Call `action` with every handler in parallel and wait for at most `timeout` seconds. Return the report.
+	'''
+	deadline = None if timeout is None else time.monotonic() + timeout
+	entries = [] # type: List[Dict[str, Any]]
+	threads = [] # type: List[threading.Thread]
+	for handler in handlers:
+		entry = {'handler': handler, 'name': type(handler).__name__, 'completed': False, 'error': None}
+		entries.append(entry)
+
+		def run(handler: Handler = handler, entry: Dict[str, Any] = entry) -> None:
+			try:
+				action(handler)
+			except Exception as e:
+				entry['error'] = e
+			finally:
+				entry['completed'] = True
+
+		thread = threading.Thread(target = run, name = 'logwood-shutdown', daemon = True)
+		try:
+			thread.start()
+		except RuntimeError:
+			# New threads cannot be started while the interpreter is finalizing
+			run()
+		else:
+			threads.append(thread)
+
+	for thread in threads:
+		thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+
+	for entry in entries:
+		entry['lost_records'] = entry['handler'].lost_records
+	return {
+		'handlers': entries,
+		'lost_records': sum(entry['lost_records'] for entry in entries),
+		'timed_out': [entry['name'] for entry in entries if not entry['completed']],
+	}
+
+
+def flush(timeout: Optional[float] = None) -> Dict[str, Any]:
+	'''
+	Flush all handlers in parallel, waiting at most `timeout` seconds (None means no limit).
+	Return a report in the same form as :func:`shutdown`.
+	'''
+	return _run(list(logwood.state.defined_handlers), lambda handler: handler.flush(), timeout)
+
+
+def shutdown(timeout: Optional[float] = None) -> Dict[str, Any]:
+	'''
+	Close all handlers in parallel, waiting at most `timeout` seconds (None means no limit). Handlers wrapped by
+	another handler (see :meth:`Handler.underlying_handlers`) are closed by that handler. Return a report::
+
+		{
+			'handlers': [
+				{
+					'handler': <ThreadedHandler object>,
+					'name': 'ThreadedHandler',
+					'completed': False,  # close did not finish within the timeout
+					'error': None,  # exception raised by close
+					'lost_records': 12,  # records the handler never wrote
+				},
+			],
+			'lost_records': 12,
+			'timed_out': ['ThreadedHandler'],
+		}
+	'''
+	return close_handlers(list(logwood.state.defined_handlers), timeout)
+
+
+def close_handlers(handlers: List[Handler], timeout: Optional[float] = None) -> Dict[str, Any]:
+	'''
+	Close `handlers` in parallel like :func:`shutdown` does, waiting at most `timeout` seconds. Return the report.
+	'''
+	owned = {id(underlying) for handler in handlers for underlying in handler.underlying_handlers()}
+	handlers = [handler for handler in handlers if id(handler) not in owned]
+	# Leave handlers part of the time to close their resources and count lost records after they stop draining
+	drain_timeout = None if timeout is None else timeout * DRAIN_SHARE
+	return _run(handlers, lambda handler: handler.close(drain_timeout), timeout)
+
+
+def format_report(report: Dict[str, Any]) -> List[str]:
+	'''
+	Return human readable problems found in a :func:`shutdown` or :func:`flush` report, one per line.
+	'''
+	problems = []
+	for entry in report['handlers']:
+		if not entry['completed']:
+			problems.append('{} did not finish in time'.format(entry['name']))
+		if entry['error'] is not None:
+			problems.append('{} failed: {!r}'.format(entry['name'], entry['error']))
+		if entry['lost_records']:
+			problems.append('{} lost {} records'.format(entry['name'], entry['lost_records']))
+	return problems
+
+
+def shutdown_at_exit() -> None:
+	'''
+	Close all handlers within `shutdown_timeout` seconds and print a warning to stderr if any records were lost.
+	Registered with :mod:`atexit` by :func:`logwood.basic_config`.
+	'''
+	for problem in format_report(shutdown(global_config.shutdown_timeout)):
+		print('LOGWOOD WARNING - shutdown: {}'.format(problem), file = sys.stderr)
+
+
+def _in_fork_order(handlers: List[Handler]) -> List[Handler]:
+	'''
+	Wrapping handlers first, so records they still queue reach the handlers they wrap before those flush.
+	'''
+	owned = {id(underlying) for handler in handlers for underlying in handler.underlying_handlers()}
+	return [handler for handler in handlers if id(handler) not in owned] + [handler for handler in handlers if id(handler) in owned]
+
+
+def _call_fork_hook(handler: Handler, hook: str) -> None:
+	try:
+		getattr(handler, hook)()
+	except Exception:
+		# A failing handler must not break the fork nor the other handlers
+		global_config.last_resort_handler({'message': '{}.{} failed'.format(type(handler).__name__, hook)})
+
+
+def before_fork() -> None:
+	'''
+	Prepare all handlers for ``os.fork()``. Registered with :func:`os.register_at_fork` by :func:`logwood.basic_config`.
+	'''
+	global _forking_handlers
+	_forking_handlers = _in_fork_order(list(logwood.state.defined_handlers))
+	for handler in _forking_handlers:
+		_call_fork_hook(handler, 'before_fork')
+	# No logger is half created in the child
+	logwood.state.registry_lock.acquire()
+
+
+def after_fork_in_parent() -> None:
+	logwood.state.registry_lock.release()
+	for handler in _forking_handlers:
+		_call_fork_hook(handler, 'after_fork_in_parent')
+
+
+def after_fork_in_child() -> None:
+	logwood.state.registry_lock = _thread.allocate_lock()
+	for handler in _forking_handlers:
+		_call_fork_hook(handler, 'after_fork_in_child')
+
+
+def _interrupts_logging(frame: Any) -> bool:
+	'''
+	Return whether `frame` or one of its callers is a method of a logger or handler.
+	'''
+	while frame is not None:
+		if frame.f_code.co_varnames[:1] == ('self',) and isinstance(frame.f_locals.get('self'), (Handler, logwood.Logger)):
+			return True
+		frame = frame.f_back
+	return False
+
+
+def _flush_for_signal(frame: Any) -> None:
+	'''
+	Flush all handlers from a signal handler. The flush runs in its own thread, because the interrupted frame may
+	hold a handler's lock the flush needs. If the signal interrupted logging, the flush would only get the lock after
+	the signal handler returned, so it is not waited for.
+	'''
+	thread = threading.Thread(target = flush, args = (global_config.shutdown_timeout,), name = 'logwood-signal-flush', daemon = True)
+	thread.start()
+	if not _interrupts_logging(frame):
+		thread.join(global_config.shutdown_timeout)
+
+
+def _handle_signal(signum: int, frame: Any) -> None:
+	previous = _previous_signal_handlers.get(signum)
+	if callable(previous):
+		# The program handles the signal itself. Make sure records logged so far are written before it acts.
+		_flush_for_signal(frame)
+		previous(signum, frame)
+	elif previous == signal.SIG_IGN:
+		_flush_for_signal(frame)
+	else:
+		# Default action is to terminate. Exit normally instead, so atexit shuts handlers down.
+		raise SystemExit(128 + signum)
+
+
+def install_signal_handlers(signals: Iterable[int] = (signal.SIGTERM,)) -> None:
+	'''
+	Handle `signals` so that handlers are flushed or shut down before the process terminates. Signals with their
+	default action make the process exit with status ``128 + signal number`` via :class:`SystemExit`, which runs
+	the atexit shutdown. Signal handlers set by the program before are still called, after a flush. A signal which
+	interrupts logging does not wait for the flush, which could need locks the interrupted code holds.
+	Must be called from the main thread.
+	'''
+	for signum in signals:
+		previous = signal.signal(signum, _handle_signal)
+		if previous is not _handle_signal:
+			_previous_signal_handlers[signum] = previous
@@ -1,17 +1,107 @@
-from typing import List, Optional
-import logging
-import time
+from __future__ import annotations
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+	from typing import Any, Dict, List, Optional, Tuple
+import os
 import sys
+import time
+import types # noqa
+import weakref
 
 import logwood.state
 import logwood.base_handler
 from logwood import global_config
 from logwood import constants
 from logwood.base_handler import Handler
+from logwood.formatting import CALL_SITE_FIELDS
+from logwood.record import Record, get_context
+
+
+
+# Fields logwood sets in records itself, keyword and bound fields cannot use these names (see Logger.log)
+RESERVED_FIELDS = frozenset((
+	'timestamp', 'name', 'level_number', 'level', 'message', 'args', 'exc_info', 'exc_text', 'template',
+	'template_args', 'filename', 'lineno', 'funcName',
+))
+
+# Maps code objects to (filename, function name) of the call site, or to None for logwood's own code.
+# Keys hold references to the code objects, so every code object is described exactly once.
+_call_site_cache = {} # type: Dict[types.CodeType, Optional[Tuple[str, str]]]
+
 
 
+def _describe_code(code: types.CodeType) -> Optional[Tuple[str, str]]:
+	''' Return interned (filename, function name) for `code`, or None if it belongs to this module. '''
+	if code.co_filename == _describe_code.__code__.co_filename:
+		return None
+	return sys.intern(os.path.basename(code.co_filename)), sys.intern(code.co_name)
 
-_logging_formatter = logging.Formatter()
+
+def _find_call_site() -> Tuple[str, int, str]:
+	'''
+	Return (filename, line number, function name) of the first frame outside of this module.
+	'''
+	frame = sys._getframe(2)
+	while frame is not None:
+		code = frame.f_code
+		try:
+			description = _call_site_cache[code]
+		except KeyError:
+			description = _call_site_cache[code] = _describe_code(code)
+		if description is not None:
+			return description[0], frame.f_lineno, description[1]
+		frame = frame.f_back
+	return '(unknown file)', 0, '(unknown function)'
+
+
+def _check_fields(fields: Dict[str, Any]) -> None:
+	''' Raise TypeError if `fields` use any of the :data:`RESERVED_FIELDS` names. '''
+	reserved = RESERVED_FIELDS.intersection(fields)
+	if reserved:
+		raise TypeError('Reserved record field names cannot be used as fields: {}'.format(', '.join(sorted(reserved))))
+
+
+def handlers_level(handlers: List[Handler]) -> int:
+	'''
+	Return the lowest level any of `handlers` emits. Objects which are not :class:`Handler` instances do not declare
+	a level and are assumed to accept everything.
+	'''
+	return min((
+		(global_config.default_log_level if handler.level is None else handler.level)
+		if isinstance(handler, Handler) else constants.NOTSET
+		for handler in handlers
+	), default = constants.CRITICAL + 1)
+
+
+def levels_changed() -> None:
+	'''
+	Call the level hooks, see :data:`logwood.state.level_hooks`.
+	'''
+	for hook in list(logwood.state.level_hooks):
+		hook()
+
+
+def refresh_record_variables() -> None:
+	'''
+	Merge the current default record variables into the static fields of all bound loggers again. Called when the
+	default record variables change, loggers which are not bound use them directly.
+	'''
+	for logger_weak_ref in list(logwood.state.defined_loggers.values()):
+		logger_instance = logger_weak_ref()
+		if logger_instance is not None:
+			for child in list(logger_instance._children):
+				child._merge_static_fields()
+
+
+def refresh_loggers() -> None:
+	'''
+	Recompute the optional fields collected by all defined loggers. Called when handler formats change.
+	'''
+	for logger_weak_ref in list(logwood.state.defined_loggers.values()):
+		logger_instance = logger_weak_ref()
+		if logger_instance is not None:
+			logger_instance._update_collected_fields()
 
 
 
@@ -29,6 +119,22 @@ class Logger:
 		assert logwood.state.config_called, 'logwood.basic_config() was not called. Call basic_config first before getting Logger instances.'
 		self.name = name
 		self.handlers = handlers or []
+		# Fields added to every record, looked up after the record's own fields and context variables
+		self._static_fields = global_config.default_record_variables
+		self._children = weakref.WeakSet() # type: weakref.WeakSet
+		self._update_collected_fields()
+
+
+	def _update_collected_fields(self) -> None:
+		'''
+		Decide whether records need call-site fields, which are only collected if some handler's format uses them.
+		'''
+		self._capture_call_site = any(
+			isinstance(handler, Handler) and not CALL_SITE_FIELDS.isdisjoint(handler.record_fields())
+			for handler in global_config.default_handlers + self.handlers
+		)
+		for child in self._children:
+			child._capture_call_site = self._capture_call_site
 
 
 	def add_handler(self, handler: Handler) -> None:
@@ -36,80 +142,156 @@ class Logger:
 		Add handler to list of extra handlers where log records are sent.
 		'''
 		self.handlers.append(handler)
+		self._update_collected_fields()
+		levels_changed()
+
+
+	def effective_level(self) -> int:
+		'''
+		Return the lowest level any handler of this logger emits (including default handlers).
+		Records below it are dropped by all handlers.
+		'''
+		return handlers_level(global_config.default_handlers + self.handlers)
 
 
-	def debug(self, message: str, *args) -> None:
+	def bind(self, **fields: Any) -> 'BoundLogger':
+		'''
+		Return a child logger that adds `fields` to every record it logs.
+		The child shares handlers with this logger. Its static fields are merged once here, so logging through
+		the child costs the same as logging through this logger.
+
+		Fields bound with :func:`logwood.context` and passed to the logging call take precedence over bound fields.
+		The names of :data:`RESERVED_FIELDS` raise :class:`TypeError`, as in :meth:`log`.
+		'''
+		return BoundLogger(self, fields)
+
+
+	def debug(self, message: str, *args, **fields: Any) -> None:
 		'''
 		Log message with DEBUG level
 		'''
-		self.log(constants.DEBUG, message, *args)
+		self.log(constants.DEBUG, message, *args, **fields)
 
 
-	def info(self, message: str, *args) -> None:
+	def info(self, message: str, *args, **fields: Any) -> None:
 		'''
 		Log message with INFO level
 		'''
-		self.log(constants.INFO, message, *args)
+		self.log(constants.INFO, message, *args, **fields)
 
 
-	def warning(self, message: str, *args) -> None:
+	def warning(self, message: str, *args, **fields: Any) -> None:
 		'''
 		Log message with WARNING level
 		'''
-		self.log(constants.WARNING, message, *args)
+		self.log(constants.WARNING, message, *args, **fields)
 
 
-	def error(self, message: str, *args) -> None:
+	def error(self, message: str, *args, **fields: Any) -> None:
 		'''
 		Log message with ERROR level
 		'''
-		self.log(constants.ERROR, message, *args)
+		self.log(constants.ERROR, message, *args, **fields)
 
 
-	def fatal(self, message: str, *args) -> None:
+	def fatal(self, message: str, *args, **fields: Any) -> None:
 		'''
 		Log message with FATAL level
 		'''
-		self.log(constants.FATAL, message, *args)
+		self.log(constants.FATAL, message, *args, **fields)
 
 
-	def critical(self, message: str, *args) -> None:
+	def critical(self, message: str, *args, **fields: Any) -> None:
 		'''
 		Log message with CRITICAL level
 		'''
-		self.log(constants.CRITICAL, message, *args)
+		self.log(constants.CRITICAL, message, *args, **fields)
 
 
-	def exception(self, message: str, *args) -> None:
+	def exception(self, message: str, *args, **fields: Any) -> None:
 		'''
-		Log message with ERROR level and add traceback to message
+		Log message with ERROR level and attach the current exception info.
+		The traceback is rendered only if some handler emits the record.
 		'''
-		# We have to add traceback as argument because it can contain some % characters
-		traceback = _logging_formatter.formatException(sys.exc_info())
-		if '{' in message and '}' in message:
-			placeholder = '{}'
-		else:
-			placeholder = '%s'
-		self.error((message + '\n' + placeholder).strip(), *(args + (traceback,)))
+		self.log(constants.ERROR, message, *args, exc_info = sys.exc_info(), **fields)
 
 
-	def log(self, level: int, message: str, *args) -> None:
+	def log(self, level: int, message: str, *args, exc_info: Optional[Tuple] = None, **fields: Any) -> None:
 		'''
-		Log message with level and send to all handlers
+		Log message with level and send to all handlers.
+		:param exc_info: Optional ``sys.exc_info()`` tuple stored in the record's ``exc_info`` field.
+		:param fields: Structured fields stored in the record as they are. They are not used to format `message`,
+			text handlers only render them if their format references them. The names of the fields logwood sets itself
+			(:data:`RESERVED_FIELDS`) raise :class:`TypeError`, ``exc_info`` is the parameter above.
 		'''
-		# Beware this is a shallow copy. But from now onwards the record should not be updated.
+		if fields:
+			_check_fields(fields)
+		# From now onwards the record should not be updated.
 		# The only place where it changes is Handler.format_message, but that function expects the changes.
-		record = global_config.default_record_variables.copy()
-		record.update({
-			'timestamp': time.time(),
-			'name': self.name,
-			'level_number': level,
-			'level': constants.LOG_LEVEL_NAMES[level],
-			'message': message,
-			'args': args
-		})
+		record = Record(
+			fields,
+			timestamp = time.time(),
+			name = self.name,
+			level_number = level,
+			level = constants.LOG_LEVEL_NAMES[level],
+			message = message,
+			args = args,
+		)
+		# Other fields are looked up in context variables and default record variables, no need to copy them.
+		record.context = get_context()
+		record.defaults = self._static_fields
+		if exc_info is not None:
+			record['exc_info'] = exc_info
+		if self._capture_call_site:
+			record['filename'], record['lineno'], record['funcName'] = _find_call_site()
+		self._handle(record)
+
+
+	def _handle(self, record: Record) -> None:
+		'''
+		Send a complete record to all handlers. Used by :meth:`log` and by bridges which build records themselves.
+		'''
 		for handler in global_config.default_handlers + self.handlers:
 			try:
 				handler.handle(record)
-			except:
+			except Exception:
+				# SystemExit and KeyboardInterrupt, e.g. from a signal arriving during emit, are not handler failures
+				logwood.state.last_resort_calls += 1
 				global_config.last_resort_handler(record)
+
+
+
+class BoundLogger(Logger):
+	'''
+	Logger with extra static fields. Created by :meth:`Logger.bind`, do not instantiate directly.
+	'''
+
+	def __init__(self, parent: Logger, fields: Dict[str, Any]) -> None:
+		# Handler dispatch is shared with the parent, only the static fields differ.
+		self._parent = parent._parent if isinstance(parent, BoundLogger) else parent
+		self.name = parent.name
+		self.handlers = parent.handlers
+		_check_fields(fields)
+		self._bound_fields = dict(parent._bound_fields) if isinstance(parent, BoundLogger) else {}
+		self._bound_fields.update(fields)
+		self._merge_static_fields()
+		self._capture_call_site = parent._capture_call_site
+		self._parent._children.add(self)
+
+
+	def _merge_static_fields(self) -> None:
+		''' Merge bound fields over the default record variables. The result replaces the previous one at once. '''
+		static_fields = dict(global_config.default_record_variables)
+		static_fields.update(self._bound_fields)
+		self._static_fields = static_fields
+
+
+	def add_handler(self, handler: Handler) -> None:
+		'''
+		Add handler to the parent logger. Bound loggers share handlers with their parent.
+		'''
+		self._parent.add_handler(handler)
+
+
+	def bind(self, **fields: Any) -> 'BoundLogger':
+		return BoundLogger(self, fields)
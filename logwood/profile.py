@@ -0,0 +1,272 @@
+'''
+Sampling profiler of the logging hot path.
+
+When enabled, every n-th logging call is timed phase by phase and the timings are aggregated per logger and per
+handler:
+
+- loggers: record construction (everything in :meth:`Logger.log` except handlers) and dispatch to handlers,
+- handlers: level filtering, arg interpolation (:meth:`Handler.prepare_message`), template formatting
+  (the rest of :meth:`Handler.format_message`) and I/O (the rest of :meth:`Handler.emit`).
+
+Use it programmatically::
+
+	logwood.profile.enable(sample_rate = 0.01)
+	...
+	print(logwood.profile.format_report())
+
+or run a whole script under the profiler::
+
+	python -m logwood.profile [--sample-rate 0.01] [--output report.json] script.py [args ...]
+
+Emits done by handlers in other threads (e.g. the underlying handler of a ThreadedHandler) are not attributed.
+Profiling replaces ``Logger.log`` and installs wrappers as handler instance attributes, do not combine it with
+:mod:`logwood.instrumentation`.
+'''
+
+from typing import Any, Dict, List, Optional, Union # noqa
+import argparse
+import collections
+import itertools
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+
+import logwood.logger
+import logwood.state
+from logwood.base_handler import Handler
+from logwood.logger import Logger
+
+
+
+LOGGER_PHASES = ('record', 'dispatch')
+HANDLER_PHASES = ('filter', 'interpolation', 'formatting', 'io')
+
+_WRAPPED_METHODS = ('handle', 'emit', 'format_message', 'prepare_message')
+
+_original_log = Logger.log
+_sample_counter = itertools.count()
+_sample_interval = 100
+_sampling = threading.local()
+_clock = time.perf_counter
+
+# Inclusive times in seconds, keyed by logger name or handler label and then by measured method
+_logger_totals = collections.defaultdict(lambda: collections.defaultdict(float)) # type: Dict[str, Dict[str, float]]
+_handler_totals = collections.defaultdict(lambda: collections.defaultdict(float)) # type: Dict[str, Dict[str, float]]
+_logger_samples = collections.Counter() # type: Dict[str, int]
+_handler_samples = collections.Counter() # type: Dict[str, int]
+
+
+
+def _profiled_log(self, level: int, message: str, *args, **kwargs) -> None:
+	if next(_sample_counter) % _sample_interval:
+		return _original_log(self, level, message, *args, **kwargs)
+
+	_sampling.dispatch = 0.0
+	_sampling.active = True
+	try:
+		start = _clock()
+		_original_log(self, level, message, *args, **kwargs)
+		total = _clock() - start
+	finally:
+		_sampling.active = False
+	totals = _logger_totals[self.name]
+	totals['log'] += total
+	totals['dispatch'] += _sampling.dispatch
+	_logger_samples[self.name] += 1
+
+
+# Frames of the profiler wrapper are not the call site of a logging call
+logwood.logger._call_site_cache[_profiled_log.__code__] = None
+
+
+def _handler_label(handler: Handler) -> str:
+	return '{}@{:x}'.format(type(handler).__name__, id(handler))
+
+
+def _wrap(handler: Handler) -> None:
+	'''
+	Install timing wrappers of the handler's methods as instance attributes. They only measure sampled records.
+	'''
+	if hasattr(handler, '_logwood_profile_saved_methods'):
+		return
+	handler._logwood_profile_saved_methods = {name: vars(handler)[name] for name in _WRAPPED_METHODS if name in vars(handler)}
+	label = _handler_label(handler)
+	totals = _handler_totals[label]
+
+	def timed(name: str, method):
+		def wrapper(record: Dict[str, Any]) -> Any:
+			if not getattr(_sampling, 'active', False):
+				return method(record)
+			start = _clock()
+			try:
+				return method(record)
+			finally:
+				totals[name] += _clock() - start
+		return wrapper
+
+	original_handle = handler.handle
+
+	def handle(record: Dict[str, Any]) -> None:
+		if not getattr(_sampling, 'active', False):
+			return original_handle(record)
+		start = _clock()
+		try:
+			original_handle(record)
+		finally:
+			elapsed = _clock() - start
+			totals['handle'] += elapsed
+			_sampling.dispatch += elapsed
+			_handler_samples[label] += 1
+
+	handler.prepare_message = timed('prepare_message', handler.prepare_message)
+	handler.format_message = timed('format_message', handler.format_message)
+	handler.emit = timed('emit', handler.emit)
+	handler.handle = handle
+
+
+def _unwrap(handler: Handler) -> None:
+	saved_methods = vars(handler).pop('_logwood_profile_saved_methods', None)
+	if saved_methods is None:
+		return
+	for name in _WRAPPED_METHODS:
+		vars(handler).pop(name, None)
+	vars(handler).update(saved_methods)
+
+
+def is_enabled() -> bool:
+	return Logger.log is _profiled_log
+
+
+def enable(sample_rate: float = 0.01) -> None:
+	'''
+	Start profiling a `sample_rate` fraction of logging calls. Previously collected timings are discarded.
+	'''
+	global _sample_interval, _sample_counter
+	if not 0 < sample_rate <= 1:
+		raise ValueError('sample_rate must be in (0, 1], got {!r}'.format(sample_rate))
+	disable()
+	reset()
+	_sample_interval = max(int(round(1 / sample_rate)), 1)
+	_sample_counter = itertools.count()
+	Logger.log = _profiled_log
+	logwood.state.handler_hooks.append(_wrap)
+	for handler in list(logwood.state.defined_handlers):
+		_wrap(handler)
+
+
+def disable() -> None:
+	'''
+	Stop profiling. Collected timings are kept for :func:`report`.
+	'''
+	Logger.log = _original_log
+	if _wrap in logwood.state.handler_hooks:
+		logwood.state.handler_hooks.remove(_wrap)
+	for handler in list(logwood.state.defined_handlers):
+		_unwrap(handler)
+
+
+def reset() -> None:
+	''' Discard collected timings. '''
+	_logger_totals.clear()
+	_handler_totals.clear()
+	_logger_samples.clear()
+	_handler_samples.clear()
+
+
+def _phases(samples: int, phases: Dict[str, float]) -> Dict[str, Any]:
+	total = sum(phases.values())
+	return {
+		'samples': samples,
+		'total': total,
+		'mean': total / samples if samples else 0.0,
+		'phases': {
+			name: {
+				'total': value,
+				'mean': value / samples if samples else 0.0,
+				'share': value / total if total else 0.0,
+			}
+			for name, value in phases.items()
+		},
+	}
+
+
+def report() -> Dict[str, Any]:
+	'''
+	Return aggregated timings in seconds. Every logger and handler entry contains the number of sampled records,
+	total and mean time per sampled record, and the same for each phase together with its share of the total.
+	'''
+	loggers = {}
+	for name, totals in _logger_totals.items():
+		loggers[name] = _phases(_logger_samples[name], collections.OrderedDict((
+			('record', totals['log'] - totals['dispatch']),
+			('dispatch', totals['dispatch']),
+		)))
+
+	handlers = {}
+	for label, totals in _handler_totals.items():
+		handlers[label] = _phases(_handler_samples[label], collections.OrderedDict((
+			('filter', totals['handle'] - totals['emit']),
+			('interpolation', totals['prepare_message']),
+			('formatting', totals['format_message'] - totals['prepare_message']),
+			('io', totals['emit'] - totals['format_message']),
+		)))
+
+	return {
+		'sample_interval': _sample_interval,
+		'loggers': loggers,
+		'handlers': handlers,
+	}
+
+
+def format_report(data: Optional[Dict[str, Any]] = None) -> str:
+	'''
+	Return :func:`report` as a human readable table. Times are means per sampled record in microseconds.
+	'''
+	data = report() if data is None else data
+	lines = ['logwood profile, 1 in {} logging calls sampled'.format(data['sample_interval'])]
+	for title, entries, phases in (('Logger', data['loggers'], LOGGER_PHASES), ('Handler', data['handlers'], HANDLER_PHASES)):
+		lines.append('')
+		lines.append('{:<40} {:>8} {:>10}'.format(title, 'samples', 'mean us') + ''.join(' {:>16}'.format(p) for p in phases))
+		for name, entry in sorted(entries.items(), key = lambda item: -item[1]['total']):
+			lines.append('{:<40} {:>8d} {:>10.2f}'.format(name[:40], entry['samples'], entry['mean'] * 1e6) + ''.join(
+				' {:>8.2f} ({:>4.0%})'.format(entry['phases'][p]['mean'] * 1e6, entry['phases'][p]['share'])
+				for p in phases
+			))
+	return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> Union[int, str, None]:
+	'''
+	Run the script and report. Return the script's exit status, as given to ``sys.exit()`` by the script.
+	'''
+	parser = argparse.ArgumentParser(prog = 'python -m logwood.profile', description = 'Profile logwood while running a script.')
+	parser.add_argument('--sample-rate', type = float, default = 0.01, help = 'Fraction of logging calls to time (default: %(default)s).')
+	parser.add_argument('--output', help = 'Write the report as JSON to this file instead of printing a table.')
+	parser.add_argument('script', help = 'Python script to run.')
+	parser.add_argument('args', nargs = argparse.REMAINDER, help = 'Arguments of the script.')
+	args = parser.parse_args(argv)
+
+	sys.argv = [args.script] + args.args
+	sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+	enable(args.sample_rate)
+	status = 0 # type: Union[int, str, None]
+	try:
+		runpy.run_path(args.script, run_name = '__main__')
+	except SystemExit as e:
+		status = e.code
+	finally:
+		disable()
+		if args.output:
+			with open(args.output, 'w') as f:
+				json.dump(report(), f, indent = 2, sort_keys = True)
+		else:
+			print(format_report(), file = sys.stderr)
+	return status
+
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,62 @@
+'''
+Print records of a log file written with an index, reading only the byte ranges the index points to::
+
+	python -m logwood.query app.log --since 2024-05-01T10:00 --until 2024-05-01T10:05 --level ERROR
+
+See :mod:`logwood.index`.
+'''
+
+from typing import BinaryIO, List, Optional # noqa
+import argparse
+import datetime
+import sys
+
+import logwood.index
+from logwood import constants
+
+
+
+def _parse_time(value: str) -> float:
+	''' A Unix timestamp or an ISO 8601 date and time, local time unless it has an offset. '''
+	try:
+		return float(value)
+	except ValueError:
+		pass
+	try:
+		return datetime.datetime.fromisoformat(value).timestamp()
+	except ValueError:
+		raise argparse.ArgumentTypeError('invalid time {!r}, use a Unix timestamp or ISO 8601'.format(value)) from None
+
+
+def _parse_level(value: str) -> int:
+	if value.isdigit():
+		return int(value)
+	level = getattr(constants, value.upper(), None)
+	if not isinstance(level, int):
+		raise argparse.ArgumentTypeError('unknown level {!r}'.format(value))
+	return level
+
+
+def main(argv: Optional[List[str]] = None, output: Optional[BinaryIO] = None) -> int:
+	parser = argparse.ArgumentParser(prog = 'python -m logwood.query', description = 'Print records of an indexed log file.')
+	parser.add_argument('--since', type = _parse_time, help = 'Unix timestamp or ISO 8601 time of the first records.')
+	parser.add_argument('--until', type = _parse_time, help = 'Unix timestamp or ISO 8601 time of the last records.')
+	parser.add_argument('--level', type = _parse_level, help = 'Lowest level of records to print, a name or a number.')
+	parser.add_argument('filename', help = 'Log file with an index next to it.')
+	args = parser.parse_args(argv)
+
+	if output is None:
+		output = sys.stdout.buffer
+	try:
+		for chunk in logwood.index.query(args.filename, args.since, args.until, args.level):
+			output.write(chunk)
+	except (OSError, ValueError) as e:
+		print('logwood.query: {}'.format(e), file = sys.stderr)
+		return 1
+	output.flush()
+	return 0
+
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,507 @@
+'''
+Fast reading of log files written by logwood.
+
+Files are memory-mapped and split into records with ``find``, fields are only parsed when accessed. Filtering by
+level or logger name compares bytes in place, records which do not match are never decoded::
+
+	with logwood.reader.open_log('app.log') as log:
+		for entry in log.records(level = logwood.ERROR, name = 'pricer'):
+			print(entry.timestamp, entry.message)
+
+	for entry in logwood.reader.follow('app.log', level = logwood.WARNING):
+		print(entry.text)
+
+or from the command line::
+
+	python -m logwood.reader app.log [--level ERROR] [--name pricer] [--follow]
+
+Three kinds of files are recognized by their content:
+
+- text in the default format ``[timestamp][hostname][system_identifier][name][level] message``. A record
+  continues until the next line starting with ``[`` and a digit, so tracebacks stay with their record.
+  Text in other formats is read line by line, without fields,
+- JSON lines written by :class:`logwood.handlers.json.JsonHandler`,
+- gzip or zstd streams written by :class:`logwood.handlers.compressed.CompressedFileHandler`, which are decompressed
+  into memory first. Unfinished streams are read up to their last complete block.
+'''
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union # noqa
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+import zlib
+
+from logwood import constants
+
+
+
+TEXT, LINES, JSON = 'text', 'lines', 'json'
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Level name -> number, including aliases written by older versions or other tools
+LEVEL_NUMBERS = {
+	'CRITICAL': constants.CRITICAL,
+	'FATAL': constants.FATAL,
+	'ERROR': constants.ERROR,
+	'WARNING': constants.WARNING,
+	'WARN': constants.WARN,
+	'INFO': constants.INFO,
+	'DEBUG': constants.DEBUG,
+	'NOTSET': constants.NOTSET,
+}
+
+Buffer = Union[bytes, mmap.mmap]
+
+# Bytes :func:`follow` reads at once, more when a single record does not fit
+FOLLOW_READ_SIZE = 1024 * 1024
+
+
+
+def _text_fields(buffer: Buffer, start: int, end: int, count: int) -> Optional[List[Tuple[int, int]]]:
+	'''
+	Return (start, end) positions of the first `count` bracketed fields of a record in the default format, followed by
+	the position of the message, or None if the record is not in the default format.
+	'''
+	if buffer[start:start + 1] != b'[':
+		return None
+	positions = []
+	position = start + 1
+	for i in range(count):
+		field_end = buffer.find(b'][' if i < 4 else b']', position, end)
+		if field_end < 0:
+			return None
+		positions.append((position, field_end))
+		position = field_end + (2 if i < 4 else 1)
+	if count == 5:
+		if buffer[position:position + 1] == b' ':
+			position += 1
+		positions.append((position, end))
+	return positions
+
+
+def _equals(buffer: Buffer, start: int, end: int, value: bytes) -> bool:
+	''' Compare a part of the buffer with `value` without copying it. '''
+	return end - start == len(value) and buffer.find(value, start, end) == start
+
+
+def _json_value_start(buffer: Buffer, start: int, end: int, key: bytes) -> int:
+	# JsonHandler writes structured fields (which may contain nested objects with the same keys) before the record's
+	# own fields, and only strings and exception info after them. Quotes in strings are escaped.
+	position = buffer.rfind(key, start, end)
+	return -1 if position < 0 else position + len(key)
+
+
+
+class LogEntry:
+	'''
+	One record of a log file. Fields are parsed on first access. Entries refer to the mapped file, use :attr:`raw`
+	to keep a copy of the record after the file is closed.
+	'''
+
+	__slots__ = ('_buffer', 'start', 'end', 'kind', '_fields')
+
+	def __init__(self, buffer: Buffer, start: int, end: int, kind: str) -> None:
+		self._buffer = buffer
+		self.start = start
+		self.end = end
+		self.kind = kind
+		self._fields = None # type: Optional[Dict[str, Any]]
+
+
+	@property
+	def raw(self) -> bytes:
+		''' The record as written, without the final newline. '''
+		return self._buffer[self.start:self.end]
+
+
+	@property
+	def text(self) -> str:
+		return self.raw.decode('utf-8', 'replace')
+
+
+	def fields(self) -> Dict[str, Any]:
+		'''
+		Return all fields of the record. Text in the default format has ``timestamp``, ``hostname``,
+		``system_identifier``, ``name``, ``level`` and ``message``, JSON records have whatever was written, other
+		text only has ``message``.
+		'''
+		if self._fields is None:
+			if self.kind == JSON:
+				self._fields = json.loads(self.raw)
+			else:
+				positions = _text_fields(self._buffer, self.start, self.end, 5) if self.kind == TEXT else None
+				if positions is None:
+					self._fields = {'message': self.text}
+				else:
+					values = [self._buffer[start:end].decode('utf-8', 'replace') for start, end in positions]
+					self._fields = dict(zip(('timestamp', 'hostname', 'system_identifier', 'name', 'level', 'message'), values))
+					try:
+						self._fields['timestamp'] = float(self._fields['timestamp'])
+					except ValueError:
+						pass
+		return self._fields
+
+
+	@property
+	def timestamp(self) -> Optional[float]:
+		return self.fields().get('timestamp')
+
+
+	@property
+	def name(self) -> Optional[str]:
+		return self.fields().get('name')
+
+
+	@property
+	def level(self) -> Optional[str]:
+		return self.fields().get('level')
+
+
+	@property
+	def message(self) -> Optional[str]:
+		return self.fields().get('message')
+
+
+	def __repr__(self) -> str:
+		return '<LogEntry {!r}>'.format(self.raw[:80])
+
+
+
+class _Filter:
+	'''
+	Matches records by level and logger name on the raw bytes.
+	'''
+
+	def __init__(self, level: Optional[int], name: Optional[str]) -> None:
+		self.levels = None if level is None else [
+			level_name.encode() for level_name, number in LEVEL_NUMBERS.items() if number >= level
+		]
+		self.name = None if name is None else name.encode()
+		self.json_levels = None if self.levels is None else [json.dumps(level_name.decode()).encode() for level_name in self.levels]
+		self.json_name = None if name is None else json.dumps(name).encode()
+
+
+	def needles(self, kind: str) -> Optional[List[bytes]]:
+		'''
+		Return byte strings of which every matching record contains one, or None to match all records.
+		'''
+		if self.levels is None and self.name is None:
+			return None
+		if kind == TEXT:
+			if self.levels is None:
+				return [b'][' + self.name + b'][']
+			prefix = b'][' if self.name is None else b'][' + self.name + b']['
+			return [prefix + level + b']' for level in self.levels]
+		if kind == JSON:
+			if self.json_name is not None:
+				return [b'"name": ' + self.json_name]
+			return [b'"level": ' + level for level in self.json_levels]
+		return []
+
+
+	def matches(self, buffer: Buffer, start: int, end: int, kind: str) -> bool:
+		if self.levels is None and self.name is None:
+			return True
+		if kind == TEXT:
+			if not buffer[start + 1:start + 2].isdigit():
+				# A continuation line of a record
+				return False
+			positions = _text_fields(buffer, start, end, 5 if self.levels is not None else 4)
+			if positions is None:
+				return False
+			if self.name is not None and not _equals(buffer, positions[3][0], positions[3][1], self.name):
+				return False
+			return self.levels is None or any(_equals(buffer, positions[4][0], positions[4][1], level) for level in self.levels)
+		if kind == JSON:
+			if self.json_name is not None:
+				position = _json_value_start(buffer, start, end, b'"name": ')
+				if position < 0 or buffer.find(self.json_name, position, position + len(self.json_name)) != position:
+					return False
+			if self.json_levels is not None:
+				position = _json_value_start(buffer, start, end, b'"level": ')
+				return position >= 0 and any(
+					buffer.find(level, position, position + len(level)) == position for level in self.json_levels
+				)
+			return True
+		# Lines in an unknown format have no fields to match
+		return False
+
+
+
+def _detect(buffer: Buffer) -> str:
+	head = buffer[:64].lstrip()
+	if head.startswith(b'{'):
+		return JSON
+	if head[:1] == b'[' and head[1:2].isdigit():
+		return TEXT
+	return LINES
+
+
+def _record_start(buffer: Buffer, position: int, end: int, kind: str) -> int:
+	'''
+	Return the start of the first record after `position` (which is inside a record), or -1.
+	'''
+	if kind != TEXT:
+		newline = buffer.find(b'\n', position, end)
+		return -1 if newline < 0 else newline + 1
+	while True:
+		newline = buffer.find(b'\n[', position, end)
+		if newline < 0:
+			return -1
+		if buffer[newline + 2:newline + 3].isdigit():
+			return newline + 1
+		position = newline + 1
+
+
+def _record_end(buffer: Buffer, start: int, next_start: int) -> int:
+	''' The end of a record without its final newline. '''
+	return next_start - 1 if next_start > start and buffer[next_start - 1:next_start] == b'\n' else next_start
+
+
+def _records(buffer: Buffer, start: int, end: int, kind: str, record_filter: _Filter, complete: bool) -> Iterator[Tuple[int, Optional[LogEntry]]]:
+	'''
+	Yield (position, entry) for matching records from `start` (a record start) to `end`. Reading can be resumed at
+	the position, entry is None when the reader only moved on. With `complete` False, the last record is held back
+	because it may still grow.
+	'''
+	needles = record_filter.needles(kind)
+	position = start
+	if needles is None:
+		while position < end:
+			next_start = _record_start(buffer, position, end, kind)
+			if next_start < 0:
+				if not complete:
+					return
+				next_start = end
+			record_end = _record_end(buffer, position, next_start)
+			if record_end > position:
+				yield next_start, LogEntry(buffer, position, record_end, kind)
+			position = next_start
+		return
+
+	# Jump from one occurrence of the needles to the next, only records containing one are looked at
+	hits = [buffer.find(needle, position, end) for needle in needles]
+	while True:
+		found = [hit for hit in hits if hit >= 0]
+		if not found:
+			break
+		hit = min(found)
+		newline = buffer.rfind(b'\n', position, hit)
+		record_start = position if newline < 0 else newline + 1
+		next_start = _record_start(buffer, record_start, end, kind)
+		if next_start < 0:
+			if not complete:
+				yield record_start, None
+				return
+			next_start = end
+		record_end = _record_end(buffer, record_start, next_start)
+		if record_filter.matches(buffer, record_start, record_end, kind):
+			yield next_start, LogEntry(buffer, record_start, record_end, kind)
+		position = next_start
+		hits = [hit if hit < 0 or hit >= position else buffer.find(needle, position, end) for hit, needle in zip(hits, needles)]
+
+	if complete:
+		yield end, None
+	else:
+		# Lines before the last newline contain no needle, the last line may not be complete
+		newline = buffer.rfind(b'\n', position, end)
+		if newline >= 0:
+			yield newline + 1, None
+
+
+def _decompressor_factory(data: bytes) -> Callable[[], Any]:
+	if data.startswith(GZIP_MAGIC):
+		return lambda: zlib.decompressobj(31)
+	try:
+		from compression import zstd
+	except ImportError:
+		try:
+			import zstandard
+		except ImportError:
+			raise ValueError('Reading zstd requires Python 3.14 or the zstandard package') from None
+		return lambda: zstandard.ZstdDecompressor().decompressobj()
+	return zstd.ZstdDecompressor
+
+
+def _decompress(data: bytes) -> bytes:
+	new_decompressor = _decompressor_factory(data)
+	chunks = []
+	while data:
+		# A decompressor stops at the end of a gzip member or zstd frame
+		decompressor = new_decompressor()
+		chunks.append(decompressor.decompress(data))
+		if not decompressor.eof:
+			# An unfinished stream, everything up to its last block was decompressed
+			break
+		# Appending to a file starts another member or frame
+		data = decompressor.unused_data
+	return b''.join(chunks)
+
+
+
+class LogFile:
+	'''
+	A log file opened with :func:`open_log`.
+	'''
+
+	def __init__(self, filename: str) -> None:
+		self.filename = filename
+		self._mmap = None # type: Optional[mmap.mmap]
+		with open(filename, 'rb') as f:
+			magic = f.read(4)
+			f.seek(0)
+			if magic.startswith(GZIP_MAGIC) or magic == ZSTD_MAGIC:
+				self.buffer = _decompress(f.read()) # type: Buffer
+			elif os.fstat(f.fileno()).st_size == 0:
+				self.buffer = b''
+			else:
+				self._mmap = self.buffer = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+		self.kind = _detect(self.buffer)
+
+
+	def records(self, level: Optional[int] = None, name: Optional[str] = None) -> Iterator[LogEntry]:
+		'''
+		Yield records with a level of at least `level` logged by the logger `name`.
+		'''
+		record_filter = _Filter(level, name)
+		for _, entry in _records(self.buffer, 0, len(self.buffer), self.kind, record_filter, True):
+			if entry is not None:
+				yield entry
+
+
+	def close(self) -> None:
+		if self._mmap is not None:
+			self._mmap.close()
+
+
+	def __enter__(self) -> 'LogFile':
+		return self
+
+
+	def __exit__(self, *exc_info: Any) -> None:
+		self.close()
+
+
+
+def open_log(filename: str) -> LogFile:
+	'''
+	Open a log file for reading. Entries read from it can only be used until it is closed.
+	'''
+	return LogFile(filename)
+
+
+def follow(filename: str, level: Optional[int] = None, name: Optional[str] = None, interval: float = 0.5,
+from_start: bool = False) -> Iterator[LogEntry]:
+	'''
+	Yield records appended to a text or JSON log file, like ``tail -f``. Existing records are skipped unless
+	`from_start` is True. A record is yielded once the next one starts, or when the file did not grow for
+	`interval` seconds. Rotated or truncated files are read again from the start.
+
+	New data is read into memory rather than mapped, so entries stay usable after the file is rotated or deleted.
+	'''
+	record_filter = _Filter(level, name)
+	read_size = FOLLOW_READ_SIZE
+	position = None # type: Optional[int]
+	identity = None # type: Optional[Tuple[int, int]]
+	kind = None # type: Optional[str]
+	last_size = None # type: Optional[int]
+	# Whether position may be in the middle of a record, after starting at the end of the file
+	unaligned = False
+	while True:
+		try:
+			stat = os.stat(filename)
+		except FileNotFoundError:
+			stat = None
+		if stat is not None:
+			if position is None:
+				position = 0 if from_start else stat.st_size
+				unaligned = position > 0
+			elif identity != (stat.st_dev, stat.st_ino) or stat.st_size < position:
+				# Rotated or truncated
+				position = 0
+				unaligned = False
+				kind = last_size = None
+			identity = (stat.st_dev, stat.st_ino)
+			size = stat.st_size
+
+			if size > position:
+				with open(filename, 'rb') as f:
+					if kind is None:
+						kind = _detect(f.read(64))
+						if kind == LINES and size < 64:
+							# Too little was written to tell yet
+							kind = None
+					if kind is not None:
+						# After starting at the end of the file, the byte before position tells whether a record starts there
+						base = position - 1 if unaligned else position
+						f.seek(base)
+						buffer = f.read(min(size - base, read_size))
+				if kind is not None:
+					end = base + len(buffer)
+					start_position = position
+					if unaligned:
+						record_start = _record_start(buffer, 0, len(buffer), kind)
+						position = end if record_start < 0 else base + record_start
+						unaligned = record_start < 0
+					# Only the rest of a file which did not grow is known to end with a complete record
+					partial = end < size
+					complete = not partial and size == last_size
+					for offset, entry in _records(buffer, position - base, len(buffer), kind, record_filter, complete):
+						position = base + offset
+						if entry is not None:
+							yield entry
+					if partial:
+						# Read on without waiting, with a larger read if a single record did not fit
+						read_size = read_size * 2 if position == start_position else FOLLOW_READ_SIZE
+						continue
+					read_size = FOLLOW_READ_SIZE
+			last_size = size
+		time.sleep(interval)
+
+
+
+def _parse_level(value: str) -> int:
+	if value.isdigit():
+		return int(value)
+	try:
+		return LEVEL_NUMBERS[value.upper()]
+	except KeyError:
+		raise argparse.ArgumentTypeError('unknown level {!r}'.format(value)) from None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+	parser = argparse.ArgumentParser(prog = 'python -m logwood.reader', description = 'Print records of a logwood log file.')
+	parser.add_argument('--level', type = _parse_level, help = 'Lowest level of records to print, a name or a number.')
+	parser.add_argument('--name', help = 'Print only records of this logger.')
+	parser.add_argument('--follow', '-f', action = 'store_true', help = 'Print records as they are appended to the file.')
+	parser.add_argument('--interval', type = float, default = 0.5, help = 'Seconds between checks for new records (default: %(default)s).')
+	parser.add_argument('filename', help = 'Log file to read.')
+	args = parser.parse_args(argv)
+
+	output = sys.stdout.buffer
+	try:
+		if args.follow:
+			for entry in follow(args.filename, args.level, args.name, args.interval):
+				output.write(entry.raw + b'\n')
+				output.flush()
+		else:
+			with open_log(args.filename) as log:
+				for entry in log.records(args.level, args.name):
+					output.write(entry.raw + b'\n')
+	except KeyboardInterrupt:
+		pass
+	except (OSError, ValueError) as e:
+		print('logwood.reader: {}'.format(e), file = sys.stderr)
+		return 1
+	output.flush()
+	return 0
+
+
+
+if __name__ == '__main__':
+	sys.exit(main())
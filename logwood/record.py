@@ -0,0 +1,128 @@
+'''
+Log records and context-local record variables.
+
+A record only stores the fields set by the logging call itself. Other fields are looked up in layers: fields bound
+with :func:`context` for the current asyncio task or thread come first, then the logger's static fields (the default
+record variables from :func:`logwood.basic_config`). Nothing is copied or merged per logging call, so the cost of
+creating a record does not grow with the number of bound variables.
+'''
+
+from __future__ import annotations
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+	from typing import Any, Callable, Dict, Mapping
+import contextvars
+import functools
+import types
+
+
+
+_CO_COROUTINE = 0x0080
+
+_EMPTY = types.MappingProxyType({}) # type: Mapping[str, Any]
+
+_context_variables = contextvars.ContextVar('logwood_context_variables', default = _EMPTY)
+
+# Returns record variables bound to the current context. Bound to a module name to speed up Logger.log.
+get_context = _context_variables.get
+
+# (context, reset token) of every context entered in the current thread or task, innermost last. Kept per execution
+# context rather than on the context instances, so a single instance can be entered by several threads or tasks at once.
+_entered_contexts = contextvars.ContextVar('logwood_entered_contexts', default = ())
+
+
+
+class Record(dict):
+	'''
+	Log record passed to handlers. Missing keys are looked up in `context` and then in `defaults`.
+
+	Beware that ``in``, ``get()`` and iteration only see fields stored in the record itself.
+	Use :func:`flatten` to get all fields.
+	'''
+
+	__slots__ = ('context', 'defaults')
+
+	def __missing__(self, key: str) -> Any:
+		try:
+			return self.context[key]
+		except KeyError:
+			return self.defaults[key]
+
+
+	def copy(self) -> 'Record':
+		record = Record(self)
+		record.context = self.context
+		record.defaults = self.defaults
+		return record
+
+
+
+def flatten(record: Dict[str, Any]) -> Dict[str, Any]:
+	'''
+	Return a plain dict with all fields of `record`, including context variables and defaults.
+	'''
+	if not isinstance(record, Record):
+		return dict(record)
+	data = dict(record.defaults)
+	data.update(record.context)
+	data.update(record)
+	return data
+
+
+
+class context:
+	'''
+	Bind record variables to the current context, i.e. the current asyncio task or thread.
+	Variables are merged with the ones bound in the outer context once, when the context is entered.
+	An instance may be entered by several threads or tasks at once, but must be exited by the one which entered it.
+
+	Use as a context manager::
+
+		with logwood.context(request_id = 42):
+			logger.info('Handling request')
+
+	or as a decorator of functions and coroutine functions::
+
+		@logwood.context(component = 'matcher')
+		async def match_orders():
+			...
+	'''
+
+	def __init__(self, **variables: Any) -> None:
+		self.variables = variables
+
+
+	def __enter__(self) -> 'context':
+		variables = dict(_context_variables.get())
+		variables.update(self.variables)
+		_entered_contexts.set(_entered_contexts.get() + ((self, _context_variables.set(variables)),))
+		return self
+
+
+	def __exit__(self, exc_type, exc_value, traceback) -> None:
+		entered = _entered_contexts.get()
+		for index in range(len(entered) - 1, -1, -1):
+			if entered[index][0] is self:
+				break
+		else:
+			raise RuntimeError('logwood.context exited in a thread or task which did not enter it')
+		_context_variables.reset(entered[index][1])
+		_entered_contexts.set(entered[:index])
+
+
+	def __call__(self, func: Callable) -> Callable:
+		# Every call gets its own context instance, so the decorated function may run concurrently.
+		# Same check as inspect.iscoroutinefunction, without importing inspect
+		if getattr(getattr(func, '__code__', None), 'co_flags', 0) & _CO_COROUTINE:
+			@functools.wraps(func)
+			async def async_wrapper(*args, **kwargs):
+				with context(**self.variables):
+					return await func(*args, **kwargs)
+			return async_wrapper
+
+		@functools.wraps(func)
+		def wrapper(*args, **kwargs):
+			with context(**self.variables):
+				return func(*args, **kwargs)
+		return wrapper
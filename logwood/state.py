@@ -1,11 +1,46 @@
 # This module is used for keeping runtime state.
+import _thread
+import collections
 
 # This flag indicates if basic_config has already been called.
 config_called = False
 
-# This is a dict of weakrefs to all loggers, keyed by name. The loggers might not exist already but still be counted in here.
+# Set when get_logger creates the first logger, the configuration cannot be changed afterwards.
+loggers_created = False
+
+# This is a dict of weakrefs to all loggers, keyed by name. Entries of dead loggers are removed, see dead_loggers.
 # We use weakrefs instead of simple counts so we can see which loggers were created and also use it as a cache.
 defined_loggers = {} # type: Dict[str, weakref]
 
+# Strong references to loggers in the 'interned' and 'bounded' logger cache modes, see logwood.basic_config.
+# In the bounded mode the least recently used loggers are at the beginning.
+logger_cache = collections.OrderedDict() # type: collections.OrderedDict
+
+# (name, weakref) pairs of garbage collected loggers. Weakref callbacks only append here, the entries are removed
+# from defined_loggers under registry_lock when the next logger is created.
+dead_loggers = [] # type: List[Tuple[str, weakref]]
+
+# Serializes logger creation, so concurrent get_logger calls return the same instance.
+registry_lock = _thread.allocate_lock()
+
 # Keep references to created handlers, so they can be properly closed later.
 defined_handlers = [] # type: List[logwood.base_handler.Handler]
+
+# Functions called with every new handler, e.g. to instrument it. See logwood.instrumentation.
+handler_hooks = [] # type: List[Callable[[logwood.base_handler.Handler], None]]
+
+# Functions called when the lowest level some handler emits may have changed: handlers were added or configured, or
+# a handler's level was set. See logwood.compat.
+level_hooks = [] # type: List[Callable[[], None]]
+
+# Handlers of loggers by logger name, given by logwood.config. Added to loggers when they are created.
+logger_handlers = {} # type: Dict[str, List[logwood.base_handler.Handler]]
+
+# The configuration applied by logwood.config.load, its handlers are replaced by the next one.
+configuration = None # type: Optional[logwood.config.Configuration]
+
+# Whether the atexit and fork hooks of logwood.lifecycle were registered.
+hooks_registered = False
+
+# Number of records passed to the last resort handler because some handler failed.
+last_resort_calls = 0
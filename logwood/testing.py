@@ -15,7 +15,15 @@ def reset_state() -> None:
 	Reset logwood's state. Beware, unexpected logger configuration may show up after this call.
 	'''
 	logwood.state.config_called = False
+	logwood.state.handler_hooks.clear()
+	logwood.state.level_hooks.clear()
+	logwood.state.last_resort_calls = 0
+	logwood.state.loggers_created = False
 	logwood.state.defined_loggers.clear()
+	logwood.state.logger_cache.clear()
+	logwood.state.dead_loggers.clear()
+	logwood.state.logger_handlers = {}
+	logwood.state.configuration = None
 	logwood.shutdown()
 	logwood.state.defined_handlers.clear()
 
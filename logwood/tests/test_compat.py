@@ -5,6 +5,8 @@ import uuid
 
 import logwood
 import logwood.compat
+import logwood.config
+import logwood.testing
 
 
 
@@ -39,3 +41,132 @@ def test_log_with_object_args(logwood_handler, logging_logger):
 	assert "'a': 5" in args['message']
 	assert "'b': 6" in args['message']
 	assert args['level'] == 'ERROR'
+
+
+@pytest.fixture
+def bridged_logger():
+	'''
+	Standard logger with a BridgeHandler attached directly, independent of handlers on the root logger.
+	'''
+	logger = logging.getLogger(str(uuid.uuid4()))
+	logger.propagate = False
+	logger.setLevel(logging.DEBUG)
+	bridge = logwood.compat.BridgeHandler()
+	logger.addHandler(bridge)
+	yield logger
+	logger.removeHandler(bridge)
+
+
+@pytest.fixture
+def logwood_mock():
+	handler = logwood.testing.MockLogwoodHandler(level = logwood.DEBUG, format = '{name}|{message}|{funcName}')
+	logwood.basic_config(handlers = [handler])
+	return handler
+
+
+def test_bridge_passes_args_unformatted(logwood_handler, bridged_logger):
+	logwood.basic_config(handlers = [logwood_handler])
+	bridged_logger.warning('Value %s, %d', 'abc', 123)
+	record = logwood_handler.handle.call_args_list[0][0][0]
+	assert record['message'] == 'Value %s, %d'
+	assert record['args'] == ('abc', 123)
+	assert record['name'] == bridged_logger.name
+	assert record['level'] == 'WARNING'
+	assert record['funcName'] == 'test_bridge_passes_args_unformatted'
+
+
+def test_bridge_formats_in_logwood_handler(logwood_mock, bridged_logger):
+	bridged_logger.info('Value %s, %d', 'abc', 123)
+	assert logwood_mock['INFO'] == ['{}|Value abc, 123|test_bridge_formats_in_logwood_handler'.format(bridged_logger.name)]
+
+
+@pytest.mark.parametrize('message,args,expected', [
+	('Braces {} and %s', ('x',), 'Braces {} and x'),
+	('Mapping %(a)s', ({'a': 1},), 'Mapping 1'),
+	(ValueError('not a string'), (), 'not a string'),
+])
+def test_bridge_formats_eagerly_when_needed(logwood_mock, bridged_logger, message, args, expected):
+	'''
+	Messages which logwood would interpolate differently from logging are formatted by logging.
+	'''
+	bridged_logger.error(message, *args)
+	assert logwood_mock['ERROR'] == ['{}|{}|test_bridge_formats_eagerly_when_needed'.format(bridged_logger.name, expected)]
+
+
+def test_bridge_created_and_exception(logwood_handler, bridged_logger):
+	logwood.basic_config(handlers = [logwood_handler])
+	try:
+		raise ValueError('boom')
+	except ValueError:
+		bridged_logger.exception('Failed')
+	log_record = logwood_handler.handle.call_args_list[0][0][0]
+	assert log_record['exc_info'][0] is ValueError
+	assert 'exc_text' not in log_record
+
+	handler = logwood.testing.MockLogwoodHandler(level = logwood.DEBUG, format = '%(message)s')
+	assert 'ValueError: boom' in handler.format_message(log_record)
+
+	stdlib_record = logging.LogRecord('name', logging.INFO, __file__, 1, 'Message', (), None)
+	logwood.compat.BridgeHandler().emit(stdlib_record)
+	assert logwood_handler.handle.call_args_list[1][0][0]['timestamp'] == stdlib_record.created
+
+
+def test_sync_levels():
+	root = logging.getLogger()
+	original_level = root.level
+	try:
+		logwood.basic_config(handlers = [logwood.testing.MockLogwoodHandler(level = logwood.WARNING)])
+		logwood.compat.sync_levels()
+		assert root.level == logging.WARNING
+
+		logger = logwood.get_logger('Verbose')
+		logger.add_handler(logwood.testing.MockLogwoodHandler(level = logwood.DEBUG))
+		logwood.compat.sync_levels()
+		assert root.level == logging.DEBUG
+	finally:
+		root.setLevel(original_level)
+
+
+def test_redirect_keeps_existing_configuration():
+	''' An application which configured logging itself keeps its root level. '''
+	root = logging.getLogger()
+	original_level, original_handlers = root.level, root.handlers[:]
+	handler = logging.NullHandler()
+	try:
+		root.handlers = [handler]
+		root.setLevel(logging.ERROR)
+		logwood.basic_config(handlers = [logwood.testing.MockLogwoodHandler(level = logwood.DEBUG)])
+		logwood.compat.redirect_standard_logging()
+		assert root.handlers == [handler]
+		assert root.level == logging.ERROR
+	finally:
+		root.handlers = original_handlers
+		root.setLevel(original_level)
+
+
+def test_levels_stay_in_sync():
+	root = logging.getLogger()
+	original_level, original_handlers = root.level, root.handlers[:]
+	try:
+		root.handlers = []
+		handler = logwood.testing.MockLogwoodHandler(level = logwood.WARNING)
+		logwood.basic_config(handlers = [handler])
+		logwood.compat.redirect_standard_logging()
+		assert root.level == logging.WARNING
+
+		handler.level = logwood.ERROR
+		assert root.level == logging.ERROR
+
+		logger = logwood.get_logger('Verbose')
+		logger.add_handler(logwood.testing.MockLogwoodHandler(level = logwood.INFO))
+		assert root.level == logging.INFO
+
+		logwood.config.load({
+			'handlers': {'debug': {'class': 'stream', 'level': 'DEBUG', 'stream': 'stderr'}},
+			'default_handlers': [],
+			'loggers': {'Verbose': {'handlers': ['debug']}},
+		})
+		assert root.level == logging.DEBUG
+	finally:
+		root.handlers = original_handlers
+		root.setLevel(original_level)
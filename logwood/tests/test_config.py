@@ -0,0 +1,238 @@
+import json
+import os
+import sys
+
+import pytest
+
+import logwood
+import logwood.config
+import logwood.global_config
+import logwood.testing
+from logwood.config import ConfigError
+from logwood.handlers.logging import FileHandler, StreamHandler
+from logwood.handlers.stderr import ColoredStderrHandler
+from logwood.handlers.threaded import ThreadedHandler
+
+
+
+def _read(path):
+	with open(path) as f:
+		return f.read()
+
+
+def test_load_dict(tmp_path):
+	log_file = str(tmp_path / 'app.log')
+	configuration = logwood.config.load({
+		'format': '%(level)s %(message)s',
+		'level': 'debug',
+		'record_variables': {'service': 'pricer'},
+		'handlers': {
+			'file': {'class': 'file', 'filename': log_file, 'level': 'WARNING'},
+		},
+		'default_handlers': ['file'],
+	})
+
+	handler, = logwood.global_config.default_handlers
+	assert isinstance(handler, FileHandler)
+	assert handler.level == logwood.WARNING
+	assert configuration.default_handlers == [handler]
+	assert logwood.global_config.default_log_level == logwood.DEBUG
+	assert logwood.global_config.default_record_variables['service'] == 'pricer'
+
+	logger = logwood.get_logger('test')
+	logger.info('dropped')
+	logger.error('written')
+	handler.flush()
+	assert _read(log_file) == 'ERROR written\n'
+
+
+def test_default_handler():
+	logwood.config.load({'level': 40})
+	handler, = logwood.global_config.default_handlers
+	assert isinstance(handler, ColoredStderrHandler)
+	assert logwood.global_config.default_log_level == logwood.ERROR
+
+
+def test_nested_handlers_and_streams():
+	configuration = logwood.config.load({
+		'handlers': {
+			'threaded': {'class': 'threaded', 'underlying_handler': {'class': 'stream', 'stream': 'stdout'}},
+			'custom': {'class': 'logwood.handlers.logging.StreamHandler'},
+		},
+		'default_handlers': ['threaded'],
+	})
+	threaded, custom = configuration.handlers
+	assert isinstance(threaded, ThreadedHandler)
+	assert isinstance(threaded.underlying_handler, StreamHandler)
+	assert isinstance(custom, StreamHandler)
+	assert threaded.underlying_handler.stream is sys.stdout
+
+
+def test_logger_handlers(tmp_path):
+	log_file = str(tmp_path / 'audit.log')
+	logwood.config.load({
+		'format': '%(name)s %(message)s',
+		'handlers': {'audit': {'class': 'file', 'filename': log_file}},
+		'default_handlers': [],
+		'loggers': {'audit': {'handlers': ['audit']}},
+	})
+	logwood.get_logger('audit').info('one')
+	logwood.get_logger('other').info('two')
+	logwood.get_logger('audit').handlers[0].flush()
+	assert _read(log_file) == 'audit one\n'
+
+
+def test_json_file(tmp_path):
+	path = tmp_path / 'logging.json'
+	path.write_text(json.dumps({'level': 'WARNING', 'handlers': {}, 'default_handlers': []}))
+	logwood.config.load(str(path))
+	assert logwood.global_config.default_log_level == logwood.WARNING
+
+
+def test_toml_file(tmp_path):
+	pytest.importorskip('tomllib')
+	path = tmp_path / 'logging.toml'
+	path.write_text('level = "ERROR"\ndefault_handlers = ["out"]\n\n[handlers.out]\nclass = "stream"\nstream = "stdout"\n')
+	configuration = logwood.config.load(path)
+	assert logwood.global_config.default_log_level == logwood.ERROR
+	assert isinstance(configuration.default_handlers[0], StreamHandler)
+
+
+def test_unknown_file_format(tmp_path):
+	with pytest.raises(ConfigError):
+		logwood.config.load(str(tmp_path / 'logging.yaml'))
+
+
+def test_all_errors_are_reported():
+	with pytest.raises(ConfigError) as error:
+		logwood.config.load({
+			'level': 'LOUD',
+			'filters': {},
+			'handlers': {
+				'missing': {'class': 'logwood.handlers.nothing.Handler'},
+				'not_handler': {'class': 'collections.OrderedDict'},
+				'bad_argument': {'class': 'stream', 'colour': True},
+				'bad_nested': {'class': 'threaded', 'underlying_handler': {'class': 'stream', 'level': 'LOUDER'}},
+			},
+			'default_handlers': ['bad_argument', 'unknown'],
+			'loggers': {'app': {'level': 'DEBUG'}},
+		})
+	errors = error.value.errors
+	assert any(e.startswith('level:') for e in errors)
+	assert any(e.startswith('filters:') for e in errors)
+	assert any(e.startswith('handlers.missing.class:') for e in errors)
+	assert any(e.startswith('handlers.not_handler.class:') for e in errors)
+	assert any(e.startswith('handlers.bad_argument:') for e in errors)
+	assert any(e.startswith('handlers.bad_nested.underlying_handler.level:') for e in errors)
+	assert any(e.startswith('default_handlers:') and 'unknown' in e for e in errors)
+	assert any(e.startswith('loggers.app.level:') for e in errors)
+	assert len(errors) == 8
+	# Nothing was applied nor created
+	assert not logwood.state.config_called
+	assert logwood.state.defined_handlers == []
+
+
+def test_hot_swap(tmp_path):
+	old_file, new_file = str(tmp_path / 'old.log'), str(tmp_path / 'new.log')
+	old = logwood.config.load({
+		'format': '%(message)s',
+		'handlers': {'file': {'class': 'file', 'filename': old_file}},
+		'default_handlers': ['file'],
+		'loggers': {'app': {'handlers': ['file']}},
+	})
+	logger = logwood.get_logger('app')
+	own_handler = StreamHandler()
+	logger.add_handler(own_handler)
+	bound = logger.bind(request = 1)
+	logger.info('before')
+
+	new = logwood.config.load({
+		'format': '%(message)s!',
+		'handlers': {'file': {'class': 'file', 'filename': new_file}},
+		'default_handlers': [],
+		'loggers': {'app': {'handlers': ['file']}},
+	})
+	new_handler, = new.handlers
+	assert all(handler.is_shutdown for handler in old.handlers)
+	assert logwood.global_config.default_handlers == []
+	assert logger.handlers == [own_handler, new_handler]
+	bound.info('after')
+	new_handler.flush()
+	assert _read(old_file) == 'before\nbefore\n'
+	assert _read(new_file) == 'after!\n'
+
+	# An invalid configuration leaves the active one in place
+	with pytest.raises(ConfigError):
+		logwood.config.load({'default_handlers': ['nothing']})
+	assert logger.handlers == [own_handler, new_handler]
+	assert not new_handler.is_shutdown
+
+
+def test_watcher(tmp_path, monkeypatch):
+	path = tmp_path / 'logging.json'
+	path.write_text(json.dumps({'level': 'INFO', 'default_handlers': []}))
+	watcher = logwood.config.watch(str(path), interval = 60)
+	try:
+		assert not watcher.check()
+
+		path.write_text(json.dumps({'level': 'ERROR', 'default_handlers': []}))
+		os.utime(str(path), ns = (0, watcher._mtime + 1))
+		assert watcher.check()
+		assert logwood.global_config.default_log_level == logwood.ERROR
+
+		reported = []
+		monkeypatch.setattr(logwood.global_config, 'last_resort_handler', reported.append)
+		path.write_text('{')
+		os.utime(str(path), ns = (0, watcher._mtime + 1))
+		assert not watcher.check()
+		assert len(reported) == 1
+		assert logwood.global_config.default_log_level == logwood.ERROR
+	finally:
+		watcher.stop()
+
+
+def test_reload_record_variables():
+	logwood.config.load({
+		'format': '{service} {hostname} {message}',
+		'record_variables': {'service': 'pricer', 'hostname': 'config-host'},
+		'default_handlers': [],
+	})
+	logger = logwood.get_logger('app')
+	bound = logger.bind(request = 1)
+	assert bound._static_fields['service'] == 'pricer'
+
+	logwood.config.load({'record_variables': {'service': 'matcher'}, 'default_handlers': []})
+	assert bound._static_fields['service'] == 'matcher'
+	assert bound._static_fields['request'] == 1
+	# A variable overridden by the previous configuration gets its standard value back
+	assert logwood.global_config.default_record_variables['hostname'] == logwood._standard_record_variables()['hostname']
+
+	logwood.config.load({'default_handlers': []})
+	assert 'service' not in logwood.global_config.default_record_variables
+	assert 'service' not in bound._static_fields
+
+
+def test_reload_logger_cache():
+	logwood.config.load({'logger_cache': 'interned', 'default_handlers': []})
+	for i in range(5):
+		logwood.get_logger('logger-{}'.format(i))
+	assert len(logwood.state.logger_cache) == 5
+
+	logwood.config.load({'logger_cache': 'bounded', 'logger_cache_size': 2, 'default_handlers': []})
+	assert list(logwood.state.logger_cache) == ['logger-3', 'logger-4']
+	logwood.get_logger('logger-5')
+	assert list(logwood.state.logger_cache) == ['logger-4', 'logger-5']
+
+	logwood.config.load({'logger_cache': 'weak', 'default_handlers': []})
+	assert len(logwood.state.logger_cache) == 0
+	logwood.get_logger('logger-6')
+	assert len(logwood.state.logger_cache) == 0
+
+
+def test_load_closes_basic_config_handlers():
+	handler = logwood.testing.MockLogwoodHandler()
+	logwood.basic_config(handlers = [handler])
+	logwood.get_logger('app')
+	logwood.config.load({'default_handlers': []})
+	assert handler.is_shutdown
+	assert logwood.global_config.default_handlers == []
@@ -0,0 +1,18 @@
+from logwood.formatting import compile_format
+
+
+
+def test_compile_percent_format():
+	compiled = compile_format('[%(timestamp)s][%(level)s] %(message)s')
+	assert not compiled.str_format
+	assert compiled.fields == {'timestamp', 'level', 'message'}
+
+
+def test_compile_str_format():
+	compiled = compile_format('[{timestamp.real:.3f}][{level:*^11}] {message} {args[0]}')
+	assert compiled.str_format
+	assert compiled.fields == {'timestamp', 'level', 'message', 'args'}
+
+
+def test_compiled_formats_are_cached():
+	assert compile_format('%(message)s') is compile_format('%(message)s')
@@ -72,6 +72,9 @@ def test_format_massage(handler, logger):
 
 	# Args must be removed after message is formatted
 	assert 'args' not in record
+	# The template is kept
+	assert record['template'] == 'Something with id %d went wrong: %s'
+	assert record['template_args'] == (variable1, variable2)
 
 
 def test_format_message_str_format(handler, logger):
@@ -0,0 +1,121 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+import logwood
+import logwood.index
+import logwood.query
+from logwood.handlers.logging import FileHandler
+
+
+
+def _record(timestamp, level, message):
+	return {'timestamp': timestamp, 'level_number': level, 'level': logwood.constants.LOG_LEVEL_NAMES[level], 'message': message}
+
+
+@pytest.fixture
+def log_file(tmpdir):
+	'''
+	Two minutes of records, INFO every second, an ERROR every 30 seconds and a WARNING with a traceback-like
+	multi-line message at 100 s.
+	'''
+	filename = str(tmpdir.join('app.log'))
+	handler = FileHandler(format = '{timestamp:.0f} {level} {message}', filename = filename, index = True)
+	for second in range(120):
+		handler.emit(_record(1000.0 + second, logwood.INFO, 'tick'))
+		if second % 30 == 0:
+			handler.emit(_record(1000.5 + second, logwood.ERROR, 'failed'))
+		if second == 100:
+			handler.emit(_record(1000.7 + second, logwood.WARNING, 'slow\n  line two'))
+	handler.close()
+	return filename
+
+
+def _query(filename, **kwargs):
+	return b''.join(logwood.index.query(filename, **kwargs)).decode()
+
+
+def test_index_entries(log_file):
+	bucket_size, entries = logwood.index.read_index(log_file + '.idx')
+	assert bucket_size == 1.0
+	# One entry per second, plus the runs of errors and the warning
+	assert len(entries) == 120 + 4 + 1
+	assert entries[0] == (1000.0, 0, logwood.INFO)
+	assert entries[1] == (1000.0, len('1000 INFO tick\n'), logwood.ERROR)
+
+
+def test_query_level(log_file):
+	assert _query(log_file, level = logwood.ERROR) == ''.join('{} ERROR failed\n'.format(1000 + s) for s in range(0, 120, 30))
+	assert _query(log_file, level = logwood.WARNING) == (
+		'1000 ERROR failed\n1030 ERROR failed\n1060 ERROR failed\n1090 ERROR failed\n1101 WARNING slow\n  line two\n'
+	)
+
+
+def test_query_time_range(log_file):
+	assert _query(log_file, since = 1029.5, until = 1031) == '1029 INFO tick\n1030 INFO tick\n1030 ERROR failed\n1031 INFO tick\n'
+	assert _query(log_file, since = 1115) == ''.join('{} INFO tick\n'.format(1000 + s) for s in range(115, 120))
+	assert _query(log_file, until = 900) == ''
+	with open(log_file) as f:
+		assert _query(log_file) == f.read()
+
+
+def test_reads_only_matching_ranges(log_file, monkeypatch):
+	read_sizes = []
+	original_open = open
+
+	class CountingFile(io.FileIO):
+		def read(self, size = -1):
+			data = super().read(size)
+			read_sizes.append(len(data))
+			return data
+
+	monkeypatch.setattr(logwood.index, 'open', lambda name, mode: CountingFile(name, 'r') if name == log_file else original_open(name, mode), raising = False)
+	assert _query(log_file, level = logwood.ERROR).count('\n') == 4
+	assert sum(read_sizes) == 4 * len('1000 ERROR failed\n')
+
+
+def test_appending_keeps_index(log_file):
+	handler = FileHandler(format = '{timestamp:.0f} {level} {message}', filename = log_file, index = True, index_bucket = 60)
+	handler.emit(_record(2000.0, logwood.CRITICAL, 'restarted'))
+	handler.close()
+	bucket_size, entries = logwood.index.read_index(log_file + '.idx')
+	assert bucket_size == 1.0
+	assert len(entries) == 126
+	assert _query(log_file, since = 1500) == '2000 FATAL restarted\n'
+
+
+def test_overwriting_truncates_index(log_file):
+	handler = FileHandler(format = '{message}', filename = log_file, mode = 'w', index = True)
+	handler.emit(_record(2000.0, logwood.INFO, 'fresh'))
+	handler.close()
+	_, entries = logwood.index.read_index(log_file + '.idx')
+	assert entries == [(2000.0, 0, logwood.INFO)]
+
+
+def test_index_with_logger(tmpdir):
+	filename = str(tmpdir.join('app.log'))
+	logwood.basic_config(handlers = [FileHandler(format = '{level} {message}', filename = filename, index = True, delay = True)])
+	logger = logwood.get_logger('Test')
+	logger.info('one')
+	logger.error('two')
+	logger.info('three')
+	logwood.shutdown()
+	assert _query(filename, level = logwood.ERROR) == 'ERROR two\n'
+
+
+def test_command_line(log_file, capsys):
+	output = io.BytesIO()
+	assert logwood.query.main([log_file, '--level', 'error', '--since', '1050', '--until', '1070'], output) == 0
+	assert output.getvalue() == b'1060 ERROR failed\n'
+
+	assert logwood.query.main([log_file + '.missing']) == 1
+	assert 'No such file' in capsys.readouterr().err
+
+
+def test_module_entry_point(log_file):
+	root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+	output = subprocess.check_output([sys.executable, '-m', 'logwood.query', '--level', 'CRITICAL', log_file], cwd = root)
+	assert output == b''
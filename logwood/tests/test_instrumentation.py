@@ -0,0 +1,102 @@
+import pytest
+import unittest.mock
+
+import logwood
+import logwood.instrumentation
+import logwood.testing
+from logwood.base_handler import Handler
+from logwood.handlers.append import AppendFileHandler
+from logwood.handlers.chunked import ChunkedSysLogHandler
+from logwood.handlers.compressed import CompressedFileHandler
+
+
+
+@pytest.fixture
+def handler():
+	handler = logwood.testing.MockLogwoodHandler(level = logwood.INFO, format = '%(message)s')
+	logwood.basic_config(handlers = [handler])
+	return handler
+
+
+def test_disabled_by_default(handler):
+	logwood.get_logger('Test').info('Message')
+	snapshot = logwood.stats()
+	assert not snapshot['enabled']
+	assert snapshot['handlers'] == []
+	assert 'handle' not in vars(handler)
+
+
+def test_counters(handler):
+	logwood.instrumentation.enable()
+	logger = logwood.get_logger('Test')
+	logger.debug('Filtered')
+	logger.info('Hello')
+	logger.warning('World!')
+
+	snapshot = logwood.stats()
+	assert snapshot['enabled']
+	[handler_stats] = snapshot['handlers']
+	assert handler_stats['handler'] is handler
+	assert handler_stats['name'] == 'MockLogwoodHandler'
+	assert handler_stats['received'] == 3
+	assert handler_stats['emitted'] == 2
+	assert handler_stats['filtered'] == 1
+	assert handler_stats['chars'] == len('Hello') + len('World!')
+	assert handler_stats['exceptions'] == 0
+	assert handler_stats['emit_time'] > 0
+	assert sum(handler_stats['emit_time_histogram'].values()) == 2
+	assert handler['INFO'] == ['Hello']
+
+
+def test_exceptions(handler, capsys):
+	logwood.instrumentation.enable()
+	failing_handler = logwood.testing.MockLogwoodHandler(format = '%(missing)s')
+	logger = logwood.get_logger('Test')
+	logger.add_handler(failing_handler)
+	logger.info('Message')
+
+	snapshot = logwood.stats()
+	assert snapshot['last_resort_calls'] == 1
+	assert [s['exceptions'] for s in snapshot['handlers']] == [0, 1]
+	assert 'LOGWOOD ERROR' in capsys.readouterr()[1]
+
+
+def test_disable_restores_methods(handler):
+	emit = unittest.mock.Mock()
+	handler.emit = emit
+	logwood.instrumentation.enable()
+	assert handler.emit is not emit
+	logwood.instrumentation.disable()
+	assert handler.emit is emit
+	assert 'handle' not in vars(handler)
+	assert 'format_message' not in vars(handler)
+	assert 'count_written' not in vars(handler)
+	assert type(handler).handle is Handler.handle
+
+
+@unittest.mock.patch('socket.socket')
+def test_chunked_syslog_counted_once(socket):
+	handler = ChunkedSysLogHandler(address = '/not/existing', format = '%(message)s', chunk_size = 10)
+	logwood.basic_config(handlers = [handler])
+	logwood.instrumentation.enable()
+	logwood.get_logger('Test').error('1234567890' * 3)
+	[handler_stats] = logwood.stats()['handlers']
+	# Only the chunks sent are counted, each with its '(1/3) ' prefix
+	assert handler_stats['chars'] == 3 * len('(1/3) 1234567890')
+
+
+def test_bytes_written(tmpdir):
+	append = AppendFileHandler(filename = str(tmpdir.join('app.log')), format = '{message}')
+	compressed = CompressedFileHandler(filename = str(tmpdir.join('app.log.gz')), format = '{message}')
+	logwood.basic_config(handlers = [append, compressed])
+	logwood.instrumentation.enable()
+	logwood.get_logger('Test').info('Déjà vu')
+	append.flush()
+	append_stats, = [s for s in logwood.stats()['handlers'] if s['handler'] is append]
+	# Closing writes the end of the compressed stream
+	compressed.close()
+	compressed_stats = compressed._logwood_stats.snapshot()
+	assert append_stats['chars'] == len('Déjà vu')
+	assert append_stats['bytes'] == len('Déjà vu\n'.encode('utf-8'))
+	# Compressed blocks and the end of the stream
+	assert compressed_stats['bytes'] == tmpdir.join('app.log.gz').size()
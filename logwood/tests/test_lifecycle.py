@@ -0,0 +1,260 @@
+import io
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import logwood
+import logwood.lifecycle
+import logwood.state
+from logwood.base_handler import Handler
+from logwood.handlers.append import AppendFileHandler
+from logwood.handlers.buffered import ThreadBufferedStreamHandler
+from logwood.handlers.syslog import SysLogUnixHandler
+from logwood.handlers.threaded import ThreadedHandler
+
+
+
+class CountingHandler(Handler):
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.emitted = []
+		self.closed = 0
+		self.release = threading.Event()
+		self.release.set()
+
+
+	def emit(self, record):
+		self.release.wait()
+		self.emitted.append(self.format_message(record))
+
+
+	def close(self, timeout = None):
+		super().close(timeout)
+		self.closed += 1
+		self.release.wait()
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _fork(child):
+	'''
+	Run `child` in a forked process and wait for it. The child exits with 1 if `child` raises.
+	'''
+	pid = os.fork()
+	if pid == 0:
+		status = 1
+		try:
+			child()
+			status = 0
+		finally:
+			os._exit(status)
+	_, status = os.waitpid(pid, 0)
+	assert os.WEXITSTATUS(status) == 0
+
+
+def _run_script(code):
+	return subprocess.run([sys.executable, '-c', code], cwd = ROOT, stdout = subprocess.PIPE, stderr = subprocess.PIPE,
+		universal_newlines = True, timeout = 30)
+
+
+def test_shutdown_closes_all_handlers():
+	handlers = [CountingHandler() for _ in range(5)]
+	logwood.basic_config(handlers = handlers)
+	report = logwood.shutdown()
+	assert [handler.closed for handler in handlers] == [1] * 5
+	assert logwood.state.defined_handlers == []
+	assert report['lost_records'] == 0
+	assert report['timed_out'] == []
+
+
+def test_shutdown_deadline():
+	'''
+	A handler stuck in close does not delay shutdown beyond the deadline, nor the other handlers.
+	'''
+	stuck, fine = CountingHandler(), CountingHandler()
+	stuck.release.clear()
+	logwood.basic_config(handlers = [stuck, fine])
+	start = time.monotonic()
+	report = logwood.shutdown(timeout = 0.2)
+	assert time.monotonic() - start < 2
+	assert report['timed_out'] == ['CountingHandler']
+	assert fine.closed == 1
+	stuck.release.set()
+
+
+def test_threaded_handler_bounded_close():
+	underlying = CountingHandler(format = '{message}')
+	underlying.release.clear()
+	handler = ThreadedHandler(underlying_handler = underlying)
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+	for i in range(10):
+		logger.error('Message {}', i)
+
+	report = logwood.shutdown(timeout = 0.2)
+	# One record is stuck in the underlying handler's emit, the rest never left the queue
+	assert handler.lost_records == 9
+	assert report['lost_records'] == 9
+	# The underlying handler is closed once, by the threaded handler
+	assert underlying.closed == 1
+	underlying.release.set()
+
+
+def test_threaded_handler_close_drains_queue():
+	underlying = CountingHandler(format = '{message}')
+	logwood.basic_config(handlers = [ThreadedHandler(underlying_handler = underlying)])
+	logger = logwood.get_logger('Test')
+	for i in range(100):
+		logger.error('Message {}', i)
+	report = logwood.shutdown(timeout = 5)
+	assert underlying.emitted == ['Message {}'.format(i) for i in range(100)]
+	assert report['lost_records'] == 0
+
+
+def test_flush():
+	stream = io.StringIO()
+	logwood.basic_config(handlers = [ThreadBufferedStreamHandler(stream = stream, format = '{message}', flush_interval = 60)])
+	logwood.get_logger('Test').info('Buffered')
+	assert stream.getvalue() == ''
+	report = logwood.flush(timeout = 1)
+	assert stream.getvalue() == 'Buffered\n'
+	assert report['timed_out'] == []
+
+
+def test_shutdown_at_exit():
+	result = _run_script(
+		'import sys, logwood\n'
+		'from logwood.handlers.buffered import ThreadBufferedStreamHandler\n'
+		'logwood.basic_config(handlers = [ThreadBufferedStreamHandler(stream = sys.stdout, format = "{message}", flush_interval = 60)])\n'
+		'logwood.get_logger("Test").info("Written at exit")\n'
+	)
+	assert result.returncode == 0
+	assert result.stdout == 'Written at exit\n'
+
+
+def test_signal():
+	result = _run_script(
+		'import os, signal, sys, time, logwood, logwood.lifecycle\n'
+		'from logwood.handlers.buffered import ThreadBufferedStreamHandler\n'
+		'logwood.basic_config(handlers = [ThreadBufferedStreamHandler(stream = sys.stdout, format = "{message}", flush_interval = 60)])\n'
+		'logwood.lifecycle.install_signal_handlers()\n'
+		'logwood.get_logger("Test").info("Written on SIGTERM")\n'
+		'os.kill(os.getpid(), signal.SIGTERM)\n'
+		'time.sleep(10)\n'
+	)
+	assert result.returncode == 128 + signal.SIGTERM
+	assert result.stdout == 'Written on SIGTERM\n'
+
+
+def test_signal_during_emit():
+	'''
+	The SystemExit raised by the signal handler is not taken for a handler failure.
+	'''
+	result = _run_script(
+		'import os, signal, time, logwood, logwood.lifecycle\n'
+		'from logwood.base_handler import Handler\n'
+		'class SlowHandler(Handler):\n'
+		'	def emit(self, record):\n'
+		'		os.kill(os.getpid(), signal.SIGTERM)\n'
+		'		time.sleep(10)\n'
+		'logwood.basic_config(handlers = [SlowHandler()])\n'
+		'logwood.lifecycle.install_signal_handlers()\n'
+		'logwood.get_logger("Test").info("Interrupted")\n'
+	)
+	assert result.returncode == 128 + signal.SIGTERM
+	assert 'LOGWOOD ERROR' not in result.stderr
+
+
+def test_program_signal_handler_during_emit():
+	'''
+	A signal interrupting emit, which holds the lock the handler's flush needs, does not wait for the flush.
+	'''
+	result = _run_script(
+		'import os, signal, threading, time, logwood, logwood.lifecycle\n'
+		'from logwood.base_handler import Handler\n'
+		'class LockingHandler(Handler):\n'
+		'	def __init__(self):\n'
+		'		super().__init__()\n'
+		'		self.lock = threading.Lock()\n'
+		'	def emit(self, record):\n'
+		'		with self.lock:\n'
+		'			os.kill(os.getpid(), signal.SIGUSR1)\n'
+		'			print("emitted", flush = True)\n'
+		'	def flush(self):\n'
+		'		with self.lock:\n'
+		'			print("flushed", flush = True)\n'
+		'signal.signal(signal.SIGUSR1, lambda signum, frame: print("program handler", flush = True))\n'
+		'logwood.basic_config(handlers = [LockingHandler()], shutdown_timeout = None)\n'
+		'logwood.lifecycle.install_signal_handlers([signal.SIGUSR1])\n'
+		'logwood.get_logger("Test").info("Interrupted")\n'
+		'time.sleep(0.5)\n'
+	)
+	assert result.returncode == 0
+	assert result.stdout == 'program handler\nemitted\nflushed\n'
+
+
+def test_fork_threaded_handler(tmpdir):
+	'''
+	A forked child keeps logging through a ThreadedHandler, records are written exactly once.
+	'''
+	filename = str(tmpdir.join('log'))
+	logwood.basic_config(handlers = [ThreadedHandler(underlying_handler = AppendFileHandler(format = '{message}', filename = filename, batch_size = 100))])
+	logger = logwood.get_logger('Test')
+	for i in range(10):
+		logger.info('Before {}', i)
+
+	def child():
+		logger.info('Child')
+		assert logwood.shutdown(timeout = 5)['lost_records'] == 0
+
+	_fork(child)
+	logger.info('Parent')
+	logwood.shutdown(timeout = 5)
+	with open(filename) as f:
+		lines = f.read().splitlines()
+	assert sorted(lines) == sorted(['Before {}'.format(i) for i in range(10)] + ['Child', 'Parent'])
+
+
+def test_fork_buffered_handler(tmpdir):
+	filename = str(tmpdir.join('log'))
+	stream = open(filename, 'a')
+	logwood.basic_config(handlers = [ThreadBufferedStreamHandler(stream = stream, format = '{message}', flush_interval = 60)])
+	logger = logwood.get_logger('Test')
+	for i in range(10):
+		logger.info('Before {}', i)
+
+	def child():
+		logger.info('Child')
+		logwood.flush()
+
+	_fork(child)
+	logger.info('Parent')
+	logwood.shutdown()
+	stream.close()
+	with open(filename) as f:
+		lines = f.read().splitlines()
+	assert lines[:10] == ['Before {}'.format(i) for i in range(10)]
+	assert sorted(lines[10:]) == ['Child', 'Parent']
+
+
+def test_fork_syslog_unix_handler(tmpdir):
+	address = str(tmpdir.join('log'))
+	server = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+	server.bind(address)
+	server.settimeout(5)
+	try:
+		logwood.basic_config(handlers = [SysLogUnixHandler(format = '{message}', address = address, ident = 'app')])
+		logger = logwood.get_logger('Test')
+		_fork(lambda: logger.info('Child {}', os.getpid()))
+		child_message = server.recv(1000).decode()
+		# The header carries the child's process id
+		pid = child_message.rsplit(' ', 1)[1]
+		assert child_message.endswith('app[{}]: Child {}'.format(pid, pid))
+		assert pid != str(os.getpid())
+	finally:
+		server.close()
@@ -1,6 +1,8 @@
 import pytest
+import sys
 import unittest.mock
 
+import logwood.logger
 import logwood.testing
 
 import logwood
@@ -50,7 +52,12 @@ def test_exception(handler, logger):
 	except ValueError as e:
 		logger.exception('Raised exception')
 		assert handler.handle.called
-		message = handler.handle.call_args_list[0][0][0]['args'][0]
+		record = handler.handle.call_args_list[0][0][0]
+		assert record['message'] == 'Raised exception'
+		assert record['exc_info'][0] is ValueError
+		# The traceback is not rendered until a handler formats the record
+		assert 'exc_text' not in record
+		message = logwood.testing.MockLogwoodHandler().format_message(record)
 		assert 'Traceback' in message
 		assert 'My value error' in message
 		assert 'ValueError' in message
@@ -63,3 +70,102 @@ def test_last_resort(handler, logger, capsys):
 	assert 'LOGWOOD ERROR - cannot log record' in stderr
 	assert 'Boom!' in stderr
 	assert 'RuntimeError' in stderr
+
+
+def test_call_site_fields():
+	'''
+	Call-site fields are collected when a handler's format references them.
+	'''
+	handler = logwood.testing.MockLogwoodHandler(format = '%(filename)s:%(lineno)d %(funcName)s %(message)s')
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+	logger.warning('Here')
+	lineno = sys._getframe().f_lineno - 1
+	assert handler['WARNING'] == ['test_logger.py:{} test_call_site_fields Here'.format(lineno)]
+
+
+def test_call_site_fields_str_format(handler):
+	'''
+	Call-site fields are found in ``str.format()`` templates as well, also when the logger is created first.
+	'''
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+	mock_handler = logwood.testing.MockLogwoodHandler(format = '{funcName} {message}')
+	logger.add_handler(mock_handler)
+	logger.exception('Here')
+	assert mock_handler['ERROR'][0].startswith('test_call_site_fields_str_format Here')
+
+
+def test_call_site_fields_not_collected(handler, logger):
+	'''
+	Loggers whose handlers do not use call-site fields do not collect them.
+	'''
+	logger.info('Test message')
+	record = handler.handle.call_args_list[0][0][0]
+	assert 'filename' not in record
+	assert 'lineno' not in record
+	assert 'funcName' not in record
+
+
+def test_bind(handler, logger):
+	'''
+	Bound loggers add their fields to every record, context and call-site fields take precedence.
+	'''
+	bound = logger.bind(order_id = 1, venue = 'XNYS')
+	rebound = bound.bind(order_id = 2)
+	bound.info('Bound')
+	rebound.info('Rebound')
+	with logwood.context(venue = 'XLON'):
+		rebound.info('Context')
+
+	records = [call[0][0] for call in handler.handle.call_args_list]
+	assert [(r['message'], r['name'], r['order_id'], r['venue']) for r in records] == [
+		('Bound', 'TestLogger', 1, 'XNYS'),
+		('Rebound', 'TestLogger', 2, 'XNYS'),
+		('Context', 'TestLogger', 2, 'XLON'),
+	]
+	# Records themselves only contain fields of the logging call
+	assert 'order_id' not in records[0]
+
+
+def test_bind_shares_handlers(handler, logger):
+	bound = logger.bind(order_id = 1)
+	new_handler = logwood.testing.MockLogwoodHandler(format = '%(order_id)s %(funcName)s %(message)s')
+	bound.add_handler(new_handler)
+	assert new_handler in logger.handlers
+	bound.info('Bound')
+	logger.bind(order_id = 2).info('Later')
+	assert new_handler['INFO'] == ['1 test_bind_shares_handlers Bound', '2 test_bind_shares_handlers Later']
+
+
+def test_keyword_fields(handler, logger):
+	'''
+	Keyword arguments are stored as record fields and are not used to format the message.
+	'''
+	logger.info('Order filled {}', 'now', qty = 5, px = 101.2)
+	record = handler.handle.call_args_list[0][0][0]
+	assert record['qty'] == 5
+	assert record['px'] == 101.2
+	assert record['args'] == ('now',)
+	assert record['message'] == 'Order filled {}'
+
+
+def test_keyword_fields_rendered_on_demand(handler, logger):
+	class Unrenderable:
+		def __str__(self):
+			raise AssertionError('Field was stringified')
+		__repr__ = __format__ = __str__
+
+	mock_handler = logwood.testing.MockLogwoodHandler(format = '{message} qty={qty}')
+	logger.add_handler(mock_handler)
+	logger.info('Order filled', qty = 5, unused = Unrenderable())
+	assert mock_handler['INFO'] == ['Order filled qty=5']
+
+
+@pytest.mark.parametrize('field', ['timestamp', 'args', 'level', 'message', 'exc_text', 'template', 'funcName'])
+def test_reserved_keyword_fields(handler, logger, field):
+	with pytest.raises(TypeError):
+		logger.info('Message', **{field: 'value'})
+	with pytest.raises(TypeError):
+		logger.bind(**{field: 'value'})
+	assert not handler.handle.called
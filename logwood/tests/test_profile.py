@@ -0,0 +1,62 @@
+import json
+import pytest
+
+import logwood
+import logwood.profile
+import logwood.testing
+from logwood.logger import Logger
+
+
+
+def test_profile():
+	handler = logwood.testing.MockLogwoodHandler(format = '%(funcName)s %(message)s')
+	logwood.basic_config(handlers = [handler])
+	logger = logwood.get_logger('Test')
+	logwood.profile.enable(sample_rate = 0.5)
+	try:
+		assert logwood.profile.is_enabled()
+		for i in range(10):
+			logger.info('Message {}', i)
+	finally:
+		logwood.profile.disable()
+
+	assert Logger.log is logwood.profile._original_log
+	assert 'emit' not in vars(handler)
+	# Profiling does not change the call site
+	assert handler['INFO'][0] == 'test_profile Message 0'
+
+	report = logwood.profile.report()
+	assert report['sample_interval'] == 2
+	assert report['loggers']['Test']['samples'] == 5
+	assert set(report['loggers']['Test']['phases']) == {'record', 'dispatch'}
+	[handler_report] = report['handlers'].values()
+	assert handler_report['samples'] == 5
+	assert set(handler_report['phases']) == {'filter', 'interpolation', 'formatting', 'io'}
+	assert handler_report['phases']['interpolation']['total'] > 0
+	assert 'MockLogwoodHandler' in logwood.profile.format_report()
+
+
+def test_main(tmpdir):
+	script = tmpdir.join('script.py')
+	script.write(
+		'import logwood\n'
+		'from logwood.handlers.json import JsonHandler\n'
+		'logwood.basic_config(handlers = [JsonHandler(stream = open({!r}, "w"))])\n'
+		'logger = logwood.get_logger("Script")\n'
+		'for i in range(20):\n'
+		'    logger.info("Message {{}}", i)\n'.format(str(tmpdir.join('log.json')))
+	)
+	output = tmpdir.join('report.json')
+	assert logwood.profile.main(['--sample-rate', '0.1', '--output', str(output), str(script)]) == 0
+	report = json.loads(output.read())
+	assert report['loggers']['Script']['samples'] == 2
+	assert Logger.log is logwood.profile._original_log
+
+
+@pytest.mark.parametrize('code', [3, 'Failed', None])
+def test_main_exit_status(tmpdir, code):
+	script = tmpdir.join('script.py')
+	script.write('import sys\nsys.exit({!r})\n'.format(code))
+	output = tmpdir.join('report.json')
+	assert logwood.profile.main(['--output', str(output), str(script)]) == code
+	assert Logger.log is logwood.profile._original_log
@@ -1,4 +1,9 @@
 import gc
+import os
+import subprocess
+import sys
+import threading
+
 import pytest
 import unittest.mock
 
@@ -78,10 +83,8 @@ def test_calling_basic_config_multiple_times():
 	logwood.basic_config(handlers = [])
 	logwood.basic_config(handlers = [])
 
-	# now create some loggers
-	logwood.get_logger('A')
-	logwood.get_logger('B')
-	logwood.get_logger('C')
+	# now create some loggers, registry entries of dead loggers are removed so keep references
+	loggers = [logwood.get_logger('A'), logwood.get_logger('B'), logwood.get_logger('C')] # noqa
 
 	# Created loggers should be defined in state
 	assert len(logwood.state.defined_loggers) == 3
@@ -119,3 +122,74 @@ def test_logger_caching():
 
 	logger3 = logwood.get_logger('A')
 	assert logger_id != id(logger3)
+
+
+def test_import_is_lightweight():
+	'''
+	Importing logwood does not import heavy or rarely needed modules and creates no handlers.
+	'''
+	code = (
+		'import sys, logwood, logwood.state; '
+		'print(sorted({"logging", "socket", "typing", "re"} & set(sys.modules)), logwood.state.defined_handlers)'
+	)
+	root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+	output = subprocess.check_output([sys.executable, '-c', code], cwd = root, universal_newlines = True)
+	assert output.strip() == '[] []'
+
+
+def test_dead_loggers_are_removed():
+	logwood.basic_config(handlers = [])
+	for i in range(100):
+		logwood.get_logger('Temporary {}'.format(i))
+	gc.collect()
+	logwood.get_logger('Another')
+	assert list(logwood.state.defined_loggers) == ['Another']
+
+
+def test_interned_logger_cache():
+	logwood.basic_config(handlers = [], logger_cache = 'interned')
+	logger_id = id(logwood.get_logger('A'))
+	gc.collect()
+	assert id(logwood.get_logger('A')) == logger_id
+	assert 'A' in logwood.state.logger_cache
+
+
+def test_bounded_logger_cache():
+	logwood.basic_config(handlers = [], logger_cache = 'bounded', logger_cache_size = 2)
+	a = logwood.get_logger('A')
+	logwood.get_logger('B')
+	# A becomes the most recently used logger
+	logwood.get_logger('A')
+	logwood.get_logger('C')
+	assert list(logwood.state.logger_cache) == ['A', 'C']
+	# A logger evicted from the cache but still alive elsewhere is returned again
+	logwood.get_logger('D')
+	assert list(logwood.state.logger_cache) == ['C', 'D']
+	assert logwood.get_logger('A') is a
+	assert list(logwood.state.logger_cache) == ['D', 'A']
+
+
+def test_invalid_logger_cache():
+	with pytest.raises(ValueError):
+		logwood.basic_config(handlers = [], logger_cache = 'lru')
+
+
+def test_concurrent_logger_creation():
+	'''
+	Threads asking for the same new logger at the same time get the same instance.
+	'''
+	logwood.basic_config(handlers = [])
+	barrier = threading.Barrier(8)
+	loggers = []
+
+	def get():
+		barrier.wait()
+		loggers.append(logwood.get_logger('Shared'))
+
+	threads = [threading.Thread(target = get) for _ in range(8)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert len(loggers) == 8
+	assert all(logger is loggers[0] for logger in loggers)
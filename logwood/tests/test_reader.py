@@ -0,0 +1,180 @@
+import os
+import threading
+
+import pytest
+
+import logwood
+import logwood.reader
+import logwood.testing
+from logwood.handlers.compressed import CompressedFileHandler
+from logwood.handlers.json import JsonHandler
+from logwood.handlers.logging import FileHandler
+
+
+
+def _append(filename, data):
+	with open(filename, 'ab') as f:
+		f.write(data)
+
+
+@pytest.fixture
+def text_log(tmpdir):
+	filename = str(tmpdir.join('app.log'))
+	logwood.basic_config(handlers = [FileHandler(filename = filename)], level = logwood.DEBUG, record_variables = {'hostname': 'host'})
+	pricer, risk = logwood.get_logger('pricer'), logwood.get_logger('risk')
+	pricer.debug('Quote {}', 1)
+	risk.warning('Limit [close]')
+	try:
+		raise ValueError('bad quote')
+	except ValueError:
+		pricer.exception('Failed')
+	risk.error('Breach')
+	pricer.info('Done')
+	logwood.shutdown()
+	return filename
+
+
+def test_text_records(text_log):
+	with logwood.reader.open_log(text_log) as log:
+		entries = list(log.records())
+		assert [entry.message.splitlines()[0] for entry in entries] == ['Quote 1', 'Limit [close]', 'Failed', 'Breach', 'Done']
+		failed = entries[2]
+		assert failed.name == 'pricer'
+		assert failed.level == 'ERROR'
+		assert failed.fields()['hostname'] == 'host'
+		assert isinstance(failed.timestamp, float)
+		# The traceback stays with its record
+		assert failed.message.startswith('Failed\nTraceback (most recent call last):')
+		assert failed.message.endswith('ValueError: bad quote')
+		assert failed.raw.startswith(b'[')
+
+
+def test_text_filters(text_log):
+	with logwood.reader.open_log(text_log) as log:
+		assert [entry.message.splitlines()[0] for entry in log.records(level = logwood.ERROR)] == ['Failed', 'Breach']
+		assert [entry.message for entry in log.records(name = 'risk')] == ['Limit [close]', 'Breach']
+		assert [entry.message for entry in log.records(level = logwood.WARNING, name = 'risk')] == ['Limit [close]', 'Breach']
+		assert list(log.records(name = 'pric')) == []
+
+
+def test_filtered_records_are_not_decoded(text_log, monkeypatch):
+	created = []
+	original_init = logwood.reader.LogEntry.__init__
+	monkeypatch.setattr(logwood.reader.LogEntry, '__init__', lambda self, *args: created.append(args) or original_init(self, *args))
+	with logwood.reader.open_log(text_log) as log:
+		assert len(list(log.records(name = 'risk'))) == 2
+	assert len(created) == 2
+
+
+def test_other_text_format(tmpdir):
+	filename = str(tmpdir.join('app.log'))
+	with open(filename, 'w') as f:
+		f.write('INFO one\nERROR two\n')
+	with logwood.reader.open_log(filename) as log:
+		assert [entry.message for entry in log.records()] == ['INFO one', 'ERROR two']
+		assert log.kind == logwood.reader.LINES
+		assert list(log.records(level = logwood.ERROR)) == []
+
+
+def test_empty_file(tmpdir):
+	filename = str(tmpdir.join('app.log'))
+	open(filename, 'w').close()
+	with logwood.reader.open_log(filename) as log:
+		assert list(log.records()) == []
+
+
+def test_json(tmpdir):
+	filename = str(tmpdir.join('app.json'))
+	with open(filename, 'w') as f:
+		logwood.basic_config(handlers = [JsonHandler(stream = f)])
+		logwood.get_logger('pricer').info('Quote', customer = {'name': 'risk', 'level': 'ERROR'})
+		logwood.get_logger('risk').error('Breach "limit"')
+		logwood.get_logger('"risk"').error('Quoted name')
+
+	with logwood.reader.open_log(filename) as log:
+		assert log.kind == logwood.reader.JSON
+		assert [entry.message for entry in log.records()] == ['Quote', 'Breach "limit"', 'Quoted name']
+		breach, = log.records(name = 'risk')
+		assert breach.message == 'Breach "limit"'
+		assert breach.fields()['level_number'] == logwood.ERROR
+		assert [entry.name for entry in log.records(level = logwood.ERROR)] == ['risk', '"risk"']
+
+
+def test_gzip(tmpdir):
+	filename = str(tmpdir.join('app.log.gz'))
+	for run in range(2):
+		logwood.testing.reset_state()
+		handler = CompressedFileHandler(filename = filename)
+		logwood.basic_config(handlers = [handler])
+		logwood.get_logger('app').error('Run {}', run)
+		logwood.shutdown()
+	# An unfinished stream, e.g. of a crashed process
+	logwood.testing.reset_state()
+	handler = CompressedFileHandler(filename = filename)
+	logwood.basic_config(handlers = [handler])
+	logwood.get_logger('app').error('Crashed')
+	handler.flush()
+
+	with logwood.reader.open_log(filename) as log:
+		assert [entry.message for entry in log.records(level = logwood.ERROR)] == ['Run 0', 'Run 1', 'Crashed']
+
+
+def test_zstd_frames(tmpdir):
+	''' Every run appends another zstd frame, all of them are read. '''
+	try:
+		import compression.zstd # noqa
+	except ImportError:
+		pytest.importorskip('zstandard')
+	filename = str(tmpdir.join('app.log.zst'))
+	for run in range(2):
+		logwood.testing.reset_state()
+		handler = CompressedFileHandler(filename = filename, codec = 'zstd')
+		logwood.basic_config(handlers = [handler])
+		logwood.get_logger('app').error('Run {}', run)
+		logwood.shutdown()
+
+	with logwood.reader.open_log(filename) as log:
+		assert [entry.message for entry in log.records()] == ['Run 0', 'Run 1']
+
+
+def _follow(filename, **kwargs):
+	return logwood.reader.follow(filename, interval = 0.01, **kwargs)
+
+
+def test_follow(tmpdir):
+	filename = str(tmpdir.join('app.log'))
+	_append(filename, b'[1.0][h][s][app][INFO] old\n')
+	entries = _follow(filename, level = logwood.WARNING)
+	threading.Timer(0.05, _append, (filename, b'[2.0][h][s][app][INFO] new\n[3.0][h][s][app][ERROR] first line\nsecond line\n')).start()
+	threading.Timer(0.1, _append, (filename, b'[4.0][h][s][app][WARNING] next\n')).start()
+	assert next(entries).message == 'first line\nsecond line'
+	assert next(entries).message == 'next'
+
+
+def test_follow_from_start_and_rotation(tmpdir):
+	filename = str(tmpdir.join('app.log'))
+	_append(filename, b'{"name": "app", "level": "INFO", "message": "one"}\n')
+	entries = _follow(filename, from_start = True)
+	assert next(entries).message == 'one'
+
+	os.rename(filename, filename + '.1')
+	_append(filename, b'{"name": "app", "level": "INFO", "message": "two"}\n')
+	assert next(entries).message == 'two'
+
+
+def test_command_line(text_log, capsysbinary):
+	assert logwood.reader.main([text_log, '--level', 'warning', '--name', 'risk']) == 0
+	output = capsysbinary.readouterr().out.decode()
+	assert [line.rsplit(' ', 1)[1] for line in output.splitlines()] == ['[close]', 'Breach']
+
+	assert logwood.reader.main([text_log + '.missing']) == 1
+
+
+def test_follow_small_reads(tmpdir, monkeypatch):
+	''' Files are read in pieces, a record longer than a piece is read whole. '''
+	monkeypatch.setattr(logwood.reader, 'FOLLOW_READ_SIZE', 16)
+	filename = str(tmpdir.join('app.log'))
+	messages = ['one', 'x' * 100, 'two']
+	_append(filename, b''.join('[1.0][h][s][app][INFO] {}\n'.format(message).encode() for message in messages))
+	entries = _follow(filename, from_start = True)
+	assert [next(entries).message for _ in messages] == messages
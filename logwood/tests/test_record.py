@@ -0,0 +1,153 @@
+import asyncio
+import pytest
+import threading
+
+import logwood
+import logwood.record
+import logwood.testing
+
+
+
+@pytest.fixture
+def handler():
+	handler = logwood.testing.MockLogwoodHandler(format = '%(message)s')
+	logwood.basic_config(handlers = [handler])
+	return handler
+
+
+
+def test_default_variables(handler):
+	'''
+	Default record variables are looked up without being copied into the record.
+	'''
+	handler.format = '%(hostname)s %(message)s'
+	logger = logwood.get_logger('Test')
+	logger.info('Message')
+	assert handler['INFO'] == ['{} Message'.format(logwood.global_config.default_record_variables['hostname'])]
+
+
+def test_context(handler):
+	handler.format = '{request_id} {user} {message}'
+	logger = logwood.get_logger('Test')
+	with logwood.context(request_id = 1, user = 'alice'):
+		with logwood.context(request_id = 2):
+			logger.info('Inner')
+		logger.info('Outer')
+	assert handler['INFO'] == ['2 alice Inner', '1 alice Outer']
+	assert logwood.record.get_context() == {}
+
+
+def test_context_precedence(handler):
+	'''
+	Context variables override default record variables.
+	'''
+	handler.format = '%(hostname)s %(message)s'
+	logger = logwood.get_logger('Test')
+	with logwood.context(hostname = 'context-host'):
+		logger.info('Message')
+	assert handler['INFO'] == ['context-host Message']
+
+
+def test_context_decorator(handler):
+	handler.format = '{task} {message}'
+	logger = logwood.get_logger('Test')
+
+	@logwood.context(task = 'sync')
+	def sync_function():
+		logger.info('Sync')
+
+	@logwood.context(task = 'async')
+	async def async_function():
+		await asyncio.sleep(0)
+		logger.info('Async')
+
+	sync_function()
+	asyncio.run(async_function())
+	assert handler['INFO'] == ['sync Sync', 'async Async']
+
+
+def test_context_is_thread_local(handler):
+	handler.format = '{message}'
+	seen = []
+	with logwood.context(request_id = 1):
+		thread = threading.Thread(target = lambda: seen.append(logwood.record.get_context()))
+		thread.start()
+		thread.join()
+	assert seen == [{}]
+
+
+def test_shared_context_instance(handler):
+	'''
+	One context instance entered by overlapping tasks and threads, each exits its own entry.
+	'''
+	handler.format = '{request_id} {message}'
+	logger = logwood.get_logger('Test')
+	shared = logwood.context(request_id = 7)
+
+	async def task(name, entered, release):
+		with shared:
+			entered.set()
+			await release.wait()
+			logger.info(name)
+
+	async def main():
+		first_entered, second_entered = asyncio.Event(), asyncio.Event()
+		first_release, second_release = asyncio.Event(), asyncio.Event()
+		first = asyncio.ensure_future(task('First', first_entered, first_release))
+		second = asyncio.ensure_future(task('Second', second_entered, second_release))
+		await first_entered.wait()
+		await second_entered.wait()
+		# The first task to enter exits first
+		first_release.set()
+		await first
+		second_release.set()
+		await second
+
+	asyncio.run(main())
+	assert handler['INFO'] == ['7 First', '7 Second']
+
+	inside, release = threading.Event(), threading.Event()
+
+	def thread_target():
+		with shared:
+			inside.set()
+			release.wait(5)
+
+	thread = threading.Thread(target = thread_target)
+	thread.start()
+	inside.wait(5)
+	with shared:
+		release.set()
+		thread.join()
+		logger.info('Main')
+	assert handler['INFO'][-1] == '7 Main'
+	assert logwood.record.get_context() == {}
+
+
+def test_context_exited_elsewhere():
+	shared = logwood.context(request_id = 7)
+	shared.__enter__()
+	errors = []
+
+	def thread_target():
+		try:
+			shared.__exit__(None, None, None)
+		except RuntimeError as e:
+			errors.append(e)
+
+	thread = threading.Thread(target = thread_target)
+	thread.start()
+	thread.join()
+	shared.__exit__(None, None, None)
+	assert len(errors) == 1
+	assert logwood.record.get_context() == {}
+
+
+def test_flatten():
+	record = logwood.record.Record({'message': 'Message', 'a': 3})
+	record.context = {'a': 2, 'b': 2}
+	record.defaults = {'a': 1, 'b': 1, 'c': 1}
+	assert logwood.record.flatten(record) == {'message': 'Message', 'a': 3, 'b': 2, 'c': 1}
+	copy = record.copy()
+	assert copy['c'] == 1
+	assert copy == record
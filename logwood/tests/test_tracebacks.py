@@ -0,0 +1,64 @@
+import sys
+
+import logwood.tracebacks
+
+
+
+def fail(message):
+	raise ValueError(message)
+
+
+def get_exc_info(message = 'Failure'):
+	try:
+		fail(message)
+	except ValueError:
+		return sys.exc_info()
+
+
+def test_format_exception():
+	text = logwood.tracebacks.format_exception(get_exc_info())
+	assert text.startswith('Traceback (most recent call last):')
+	assert text.endswith('ValueError: Failure')
+
+
+def test_format_exception_cached():
+	'''
+	The same code path failing with the same message is rendered only once.
+	'''
+	first = logwood.tracebacks.format_exception(get_exc_info())
+	second = logwood.tracebacks.format_exception(get_exc_info())
+	assert first is second
+	other = logwood.tracebacks.format_exception(get_exc_info('Other failure'))
+	assert other is not first
+	assert other.endswith('ValueError: Other failure')
+
+
+def test_format_exception_chained():
+	try:
+		try:
+			fail('Inner')
+		except ValueError as e:
+			raise RuntimeError('Outer') from e
+	except RuntimeError:
+		exc_info = sys.exc_info()
+	text = logwood.tracebacks.format_exception(exc_info)
+	assert 'ValueError: Inner' in text
+	assert 'direct cause' in text
+	assert text.endswith('RuntimeError: Outer')
+
+
+def test_exception_to_dict():
+	try:
+		try:
+			fail('Inner')
+		except ValueError:
+			raise KeyError('key')
+	except KeyError:
+		exc_info = sys.exc_info()
+	data = logwood.tracebacks.exception_to_dict(exc_info)
+	assert data['type'] == 'KeyError'
+	assert data['message'] == "'key'"
+	assert data['frames'][-1]['function'] == 'test_exception_to_dict'
+	assert data['cause']['type'] == 'ValueError'
+	assert data['cause']['frames'][-1]['function'] == 'fail'
+	assert logwood.tracebacks.exception_to_dict((None, None, None)) is None
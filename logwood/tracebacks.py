@@ -0,0 +1,133 @@
+'''
+Lazy and cached rendering of exception info stored in records.
+
+Rendered tracebacks are cached by the identity of the traceback (exception type and message, plus code objects and
+line numbers of all frames), so a code path that keeps failing the same way is rendered only once.
+'''
+
+from __future__ import annotations
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+	from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+# Maximum number of distinct tracebacks kept in each cache. When full, the cache is simply cleared.
+CACHE_SIZE = 256
+
+_text_cache = {} # type: Dict[Hashable, str]
+_structured_cache = {} # type: Dict[Hashable, Dict[str, Any]]
+
+
+
+def _safe_str(value: BaseException) -> str:
+	try:
+		return str(value)
+	except Exception:
+		return '<exception str() failed>'
+
+
+def _chained_exception(value: BaseException) -> Optional[BaseException]:
+	''' Return the exception that Python would print above `value` in a traceback, if any. '''
+	if value.__cause__ is not None:
+		return value.__cause__
+	if value.__context__ is not None and not value.__suppress_context__:
+		return value.__context__
+	return None
+
+
+def _traceback_key(exc_info: Tuple) -> Hashable:
+	'''
+	Return a hashable key identifying the rendered traceback of `exc_info`, including chained exceptions.
+	'''
+	exc_type, value, tb = exc_info
+	key = [] # type: List[Any]
+	seen = set()
+	while True:
+		key.append(exc_type)
+		if value is not None:
+			key.append(_safe_str(value))
+			key.append(tuple(getattr(value, '__notes__', ())))
+			if hasattr(value, 'exceptions'):
+				# Exception groups render their sub-exceptions too, give up on caching those.
+				key.append(object())
+		while tb is not None:
+			key.append(tb.tb_frame.f_code)
+			key.append(tb.tb_lineno)
+			tb = tb.tb_next
+		seen.add(id(value))
+		value = None if value is None else _chained_exception(value)
+		if value is None or id(value) in seen:
+			return tuple(key)
+		exc_type, tb = type(value), value.__traceback__
+		key.append(None)
+
+
+def _cached(cache: Dict[Hashable, Any], exc_info: Tuple, render) -> Any:
+	try:
+		key = _traceback_key(exc_info)
+		return cache[key]
+	except KeyError:
+		pass
+	except TypeError:
+		# Unhashable exception type or notes, render without caching.
+		return render(exc_info)
+
+	if len(cache) >= CACHE_SIZE:
+		cache.clear()
+	result = cache[key] = render(exc_info)
+	return result
+
+
+def _render_text(exc_info: Tuple) -> str:
+	import traceback
+	return ''.join(traceback.format_exception(*exc_info)).rstrip('\n')
+
+
+def _type_name(exc_type: type) -> str:
+	if exc_type.__module__ == 'builtins':
+		return exc_type.__qualname__
+	return '{}.{}'.format(exc_type.__module__, exc_type.__qualname__)
+
+
+def _render_structured(exc_info: Tuple) -> Optional[Dict[str, Any]]:
+	import traceback
+	exc_type, value, tb = exc_info
+	result = parent = None
+	seen = set()
+	while exc_type is not None:
+		description = {
+			'type': _type_name(exc_type),
+			'message': '' if value is None else _safe_str(value),
+			'frames': [
+				{'filename': frame.filename, 'lineno': frame.lineno, 'function': frame.name}
+				for frame in traceback.extract_tb(tb)
+			],
+		}
+		if parent is None:
+			result = description
+		else:
+			parent['cause'] = description
+		parent = description
+		seen.add(id(value))
+		value = None if value is None else _chained_exception(value)
+		if value is None or id(value) in seen:
+			break
+		exc_type, tb = type(value), value.__traceback__
+	return result
+
+
+def format_exception(exc_info: Tuple) -> str:
+	'''
+	Return the traceback text of `exc_info` (a ``sys.exc_info()`` tuple) without a trailing newline.
+	'''
+	return _cached(_text_cache, exc_info, _render_text)
+
+
+def exception_to_dict(exc_info: Tuple) -> Optional[Dict[str, Any]]:
+	'''
+	Return a JSON-serializable description of `exc_info` with keys ``type``, ``message``, ``frames``
+	(a list of dicts with ``filename``, ``lineno`` and ``function``) and optionally ``cause``.
+	Returns None if there is no exception. The returned dict is shared, do not modify it.
+	'''
+	return _cached(_structured_cache, exc_info, _render_structured)
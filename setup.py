@@ -11,7 +11,7 @@ def read(relpath: str) -> str:
 setup(
 	name = 'logwood',
 	version = read('version.txt').strip(),
-	description = 'Simple, but fast logging library for Python 3.5+',
+	description = 'Simple, but fast logging library for Python 3.7+',
 	long_description = read('README.rst'),
 	author = 'Quantlane',
 	author_email = 'code@quantlane.com',
@@ -31,6 +31,6 @@ setup(
 		'License :: OSI Approved :: Apache Software License',
 		'Natural Language :: English',
 		'Programming Language :: Python :: 3 :: Only',
-		'Programming Language :: Python :: 3.5',
+		'Programming Language :: Python :: 3.7',
 	]
 )